@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Time how long each KG-OBO entry point takes to start,
+and check that heavy dependencies aren't imported when they aren't needed.
+"""
+
+import click  #type: ignore
+import sys
+from kg_obo.import_benchmark import benchmark_entry_points, get_loaded_modules
+
+@click.command()
+@click.option("--runs",
+               default=5,
+               type=int,
+               help="Number of times to start each entry point. The median time is reported. Defaults to 5.")
+@click.option("--outpath",
+               default="",
+               help="If used, writes start times to this path as TSV.")
+def run(runs, outpath):
+    benchmark_entry_points(runs, outpath)
+
+    loaded = get_loaded_modules("import kg_obo")
+    if loaded:
+        print(f"Importing kg_obo also imports: {loaded}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+  run()
@@ -1,21 +1,54 @@
+import importlib
 
-from .obolibrary_utils import get_url, base_url_exists
-from .robot_utils import initialize_robot, relax_owl, merge_and_convert_owl
-from .transform import retrieve_obofoundry_yaml, kgx_transform, get_owl_iri, track_obo_version, download_ontology, run_transform
-from .upload import upload_dir_to_s3, update_index_files
+# Names exported by the package, and the submodules they come from.
+# Submodules are only imported when one of their names is first used,
+# so that importing kg_obo (e.g., for --help) doesn't import kgx, boto3, etc.
+_EXPORTS = {
+    "get_url": "obolibrary_utils",
+    "base_url_exists": "obolibrary_utils",
+    "initialize_robot": "robot_utils",
+    "relax_owl": "robot_utils",
+    "merge_and_convert_owl": "robot_utils",
+    "retrieve_obofoundry_yaml": "transform",
+    "kgx_transform": "transform",
+    "get_owl_iri": "transform",
+    "track_obo_version": "transform",
+    "download_ontology": "transform",
+    "run_transform": "transform",
+    "upload_dir_to_s3": "upload",
+    "update_index_files": "upload",
+}
 
 __all__ = [
     "get_url",
     "base_url_exists",
-    "retrieve_obofoundry_yaml", 
-    "kgx_transform", 
-    "get_owl_iri", 
-    "track_obo_version", 
-    "download_ontology", 
-    "run_transform", 
-    "upload_dir_to_s3", 
+    "retrieve_obofoundry_yaml",
+    "kgx_transform",
+    "get_owl_iri",
+    "track_obo_version",
+    "download_ontology",
+    "run_transform",
+    "upload_dir_to_s3",
     "update_index_files",
     "initialize_robot",
     "relax_owl",
-    "merge_and_convert_owl"  
+    "merge_and_convert_owl"
 ]
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        module = importlib.import_module(f".{_EXPORTS[name]}", __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    try:
+        return importlib.import_module(f".{name}", __name__)
+    except ModuleNotFoundError as e:
+        if e.name != f"{__name__}.{name}":
+            raise
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,159 @@
+"""checkpoint.py - records the stages each OBO has completed, so interrupted runs may resume."""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+CHECKPOINT_DIR = "checkpoints"
+
+
+def checkpoint_file(data_dir: str, name: str) -> str:
+    """
+    Gets the path to the checkpoint manifest for one OBO.
+    Each OBO has its own manifest, so concurrent workers never write the same file.
+    :param data_dir: str of local dir where data is saved
+    :param name: str of OBO ID, e.g., bfo
+    :return: str of path to checkpoint manifest
+    """
+
+    return os.path.join(data_dir, CHECKPOINT_DIR, f"{name}.json")
+
+
+def get_file_hash(filename: str) -> str:
+    """
+    Gets the SHA-256 hash of a file, without reading it all into memory.
+    :param filename: str, name or path of file
+    :return: str of hex digest
+    """
+
+    file_hash = hashlib.sha256()
+    with open(filename, "rb") as infile:
+        for chunk in iter(lambda: infile.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+
+def get_file_stat(filename: str) -> dict:
+    """
+    Gets what's checked to tell if a file has changed, without reading it.
+    :param filename: str, name or path of file
+    :return: dict of size and modification time (ns), or empty dict if it's missing
+    """
+
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return {}
+
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load_checkpoints(checkpoint_path: str) -> dict:
+    """
+    Reads a checkpoint manifest.
+    :param checkpoint_path: str of path to checkpoint manifest
+    :return: dict with the checkpointed OBO version and its completed stages,
+    empty if there is no usable manifest
+    """
+
+    try:
+        with open(checkpoint_path, "r") as checkpoint_file:
+            return json.load(checkpoint_file)
+    except (IOError, ValueError):
+        return {}
+
+
+def record_checkpoint(
+    checkpoint_path: str,
+    version: str,
+    stage: str,
+    path: str = "",
+    details: dict = {},
+    sha256: str = "",
+) -> None:
+    """
+    Records that a stage has completed for an OBO version.
+    If the manifest is for a different version, its stages are discarded first.
+    A stage whose file is missing is recorded, but can't be resumed from.
+    The file's size and modification time are recorded, not its hash,
+    as these files may be several GB and every run records its stages.
+    The manifest is replaced in one step, so it is never left half-written.
+    :param checkpoint_path: str of path to checkpoint manifest
+    :param version: str of OBO version
+    :param stage: str name of completed stage, e.g., relax
+    :param path: str of path to the file this stage produced, if any
+    :param details: dict of any other values needed to resume after this stage
+    :param sha256: str of hex digest of the file at path, if already known,
+    e.g., as hashed while downloading
+    """
+
+    checkpoints = load_checkpoints(checkpoint_path)
+    if checkpoints.get("version") != version:
+        checkpoints = {"version": version, "stages": {}}
+
+    checkpoints["stages"][stage] = {
+        "path": path,
+        "stat": get_file_stat(path) if path else {},
+        "sha256": sha256,
+        "details": details,
+        "completed": datetime.now().isoformat(),
+    }
+
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+    temp_path = checkpoint_path + ".tmp"
+    with open(temp_path, "w") as outfile:
+        json.dump(checkpoints, outfile, indent=2)
+    os.replace(temp_path, checkpoint_path)
+
+
+def get_checkpoint(checkpoint_path: str, version: str, stage: str) -> dict:
+    """
+    Gets the record of a completed stage for an OBO version,
+    but only if the file it produced is still present and unchanged,
+    i.e., has the same size and modification time.
+    :param checkpoint_path: str of path to checkpoint manifest
+    :param version: str of OBO version
+    :param stage: str name of stage, e.g., relax
+    :return: dict with path, sha256, details, and completed time,
+    or empty dict if the stage can't be resumed from
+    """
+
+    checkpoints = load_checkpoints(checkpoint_path)
+    if checkpoints.get("version") != version:
+        return {}
+
+    checkpoint = checkpoints["stages"].get(stage, {})
+    if checkpoint and checkpoint["path"]:
+        if not checkpoint.get("stat") or \
+                get_file_stat(checkpoint["path"]) != checkpoint["stat"]:
+            print(f"Checkpoint file {checkpoint['path']} is missing or changed - can't resume from it.")
+            return {}
+
+    return checkpoint
+
+
+def has_checkpoints(checkpoint_path: str, version: str) -> bool:
+    """
+    Checks if any stages were completed for an OBO version,
+    i.e., a transform of that version was started but not finished.
+    :param checkpoint_path: str of path to checkpoint manifest
+    :param version: str of OBO version
+    :return: bool, True if any stages are recorded
+    """
+
+    checkpoints = load_checkpoints(checkpoint_path)
+
+    return checkpoints.get("version") == version and len(checkpoints["stages"]) > 0
+
+
+def clear_checkpoints(checkpoint_path: str) -> None:
+    """
+    Removes the checkpoint manifest for an OBO,
+    e.g., once its transform is complete.
+    :param checkpoint_path: str of path to checkpoint manifest
+    """
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
@@ -0,0 +1,91 @@
+"""converters.py - builds the CURIE and IRI converters once, and caches them on disk."""
+
+import functools
+import hashlib
+import json
+import os
+import pickle
+from importlib.metadata import version
+
+from kg_obo.prefixes import KGOBO_PREFIXES
+
+CONVERTER_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "kg-obo")
+
+
+def get_converter_cache_key() -> str:
+    """
+    Identifies the inputs the converters are built from, so a cached copy
+    is only used if they haven't changed: the prefixmaps and curies versions,
+    and the KGOBO_PREFIXES overrides.
+    :return: str of hex digest
+    """
+
+    key = json.dumps(
+        {
+            "prefixmaps": version("prefixmaps"),
+            "curies": version("curies"),
+            "kgobo_prefixes": KGOBO_PREFIXES,
+        },
+        sort_keys=True,
+    )
+
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def build_converters() -> tuple:
+    """
+    Sets up CURIE checking and conversion converters.
+    We need both maps for CURIE -> IRI (for validating) - this is curie_converter
+    and for IRI -> CURIE (for converting) - this is iri_converter
+    Note: not all prefixes in all_contexts are in all_reverse_contexts
+    :return: tuple of (curie_converter, iri_converter)
+    """
+
+    # Imported here, so loading the cached converters doesn't need prefixmaps
+    from curies import Converter  # type: ignore
+    from prefixmaps.io.parser import load_multi_context  # type: ignore
+
+    curie_contexts = load_multi_context(["obo", "bioregistry.upper"])
+    all_contexts = curie_contexts.as_dict()
+    all_contexts = {key: val for key, val in all_contexts.items()}
+    curie_converter = Converter.from_prefix_map(all_contexts)
+    all_reverse_contexts = {val: key for key, val in all_contexts.items()}
+    all_reverse_contexts_lc = {val.lower(): key for key, val in all_contexts.items()}
+    all_reverse_contexts.update(all_reverse_contexts_lc)
+    all_reverse_contexts.update(KGOBO_PREFIXES)
+    iri_converter = Converter.from_reverse_prefix_map(all_reverse_contexts)
+
+    return (curie_converter, iri_converter)
+
+
+@functools.lru_cache(maxsize=None)
+def get_converters(cache_dir: str = CONVERTER_CACHE_DIR) -> tuple:
+    """
+    Gets the CURIE and IRI converters, building them only if no cached copy
+    matches the current prefix maps.
+    Within a process they are only loaded once, and processes forked
+    afterwards (e.g., transform workers) share the same copy.
+    :param cache_dir: str of directory to cache converters in
+    :return: tuple of (curie_converter, iri_converter)
+    """
+
+    cache_path = os.path.join(cache_dir, f"converters-{get_converter_cache_key()}.pickle")
+
+    try:
+        with open(cache_path, "rb") as cache_file:
+            return pickle.load(cache_file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        pass
+
+    converters = build_converters()
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as cache_file:
+            pickle.dump(converters, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"Could not cache converters in {cache_dir}: {e}")
+
+    return converters
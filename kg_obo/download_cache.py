@@ -0,0 +1,201 @@
+"""download_cache.py - keeps downloaded OBOs between runs, so unchanged files aren't downloaded again."""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+from typing import Mapping
+
+from kg_obo.checkpoint import get_file_hash
+
+DOWNLOAD_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "kg-obo", "downloads")
+
+# Total size of cached files, as a Java heap size (see robot_utils.parse_memory_size)
+DEFAULT_CACHE_SIZE = "20g"
+
+
+def link_or_copy(source: str, dest: str) -> None:
+    """
+    Hardlinks a file to a new path, or copies it if the two paths
+    are on different filesystems (or the filesystem has no hardlinks).
+    Any existing file at dest is replaced.
+    Hardlinked files share their contents, so neither may be modified in place.
+    :param source: str of path to existing file
+    :param dest: str of path to link or copy to
+    """
+
+    temp_path = f"{dest}.{os.getpid()}.link"
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copy(source, temp_path)
+    os.replace(temp_path, dest)
+
+
+class DownloadCache:
+    """
+    Cache of downloaded files, on local disk and shared by all runs and workers.
+    Files are stored once per content hash, so the same file from two URLs
+    is only stored once. Each URL has an entry with the hash of the file last
+    downloaded from it and its ETag and Last-Modified headers, so the file may
+    be revalidated with a conditional request rather than downloaded again.
+    The least recently used files are removed once the cache is over its size.
+    """
+
+    def __init__(self, cache_dir: str = DOWNLOAD_CACHE_DIR, max_bytes: int = 0):
+        """
+        :param cache_dir: str of cache directory, created if needed
+        :param max_bytes: int of total size of cached files, or 0 for no limit
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.entries_dir = os.path.join(cache_dir, "entries")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.entries_dir, exist_ok=True)
+
+    def entry_path(self, url: str) -> str:
+        """
+        :param url: str of URL
+        :return: str of path to the URL's entry
+        """
+        return os.path.join(
+            self.entries_dir, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json"
+        )
+
+    def object_path(self, sha256: str) -> str:
+        """
+        :param sha256: str of hex digest of file contents
+        :return: str of path to the cached file
+        """
+        return os.path.join(self.objects_dir, sha256)
+
+    def lookup(self, url: str) -> dict:
+        """
+        Finds the cached file last downloaded from a URL.
+        :param url: str of URL
+        :return: dict of the URL's entry, including the "path" of its cached file,
+        or empty if nothing from this URL is cached
+        """
+        try:
+            with open(self.entry_path(url), "r") as entry_file:
+                entry = json.load(entry_file)
+        except (IOError, ValueError):
+            return {}
+
+        entry["path"] = self.object_path(entry["sha256"])
+        if not os.path.exists(entry["path"]):
+            return {}
+
+        return entry
+
+    def validators(self, url: str) -> dict:
+        """
+        Gets headers for a conditional request to a URL, so the server
+        responds with 304 Not Modified if the cached file is still current.
+        :param url: str of URL
+        :return: dict of request headers, empty if nothing from this URL is cached
+        """
+        entry = self.lookup(url)
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        return headers
+
+    def store(self, url: str, path: str, headers: Mapping[str, str], sha256: str = "") -> str:
+        """
+        Adds a downloaded file to the cache, then evicts the least
+        recently used files if the cache is over its size.
+        The cached file is a hardlink to the downloaded file where possible.
+        :param url: str of URL the file was downloaded from
+        :param path: str of path to downloaded file
+        :param headers: mapping of response headers, for ETag and Last-Modified
+        :param sha256: str of hex digest of file contents, if already known -
+        otherwise the file is hashed here
+        :return: str of hex digest of file contents
+        """
+        sha256 = sha256 or get_file_hash(path)
+        object_path = self.object_path(sha256)
+        if not os.path.exists(object_path):
+            link_or_copy(path, object_path)
+
+        entry = {
+            "url": url,
+            "sha256": sha256,
+            "etag": headers.get("ETag", ""),
+            "last_modified": headers.get("Last-Modified", ""),
+            "size": os.path.getsize(object_path),
+            "stored": datetime.now().isoformat(),
+        }
+        temp_path = f"{self.entry_path(url)}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as entry_file:
+            json.dump(entry, entry_file)
+        os.replace(temp_path, self.entry_path(url))
+
+        self.touch(sha256)
+        self.evict()
+
+        return sha256
+
+    def link(self, url: str, dest: str) -> bool:
+        """
+        Places the cached file from a URL at a path, as a hardlink where possible.
+        :param url: str of URL
+        :param dest: str of path to place the file at
+        :return: bool, True if the file was cached, False otherwise
+        """
+        entry = self.lookup(url)
+        if not entry:
+            return False
+        try:
+            link_or_copy(entry["path"], dest)
+        except FileNotFoundError:  # Evicted by another worker since the lookup
+            return False
+        self.touch(entry["sha256"])
+
+        return True
+
+    def touch(self, sha256: str) -> None:
+        """
+        Marks a cached file as just used, so it's evicted last.
+        :param sha256: str of hex digest of file contents
+        """
+        try:
+            os.utime(self.object_path(sha256))
+        except OSError:
+            pass
+
+    def evict(self) -> list:
+        """
+        Removes the least recently used files until the cache is within its size.
+        Entries for removed files are ignored from then on.
+        :return: list of str hex digests of files removed
+        """
+        if not self.max_bytes:
+            return []
+
+        objects = []
+        for sha256 in os.listdir(self.objects_dir):
+            try:
+                stat = os.stat(self.object_path(sha256))
+            except OSError:
+                continue
+            objects.append((stat.st_mtime, stat.st_size, sha256))
+
+        total = sum(size for _, size, _ in objects)
+        removed = []
+        for _, size, sha256 in sorted(objects):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self.object_path(sha256))
+            except FileNotFoundError:
+                pass
+            total = total - size
+            removed.append(sha256)
+
+        return removed
@@ -0,0 +1,64 @@
+"""file_probe.py - counts lines, bytes, and OWL declarations in a file, in one binary pass."""
+
+import os
+
+# Bytes read at a time while probing
+PROBE_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Declarations counted, as they appear in RDF/XML and in functional syntax.
+# Anonymous classes (i.e., <owl:Class> without rdf:about) aren't declarations.
+DECLARATIONS = {
+    "classes": [b"<owl:Class rdf:about=", b"Declaration(Class("],
+    "object_properties": [b"<owl:ObjectProperty rdf:about=", b"Declaration(ObjectProperty("],
+    "annotation_properties": [b"<owl:AnnotationProperty rdf:about=", b"Declaration(AnnotationProperty("],
+}
+
+# Bytes kept from the end of each chunk, so a declaration split between
+# chunks is still counted
+CARRY_SIZE = max(len(pattern) for patterns in DECLARATIONS.values() for pattern in patterns) - 1
+
+
+def count_declarations(data: bytes) -> dict:
+    """
+    :param data: bytes to search
+    :return: dict of each kind of declaration to its count in data
+    """
+    return {kind: sum(data.count(pattern) for pattern in patterns)
+            for kind, patterns in DECLARATIONS.items()}
+
+
+def probe_file(filename: str, chunk_size: int = PROBE_CHUNK_SIZE) -> dict:
+    """
+    Gets the size of a file, its line count, and counts of the OWL declarations
+    in it, reading it once as bytes rather than decoding it as text.
+    Lines are counted as get_file_length always has, including empty lines,
+    and a last line without a newline.
+    :param filename: str, name or path of file
+    :param chunk_size: int of bytes to read at a time
+    :return: dict of "bytes", "lines", and each kind of declaration to its count
+    """
+
+    counts = dict.fromkeys(["newlines"] + list(DECLARATIONS), 0)
+    carry = b""
+    last = b""
+    with open(filename, "rb") as infile:
+        while True:
+            chunk = infile.read(chunk_size)
+            if not chunk:
+                break
+            counts["newlines"] = counts["newlines"] + chunk.count(b"\n")
+            # Those wholly within the carry were counted with the last chunk
+            found = count_declarations(carry + chunk)
+            for kind, count in count_declarations(carry).items():
+                counts[kind] = counts[kind] + found[kind] - count
+            carry = (carry + chunk)[-CARRY_SIZE:]
+            last = chunk[-1:]
+
+    lines = counts.pop("newlines")
+    if last and last != b"\n":
+        lines = lines + 1
+
+    probe = {"bytes": os.path.getsize(filename), "lines": lines}
+    probe.update(counts)
+
+    return probe
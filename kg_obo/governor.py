@@ -0,0 +1,160 @@
+"""governor.py - limits connections to each host, and total download bandwidth, across all workers."""
+
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+# Connections open at once to any one host, across all threads and worker processes
+DEFAULT_HOST_CONNECTIONS = 8
+
+# Hosts are counted in this many slots, by a hash of their name.
+# Hosts sharing a slot share its limit, so there are plenty.
+HOST_SLOTS = 256
+
+
+class DownloadGovernor:
+    """
+    Limits the connections open at once to each host, and optionally the total
+    bandwidth of downloads, for every thread of this process and every worker
+    process forked from it after the governor was created.
+    Connections to each host are granted in the order they were asked for,
+    so no worker is starved by others which keep asking.
+    Bandwidth is limited by a token bucket holding up to a second of downloads,
+    so short bursts are allowed, but the average rate is not exceeded.
+    A worker process killed while holding a connection never gives it back,
+    so its host has one fewer connection for the rest of the run.
+    """
+
+    def __init__(self, host_connections: int = DEFAULT_HOST_CONNECTIONS, bandwidth: int = 0):
+        """
+        :param host_connections: int of connections open at once to any one host
+        :param bandwidth: int of bytes per second for all downloads, or 0 for no limit
+        """
+        self.host_connections = host_connections
+        self.bandwidth = bandwidth
+        # Shared memory, so forked workers share the same counts
+        self._condition = multiprocessing.Condition()
+        self._issued = multiprocessing.RawArray("q", HOST_SLOTS)
+        self._released = multiprocessing.RawArray("q", HOST_SLOTS)
+        self._tokens = multiprocessing.RawValue("d", float(bandwidth))
+        self._refilled = multiprocessing.RawValue("d", time.monotonic())
+
+    def host_slot(self, host: str) -> int:
+        """
+        :param host: str of host name, with any port
+        :return: int of the slot its connections are counted in
+        """
+        return zlib.crc32(host.lower().encode("utf-8")) % HOST_SLOTS
+
+    def acquire(self, host: str) -> None:
+        """
+        Waits for a connection to a host to be free, then takes it.
+        Each waiting request is given a ticket, and tickets are served in order.
+        :param host: str of host name, with any port
+        """
+        slot = self.host_slot(host)
+        with self._condition:
+            ticket = self._issued[slot]
+            self._issued[slot] = ticket + 1
+            try:
+                while ticket >= self._released[slot] + self.host_connections:
+                    self._condition.wait()
+            except BaseException:
+                # Give up this ticket, so those after it aren't held up
+                self._released[slot] = self._released[slot] + 1
+                self._condition.notify_all()
+                raise
+
+    def release(self, host: str) -> None:
+        """
+        Gives back a connection to a host, taken with acquire.
+        :param host: str of host name, with any port
+        """
+        slot = self.host_slot(host)
+        with self._condition:
+            self._released[slot] = self._released[slot] + 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def connection(self, url: str):
+        """
+        Holds a connection to the host of a URL for the duration of a with statement.
+        :param url: str of URL
+        """
+        host = urlparse(url).netloc
+        self.acquire(host)
+        try:
+            yield
+        finally:
+            self.release(host)
+
+    def throttle(self, nbytes: int) -> None:
+        """
+        Accounts for bytes just downloaded, waiting if they're over the bandwidth limit.
+        Each wait is as long as the bucket takes to refill by the shortfall, so
+        a worker which has downloaded more waits longer than those which haven't.
+        :param nbytes: int of bytes downloaded
+        """
+        if self.bandwidth <= 0:
+            return
+
+        with self._condition:
+            now = time.monotonic()
+            self._tokens.value = min(
+                float(self.bandwidth),
+                self._tokens.value + (now - self._refilled.value) * self.bandwidth,
+            )
+            self._refilled.value = now
+            self._tokens.value = self._tokens.value - nbytes
+            shortfall = -self._tokens.value
+
+        if shortfall > 0:
+            time.sleep(shortfall / self.bandwidth)
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def reset_after_fork() -> None:
+    """
+    Replaces the lock on the shared governor in a forked child process,
+    in case the parent held it when forking. The governor itself is kept,
+    so the child shares its limits with the parent.
+    """
+
+    global _governor_lock
+    _governor_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def configure(host_connections: int = DEFAULT_HOST_CONNECTIONS, bandwidth: int = 0) -> None:
+    """
+    Sets limits for all later downloads, replacing the current governor.
+    To share limits with worker processes, this must be called before they're forked.
+    :param host_connections: int of connections open at once to any one host
+    :param bandwidth: int of bytes per second for all downloads, or 0 for no limit
+    """
+
+    global _governor
+    with _governor_lock:
+        _governor = DownloadGovernor(host_connections, bandwidth)
+
+
+def get_governor() -> DownloadGovernor:
+    """
+    Gets the shared governor, creating it with the default limits on first use.
+    :return: DownloadGovernor
+    """
+
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = DownloadGovernor()
+        return _governor
@@ -0,0 +1,242 @@
+"""http_client.py - one pooled HTTP session, shared by everything that touches the network."""
+
+import os
+import threading
+import weakref
+from typing import Mapping
+from urllib.parse import urlparse
+
+import requests  # type: ignore
+from requests.adapters import HTTPAdapter  # type: ignore
+
+import kg_obo.governor
+
+# Seconds to wait for a connection, and then between bytes received
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+
+# Connections open at once to any one host, e.g., purl.obolibrary.org.
+# Requests beyond this wait for a connection to be free (see kg_obo.governor).
+DEFAULT_HOST_CONNECTIONS = kg_obo.governor.DEFAULT_HOST_CONNECTIONS
+
+_settings: dict = {
+    "connect_timeout": DEFAULT_CONNECT_TIMEOUT,
+    "read_timeout": DEFAULT_READ_TIMEOUT,
+    "host_connections": DEFAULT_HOST_CONNECTIONS,
+}
+_session = None
+_session_lock = threading.Lock()
+
+
+class GovernedAdapter(HTTPAdapter):
+    """
+    Transport adapter which takes a connection from the download governor
+    for each request it sends, so connections to each host are limited
+    across all workers. Each redirect is sent separately, so it counts
+    against the host it goes to, e.g., GitHub after purl.obolibrary.org.
+    The connection is given back once the response has been read - for
+    a streamed response, once it's closed (or no longer used).
+    """
+
+    def send(self, request, stream=False, **kwargs):
+        governor = kg_obo.governor.get_governor()
+        host = urlparse(request.url).netloc
+        governor.acquire(host)
+        try:
+            response = super().send(request, stream=stream, **kwargs)
+            if not stream:
+                response.content  # Read it all here, so the connection is free once we return
+        except BaseException:
+            governor.release(host)
+            raise
+        if not stream:
+            governor.release(host)
+            return response
+
+        # Released when the response is closed, or else garbage collected
+        release = weakref.finalize(response, governor.release, host)
+        response_ref = weakref.ref(response)
+
+        def close() -> None:
+            closing = response_ref()
+            if closing is not None:
+                requests.Response.close(closing)
+            release()
+
+        response.close = close
+        return response
+
+
+def configure(
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    read_timeout: float = DEFAULT_READ_TIMEOUT,
+    host_connections: int = DEFAULT_HOST_CONNECTIONS,
+    bandwidth: int = 0,
+) -> None:
+    """
+    Sets timeouts and connection limits for all later requests.
+    Connections opened with the previous settings are closed.
+    To share the limits with worker processes, call this before they're forked.
+    :param connect_timeout: float of seconds to wait for a connection
+    :param read_timeout: float of seconds to wait between bytes received
+    :param host_connections: int of connections open at once to any one host
+    :param bandwidth: int of bytes per second for all downloads, or 0 for no limit
+    """
+
+    global _session
+    kg_obo.governor.configure(host_connections, bandwidth)
+    with _session_lock:
+        _settings.update(
+            {
+                "connect_timeout": connect_timeout,
+                "read_timeout": read_timeout,
+                "host_connections": host_connections,
+            }
+        )
+        if _session:
+            _session.close()
+        _session = None
+
+
+def get_session() -> requests.Session:
+    """
+    Gets the shared session, creating it on first use.
+    Its connections are kept alive and reused, so redirects through
+    purl.obolibrary.org and downloads from the same hosts don't open
+    a new connection (and TLS handshake) each time.
+    It's safe to use from several threads at once.
+    :return: requests Session
+    """
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = GovernedAdapter(
+                pool_connections=_settings["host_connections"],
+                pool_maxsize=_settings["host_connections"],
+                pool_block=True,
+            )
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def reset_after_fork() -> None:
+    """
+    Drops the shared session in a forked child process, as its
+    connections belong to the parent. The child opens its own.
+    """
+
+    global _session, _session_lock
+    _session = None
+    _session_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset_after_fork)
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Makes a request with the shared session, using the configured
+    timeouts unless others are given.
+    Streamed responses must be closed (or used in a with statement)
+    so their connection is returned for reuse.
+    :param method: str of HTTP method, e.g., GET
+    :param url: str of URL
+    :param kwargs: any other arguments to requests
+    :return: requests Response
+    """
+
+    kwargs.setdefault("timeout", (_settings["connect_timeout"], _settings["read_timeout"]))
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """
+    Makes a GET request with the shared session, following redirects.
+    :param url: str of URL
+    :param kwargs: any other arguments to requests, e.g., stream
+    :return: requests Response
+    """
+
+    return request("GET", url, **kwargs)
+
+
+def head(url: str, **kwargs) -> requests.Response:
+    """
+    Makes a HEAD request with the shared session.
+    Unlike requests.head, this follows redirects unless told otherwise,
+    as we only ever want the final target.
+    :param url: str of URL
+    :param kwargs: any other arguments to requests
+    :return: requests Response
+    """
+
+    kwargs.setdefault("allow_redirects", True)
+    return request("HEAD", url, **kwargs)
+
+
+def get_validators(url: str, headers: Mapping[str, str]) -> dict:
+    """
+    Gets the validators from a response, for later checks of whether
+    the URL's file has changed: its ETag, Last-Modified, and Content-Length.
+    :param url: str of URL the response was from
+    :param headers: mapping of response headers
+    :return: dict of "url" and each validator, as str, empty if none were sent
+    """
+
+    validators = {
+        "etag": headers.get("ETag", ""),
+        "last_modified": headers.get("Last-Modified", ""),
+        "content_length": headers.get("Content-Length", ""),
+    }
+    if not (validators["etag"] or validators["last_modified"]):
+        return {}
+    validators["url"] = url
+
+    return validators
+
+
+def is_unchanged(url: str, validators: dict) -> bool:
+    """
+    Checks whether a URL's file is unchanged since validators were recorded,
+    with a conditional HEAD request, so no part of the file is downloaded.
+    Servers which ignore the conditions are checked against the
+    validators themselves: the ETag and Last-Modified must each match
+    where recorded, as must the Content-Length where both have one.
+    :param url: str of URL
+    :param validators: dict from get_validators
+    :return: bool, True if unchanged, False if changed or if it can't be told
+    """
+
+    if not validators or validators.get("url") != url:
+        return False
+
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    try:
+        response = head(url, headers=headers)
+    except requests.exceptions.RequestException:
+        return False
+
+    if response.status_code == 304:
+        return True
+    if response.status_code != 200:
+        return False
+
+    current = get_validators(url, response.headers)
+    if not current:
+        return False
+    for validator in ["etag", "last_modified"]:
+        if validators.get(validator) and current[validator] != validators[validator]:
+            return False
+    if validators.get("content_length") and current["content_length"] \
+            and current["content_length"] != validators["content_length"]:
+        return False
+
+    return True
@@ -0,0 +1,83 @@
+"""import_benchmark.py - measures how long each entry point takes to start."""
+
+import csv
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Commands timed, each run in a new Python process from the repository root
+ENTRY_POINTS = {
+    "import kg_obo": ["-c", "import kg_obo"],
+    "run.py --help": ["run.py", "--help"],
+    "get_stats.py --help": ["get_stats.py", "--help"],
+    "transform_only.py --help": ["transform_only.py", "--help"],
+}
+
+# Modules which take a long time to import, so should only be imported
+# on the code paths that use them
+HEAVY_MODULES = ["kgx.cli", "rdflib", "moto", "grape", "git", "curies", "prefixmaps"]
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_command(args: list, runs: int = 5) -> dict:
+    """
+    Times cold starts of a Python command, taking the median over several runs.
+    :param args: list of str arguments to the Python interpreter
+    :param runs: int of number of times to run the command
+    :return: dict of median, min, and max seconds
+    """
+
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=REPO_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        durations.append(time.perf_counter() - start)
+
+    return {"median": round(statistics.median(durations), 3),
+            "min": round(min(durations), 3),
+            "max": round(max(durations), 3)}
+
+
+def get_loaded_modules(statement: str, modules: list = HEAVY_MODULES) -> list:
+    """
+    Finds which of a set of modules are imported by a statement,
+    run in a new Python process.
+    :param statement: str of Python statement, e.g., import kg_obo
+    :param modules: list of str module names to check for
+    :return: list of str names of those modules which were imported
+    """
+
+    check = f"import sys; {statement}; print(' '.join(m for m in {modules!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, "-c", check], cwd=REPO_DIR, check=True,
+                            capture_output=True, text=True).stdout
+
+    return output.split()
+
+
+def benchmark_entry_points(runs: int = 5, outpath: str = "") -> list:
+    """
+    Times cold starts of each entry point, optionally writing a TSV
+    so start times may be compared between builds.
+    :param runs: int of number of times to run each entry point
+    :param outpath: str of path to write TSV to, if any
+    :return: list of dicts, one per entry point
+    """
+
+    results = []
+    for name, args in ENTRY_POINTS.items():
+        result = {"entry_point": name}
+        result.update(time_command(args, runs))
+        results.append(result)
+        print(f"{name}: {result['median']}s (min {result['min']}s, max {result['max']}s)")
+
+    if outpath:
+        with open(outpath, "w", newline="") as outfile:
+            writer = csv.DictWriter(outfile, fieldnames=list(results[0].keys()), delimiter="\t")
+            writer.writeheader()
+            writer.writerows(results)
+
+    return results
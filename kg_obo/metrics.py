@@ -0,0 +1,113 @@
+"""metrics.py - records the time and resources used by each stage of each OBO transform."""
+
+import csv
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from kg_obo.robot_utils import get_peak_rss, reset_peak_rss
+
+METRICS_FILENAME = "run_metrics"
+
+METRICS_FIELDS = [
+    "name",
+    "stage",
+    "seconds",
+    "bytes_downloaded",
+    "bytes_uploaded",
+    "input_bytes",
+    "output_bytes",
+    "peak_rss",
+]
+
+
+def get_path_size(path: str) -> int:
+    """
+    Gets the size of a file, or of all files in a directory.
+    :param path: str of path to file or directory
+    :return: int of bytes, or 0 if the path doesn't exist
+    """
+
+    if os.path.isdir(path):
+        total = 0
+        for root, _, files in os.walk(path):
+            for filename in files:
+                total = total + get_path_size(os.path.join(root, filename))
+        return total
+
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+@contextmanager
+def measure_stage(result: dict, stage: str, input_path: str = "", output_path: str = ""):
+    """
+    Measures one stage of an OBO transform, adding a record of it
+    to the "metrics" list in the OBO's result.
+    The record includes wall time, input and output sizes,
+    and the peak memory of any ROBOT commands run in the stage.
+    Bytes downloaded or uploaded may be set on the record by the caller.
+    The stage is recorded even if it fails.
+    :param result: dict of OBO result, as in new_transform_job
+    :param stage: str name of stage, e.g., relax
+    :param input_path: str of path to stage input file or directory, if any
+    :param output_path: str of path to stage output file or directory, if any
+    :return: dict of this stage's record
+    """
+
+    record: dict = {field: 0 for field in METRICS_FIELDS}
+    record["name"] = result["name"]
+    record["stage"] = stage
+    record["input_bytes"] = get_path_size(input_path) if input_path else 0
+
+    reset_peak_rss()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["seconds"] = round(time.perf_counter() - start, 3)
+        record["output_bytes"] = get_path_size(output_path) if output_path else 0
+        record["peak_rss"] = get_peak_rss()
+        result.setdefault("metrics", []).append(record)
+
+
+def write_metrics(metrics: list, output_dir: str) -> list:
+    """
+    Writes stage records for a run, as both TSV and JSON.
+    :param metrics: list of dicts, each a record from measure_stage
+    :param output_dir: str of directory to write to, e.g., the log directory
+    :return: list of str paths written
+    """
+
+    tsv_path = os.path.join(output_dir, METRICS_FILENAME + ".tsv")
+    json_path = os.path.join(output_dir, METRICS_FILENAME + ".json")
+
+    with open(tsv_path, "w", newline="") as tsv_file:
+        writer = csv.DictWriter(tsv_file, fieldnames=METRICS_FIELDS, delimiter="\t")
+        writer.writeheader()
+        writer.writerows(metrics)
+
+    with open(json_path, "w") as json_file:
+        json.dump(metrics, json_file, indent=2)
+
+    return [tsv_path, json_path]
+
+
+def summarize_metrics(metrics: list) -> dict:
+    """
+    Totals the wall time of each stage across all OBOs.
+    :param metrics: list of dicts, each a record from measure_stage
+    :return: dict of stage name to total seconds, longest first
+    """
+
+    totals: dict = {}
+    for record in metrics:
+        totals[record["stage"]] = totals.get(record["stage"], 0) + record["seconds"]
+
+    return {
+        stage: round(seconds, 3)
+        for stage, seconds in sorted(totals.items(), key=lambda item: -item[1])
+    }
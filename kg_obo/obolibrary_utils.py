@@ -1,27 +1,42 @@
-import urllib
-import requests  # type: ignore
+from concurrent.futures import ThreadPoolExecutor
 
+import kg_obo.http_client
 
-def get_url(oid):
+# URLs are resolved concurrently, as resolving is almost all waiting on the network.
+# Connections to each host are also limited by kg_obo.http_client.
+RESOLVE_WORKERS = 16
+
+
+def url_resolves(url):
     """
-    Retrieve what should be a valid URL for a provided OBO ID,
-    though don't check that here.
+    Returns True if a URL resolves to a file.
+    Missing OBO files may instead resolve to a listing
+    of an S3 bucket, so the first few lines are checked for one.
     """
-    ourl = f"http://purl.obolibrary.org/obo/{oid}/{oid}.owl"
     try:
-        ret = requests.head(ourl, allow_redirects=True)
+        ret = kg_obo.http_client.head(url)
         if ret.status_code != 200:
-            ourl = f"http://purl.obolibrary.org/obo/{oid}.owl"
-        else:
+            return False
+        with kg_obo.http_client.get(url, stream=True) as req:
             i = 0
-            for line in urllib.request.urlopen(ourl):
+            for line in req.iter_lines():
                 i = i + 1
                 if i > 3:
                     break
-                if "ListBucketResult" in line:
-                    ourl = f"http://purl.obolibrary.org/obo/{oid}.owl"
-
+                if b"ListBucketResult" in line:
+                    return False
     except Exception:
+        return False
+
+    return True
+
+def get_url(oid):
+    """
+    Retrieve what should be a valid URL for a provided OBO ID,
+    though don't check that here.
+    """
+    ourl = f"http://purl.obolibrary.org/obo/{oid}/{oid}.owl"
+    if not url_resolves(ourl):
         ourl = f"http://purl.obolibrary.org/obo/{oid}.owl"
 
     return ourl
@@ -32,20 +47,49 @@ def base_url_exists(oid):
     exists, as this means we likely used it in the past.
     """
     base_ourl = f"http://purl.obolibrary.org/obo/{oid}/{oid}-base.owl"
-    base_exists = True
-    try:
-        ret = requests.head(base_ourl, allow_redirects=True)
-        if ret.status_code != 200:
-            base_exists = False
+
+    return url_resolves(base_ourl)
+
+def get_product_url(ontology, product_id):
+    """
+    Returns the URL of a product of an OBO, as listed in its
+    OBO Foundry registry entry, e.g., bfo.owl, or None if not listed.
+    """
+    for product in ontology.get("products", []):
+        if product.get("id") == product_id and product.get("ontology_purl"):
+            return product["ontology_purl"]
+
+    return None
+
+def resolve_url(ontology, check_base=False):
+    """
+    Finds the URL of an OBO from its OBO Foundry registry entry,
+    along with whether its base version exists, if check_base is True.
+    The registry's product URLs are used where listed, so no requests
+    are needed - otherwise, URLs are found with get_url and base_url_exists.
+    Returns a dict of "url" and, if checked, "base_exists".
+    """
+    oid = ontology["id"]
+    url = get_product_url(ontology, f"{oid}.owl")
+    if not url and str(ontology.get("ontology_purl", "")).endswith(".owl"):
+        url = ontology["ontology_purl"]
+    resolved = {"url": url or get_url(oid)}
+
+    if check_base:
+        if "products" in ontology:
+            resolved["base_exists"] = bool(get_product_url(ontology, f"{oid}-base.owl"))
         else:
-            i = 0
-            for line in urllib.request.urlopen(base_ourl):
-                i = i + 1
-                if i > 3:
-                    break
-                if "ListBucketResult" in line:
-                    base_exists = False
-    except Exception:
-        base_exists = False
+            resolved["base_exists"] = base_url_exists(oid)
+
+    return resolved
 
-    return base_exists
+def resolve_urls(ontologies, check_base=False, workers=RESOLVE_WORKERS):
+    """
+    Resolves URLs for many OBOs at once, as resolve_url does for one,
+    with at most workers in flight.
+    Takes a list of OBO Foundry registry entries, and returns a dict
+    of OBO ID to dict of its "url" and, if checked, "base_exists".
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        resolved = executor.map(lambda ontology: resolve_url(ontology, check_base), ontologies)
+        return dict(zip([ontology["id"] for ontology in ontologies], resolved))
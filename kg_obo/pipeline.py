@@ -0,0 +1,100 @@
+"""pipeline.py - runs items through a series of stages, with bounded queues between them."""
+
+import queue
+import threading
+from typing import Callable, Optional
+
+# Placed on the results queue once all items have been fed to the first stage
+FEED_COMPLETE = object()
+
+
+def run_pipeline(
+    items: list,
+    stages: list,
+    queue_size: int = 2,
+    on_result: Optional[Callable] = None,
+) -> list:
+    """
+    Passes each item through a series of stages, each with its own worker threads.
+    Stages are connected by bounded queues, so a fast stage can only get
+    queue_size items ahead of the stage after it. This lets network-bound
+    stages (e.g., downloads, uploads) overlap with CPU-bound stages
+    without buffering every item at once.
+    :param items: list of items to process, in order
+    :param stages: list of tuples of (str name, function, int workers);
+    each function is called with an item and returns True if
+    the item should continue to the next stage
+    :param queue_size: int of maximum number of items waiting before each stage
+    :param on_result: function called with each item once it has left the pipeline,
+    whether after the last stage or earlier; if it returns False, no further items are fed in
+    :return: list of items, in the order they left the pipeline
+    """
+
+    stage_queues: list = [queue.Queue(maxsize=queue_size) for _ in stages]
+    results_queue: queue.Queue = queue.Queue()
+    halted = threading.Event()
+
+    def work(stage_index: int, function: Callable) -> None:
+        while True:
+            item = stage_queues[stage_index].get()
+            if item is None:
+                break
+            try:
+                go_on = function(item)
+            except Exception as e:
+                results_queue.put((item, e))
+                continue
+            if go_on and stage_index + 1 < len(stages):
+                stage_queues[stage_index + 1].put(item)
+            else:
+                results_queue.put((item, None))
+
+    def feed() -> None:
+        fed = 0
+        for item in items:
+            if halted.is_set():
+                break
+            stage_queues[0].put(item)
+            fed = fed + 1
+        results_queue.put((FEED_COMPLETE, fed))
+
+    threads = []
+    for stage_index, (name, function, workers) in enumerate(stages):
+        for worker_index in range(workers):
+            thread = threading.Thread(
+                target=work,
+                args=(stage_index, function),
+                name=f"{name}-{worker_index}",
+                daemon=True,
+            )
+            thread.start()
+            threads.append(thread)
+    threading.Thread(target=feed, name="feed", daemon=True).start()
+
+    results = []
+    first_error = None
+    total = None
+    while total is None or len(results) < total:
+        item, outcome = results_queue.get()
+        if item is FEED_COMPLETE:
+            total = outcome
+            continue
+        results.append(item)
+        if outcome is not None:
+            # Let items already in progress finish before raising
+            print(f"Pipeline stage raised an error: {outcome}")
+            first_error = first_error or outcome
+            halted.set()
+        elif on_result and not on_result(item):
+            halted.set()
+
+    for stage_index, (name, function, workers) in enumerate(stages):
+        for _ in range(workers):
+            stage_queues[stage_index].put(None)
+    for thread in threads:
+        thread.join()
+
+    if first_error:
+        raise first_error
+
+    return results
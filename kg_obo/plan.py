@@ -0,0 +1,259 @@
+"""plan.py - works out what a transform run would do, without running ROBOT or KGX."""
+
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests  # type: ignore
+from tqdm import tqdm  # type: ignore
+
+import kg_obo.http_client
+import kg_obo.obolibrary_utils
+from kg_obo.checkpoint import checkpoint_file, get_checkpoint, has_checkpoints, load_checkpoints
+from kg_obo.metrics import METRICS_FILENAME
+from kg_obo.scheduler import DEFAULT_BYTES_PER_SECOND, get_bytes_per_second, load_previous_durations
+from kg_obo.transform import (
+    KGOBO_TRACK_FILE,
+    download_header,
+    get_owl_iri,
+    imports_requested,
+    load_tracking,
+    retrieve_obofoundry_yaml,
+    transformed_obo_exists,
+)
+
+# OBOs are planned concurrently, as planning is almost all waiting on the network
+PLAN_WORKERS = 16
+
+# Merging imports means retrieving and converting more than the OBO itself,
+# so its size-based cost is scaled up by this much
+MERGE_COST_FACTOR = 2.0
+
+
+def estimate_cost(
+    size: int, needs_merge: bool, previous_seconds: float = 0.0,
+    bytes_per_second: float = DEFAULT_BYTES_PER_SECOND,
+) -> float:
+    """
+    Estimates how long transforming an OBO will take, as scheduler.estimate_costs does.
+    The OBO's previous duration is used where available.
+    Otherwise, ROBOT and KGX time both grow with OBO size, so it is estimated from that.
+    :param size: int of OBO size in bytes
+    :param needs_merge: bool, True if imports must be merged
+    :param previous_seconds: float of seconds the OBO took in the previous run, 0 if unknown
+    :param bytes_per_second: float of transform throughput, from scheduler.get_bytes_per_second
+    :return: float of estimated seconds
+    """
+
+    if previous_seconds > 0:
+        return float(previous_seconds)
+    if needs_merge:
+        return size * MERGE_COST_FACTOR / bytes_per_second
+    return size / bytes_per_second
+
+
+def plan_ontology(
+    ontology: dict,
+    tracking: dict,
+    s3_test=False,
+    replace_base_obos=False,
+    durations: dict = {},
+    bytes_per_second: float = DEFAULT_BYTES_PER_SECOND,
+    data_dir="data",
+    resume=False,
+) -> dict:
+    """
+    Makes the same decisions as fetch_ontology for one OBO,
+    using only its validators or its header.
+    :param ontology: dict of OBO Foundry registry entry for this OBO
+    :param tracking: dict of tracking contents
+    :param s3_test: bool, if True, treat every OBO as new, as a test run does
+    :param replace_base_obos: bool for whether previous base OBO transforms will be replaced
+    :param durations: dict from scheduler.load_previous_durations
+    :param bytes_per_second: float of transform throughput, from scheduler.get_bytes_per_second
+    :param data_dir: str of local dir where the run will save data, including its checkpoints
+    :param resume: bool, if True, the run will continue from any checkpoints left by an interrupted run
+    :return: dict of the planned action for this OBO, with its version,
+    size, imports, and estimated seconds
+    """
+
+    ontology_name = ontology["id"]
+    entry = {
+        "name": ontology_name,
+        "action": "failed",
+        "url": "",
+        "iri": "",
+        "version": "",
+        "version_format": "",
+        "bytes": 0,
+        "imports": [],
+        "needs_merge": False,
+        "resume": False,
+        "download_bytes": 0,
+        "estimated_cost": 0.0,
+    }
+
+    # Get OBO URL and whether it has a base version, from its registry entry if listed there
+    resolved = kg_obo.obolibrary_utils.resolve_url(ontology, check_base=replace_base_obos)
+    url = resolved["url"]
+    entry["url"] = url
+    replace_previous_transform = replace_base_obos and resolved.get("base_exists", False)
+
+    # As in fetch_ontology, a file unchanged since its current version was tracked is skipped
+    # without retrieving its header, unless an unfinished transform of it may be resumed
+    checkpoint_path = checkpoint_file(data_dir, ontology_name)
+    tracked_validators = tracking.get("ontologies", {}).get(ontology_name, {}).get("validators", {})
+    if (
+        tracked_validators
+        and not replace_previous_transform
+        and not (resume and load_checkpoints(checkpoint_path))
+        and kg_obo.http_client.is_unchanged(url, tracked_validators)
+    ):
+        entry["action"] = "existing"
+        return entry
+
+    with tempfile.NamedTemporaryFile(prefix=ontology_name, delete=False) as tfile:
+        header_file = tfile.name
+    try:
+        try:
+            entry["bytes"] = download_header(url, header_file)
+        except (KeyError, ValueError, requests.exceptions.RequestException) as e:
+            entry["error"] = str(e)
+            return entry
+
+        owl_iri, owl_version, owl_version_format = get_owl_iri(header_file)
+        entry["iri"] = owl_iri
+        entry["version"] = owl_version
+        entry["version_format"] = owl_version_format
+
+        # An interrupted run may have added this version to tracking
+        # before it finished uploading, so it's finished regardless
+        entry["resume"] = resume and has_checkpoints(checkpoint_path, owl_version)
+        if (
+            transformed_obo_exists(ontology_name, owl_iri, s3_test, tracking=tracking)
+            and not replace_previous_transform
+            and not entry["resume"]
+        ):
+            entry["action"] = "existing"
+            return entry
+
+        entry["action"] = "transform"
+        entry["imports"] = imports_requested(header_file)
+        entry["needs_merge"] = len(entry["imports"]) > 0
+        # A checkpointed download needn't be repeated
+        if not (resume and get_checkpoint(checkpoint_path, owl_version, "download")):
+            entry["download_bytes"] = entry["bytes"]
+        entry["estimated_cost"] = estimate_cost(
+            entry["bytes"],
+            entry["needs_merge"],
+            durations.get(ontology_name, {}).get("seconds", 0.0),
+            bytes_per_second,
+        )
+    finally:
+        os.remove(header_file)
+
+    return entry
+
+
+def make_plan(
+    skip: list = [],
+    get_only: list = [],
+    bucket="bucket",
+    s3_test=False,
+    replace_base_obos=False,
+    plan_path: str = "plan.json",
+    track_file_local_path: str = "data/tracking.yaml",
+    tracking_file_remote_path: str = KGOBO_TRACK_FILE,
+    plan_workers: int = PLAN_WORKERS,
+    log_dir="logs",
+    data_dir="data",
+    resume=False,
+) -> dict:
+    """
+    Determines which OBOs a transform run would transform,
+    how much it would need to download, and which OBOs need imports merged.
+    Only OBO headers are retrieved, many at once, and tracking.yaml is read once.
+    Costs are estimated as a run orders OBOs, from the previous run's metrics.
+    Nothing is locked, uploaded, or transformed.
+    :param skip: list of OBOs to skip, by ID
+    :param get_only: list of OBOs to plan, by ID (otherwise do all)
+    :param bucket: str of S3 bucket
+    :param s3_test: bool, if True, don't read tracking - every OBO is treated as new
+    :param replace_base_obos: bool for whether previous base OBO transforms will be replaced
+    :param plan_path: str of path to write the plan to, as JSON
+    :param track_file_local_path: str of local path for tracking file
+    :param tracking_file_remote_path: str of path of tracking file on S3
+    :param plan_workers: int of how many OBOs to plan at once
+    :param log_dir: str of local dir where the previous run's metrics were written
+    :param data_dir: str of local dir where the run will save data, including its checkpoints
+    :param resume: bool, if True, the run will continue from any checkpoints left by an interrupted run
+    :return: dict of plan, with a summary and an entry for each OBO
+    """
+
+    kg_obo_logger = logging.getLogger("kg-obo")
+
+    if s3_test:
+        tracking: dict = {"ontologies": {}}
+    else:
+        os.makedirs(os.path.dirname(track_file_local_path) or ".", exist_ok=True)
+        tracking = load_tracking(
+            bucket, track_file_local_path, tracking_file_remote_path
+        )
+
+    yaml_onto_list_filtered = retrieve_obofoundry_yaml(skip=skip, get_only=get_only)
+
+    durations = load_previous_durations(os.path.join(log_dir, METRICS_FILENAME + ".json"))
+    bytes_per_second = get_bytes_per_second(durations)
+
+    def plan_one(ontology: dict) -> dict:
+        return plan_ontology(
+            ontology, tracking, s3_test, replace_base_obos,
+            durations, bytes_per_second, data_dir, resume,
+        )
+
+    with ThreadPoolExecutor(max_workers=plan_workers) as executor:
+        entries = list(
+            tqdm(
+                executor.map(plan_one, yaml_onto_list_filtered),
+                total=len(yaml_onto_list_filtered),
+                desc="planning ontologies",
+            )
+        )
+
+    to_transform = [entry for entry in entries if entry["action"] == "transform"]
+    summary = {
+        "ontologies": len(entries),
+        "transform": [entry["name"] for entry in to_transform],
+        "existing": [entry["name"] for entry in entries if entry["action"] == "existing"],
+        "failed": [entry["name"] for entry in entries if entry["action"] == "failed"],
+        "needs_merge": [entry["name"] for entry in to_transform if entry["needs_merge"]],
+        "resume": [entry["name"] for entry in to_transform if entry["resume"]],
+        "download_bytes": sum(entry["download_bytes"] for entry in to_transform),
+        "estimated_cost": sum(entry["estimated_cost"] for entry in to_transform),
+    }
+    plan = {
+        "created": datetime.now().isoformat(),
+        "summary": summary,
+        "ontologies": entries,
+    }
+
+    with open(plan_path, "w") as plan_file:
+        json.dump(plan, plan_file, indent=2)
+
+    kg_obo_logger.info(
+        f"Planned {len(to_transform)} transforms, downloading {summary['download_bytes']} bytes."
+    )
+    print(f"Wrote plan to {plan_path}.")
+    print(f"Will transform {len(to_transform)} of {len(entries)}: {summary['transform']}")
+    print(f"Will download {summary['download_bytes']} bytes.")
+    print(f"Will merge imports for {len(summary['needs_merge'])}: {summary['needs_merge']}")
+    print(f"Will take an estimated {round(summary['estimated_cost'])} seconds.")
+    if len(summary["resume"]) > 0:
+        print(f"Will resume {len(summary['resume'])}: {summary['resume']}")
+    if len(summary["failed"]) > 0:
+        print(f"Could not plan {len(summary['failed'])}: {summary['failed']}")
+
+    return plan
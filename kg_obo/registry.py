@@ -0,0 +1,151 @@
+"""registry.py - the OBO Foundry registry of ontologies, kept on disk between runs."""
+
+import hashlib
+import json
+import logging
+import os
+
+import requests  # type: ignore
+import yaml  # type: ignore
+
+import kg_obo.http_client
+
+# The libyaml loader is many times faster than the pure Python one,
+# but libyaml isn't always available
+try:
+    from yaml import CSafeLoader as SafeLoader  # type: ignore
+except ImportError:
+    from yaml import SafeLoader  # type: ignore
+
+REGISTRY_URL = "https://raw.githubusercontent.com/OBOFoundry/OBOFoundry.github.io/master/registry/ontologies.yml"
+REGISTRY_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "kg-obo", "registry")
+
+
+def select_ids(ids, skip: list = [], get_only: list = []) -> set:
+    """
+    Selects OBO IDs to work on, from all of those available.
+    If any are to be skipped, get_only is ignored.
+    :param ids: iterable of str OBO IDs, e.g., bfo
+    :param skip: list of OBO IDs to skip
+    :param get_only: list of OBO IDs to select (otherwise select all)
+    :return: set of str OBO IDs
+    """
+
+    if len(skip) > 0:
+        return set(ids) - set(skip)
+    if len(get_only) > 0:
+        return set(ids) & set(get_only)
+    return set(ids)
+
+
+class Registry:
+    """
+    Entries of the OBO Foundry registry, indexed by OBO ID.
+    The entries keep the order of the registry file.
+    """
+
+    def __init__(self, ontologies: list):
+        """
+        :param ontologies: list of dicts of registry entries, each with an "id"
+        """
+        self.ontologies = ontologies
+        self.by_id = {ontology["id"]: ontology for ontology in ontologies}
+        self.obsolete = {
+            ontology["id"] for ontology in ontologies if ontology.get("is_obsolete")
+        }
+
+    def __contains__(self, oid: str) -> bool:
+        return oid in self.by_id
+
+    def __getitem__(self, oid: str) -> dict:
+        return self.by_id[oid]
+
+    def __len__(self) -> int:
+        return len(self.ontologies)
+
+    def ids(self) -> set:
+        """
+        :return: set of str IDs of OBOs which aren't obsolete
+        """
+        return set(self.by_id) - self.obsolete
+
+    def select(self, skip: list = [], get_only: list = []) -> list:
+        """
+        Selects registry entries to work on, as select_ids, leaving out obsolete OBOs.
+        :param skip: list of OBO IDs to skip
+        :param get_only: list of OBO IDs to select (otherwise select all)
+        :return: list of dicts of registry entries, in registry order
+        """
+        selected = select_ids(self.ids(), skip, get_only)
+        return [ontology for ontology in self.ontologies if ontology["id"] in selected]
+
+
+def fetch_registry(url: str = REGISTRY_URL, cache_dir: str = REGISTRY_CACHE_DIR) -> bytes:
+    """
+    Gets the registry file, from the copy cached by a previous run if it's
+    still current. The cached copy is revalidated with a conditional request,
+    so an unchanged registry isn't downloaded again. If the request fails,
+    the cached copy is used regardless.
+    :param url: str of URL of the registry YAML
+    :param cache_dir: str of directory to cache it in, created if needed
+    :return: bytes of registry YAML
+    """
+
+    kg_obo_logger = logging.getLogger("kg-obo")
+
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_name = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, cache_name + ".yml")
+    meta_path = os.path.join(cache_dir, cache_name + ".json")
+
+    meta: dict = {}
+    if os.path.exists(cache_path):
+        try:
+            with open(meta_path, "r") as meta_file:
+                meta = json.load(meta_file)
+        except (IOError, ValueError):
+            pass
+
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        req = kg_obo.http_client.get(url, headers=headers)
+        if req.status_code != 304:
+            req.raise_for_status()
+            content = req.content
+            for path, data in [
+                (cache_path, content),
+                (meta_path, json.dumps({"url": url,
+                                        "etag": req.headers.get("ETag", ""),
+                                        "last_modified": req.headers.get("Last-Modified", "")
+                                        }).encode("utf-8")),
+            ]:
+                temp_path = f"{path}.{os.getpid()}.tmp"
+                with open(temp_path, "wb") as outfile:
+                    outfile.write(data)
+                os.replace(temp_path, path)
+            return content
+        kg_obo_logger.info(f"Registry at {url} has not changed - using cached copy.")
+    except requests.exceptions.RequestException as e:
+        if not os.path.exists(cache_path):
+            raise e
+        kg_obo_logger.warning(f"Could not retrieve registry from {url} - using cached copy: {e}")
+        print(f"Could not retrieve registry from {url} - using cached copy.")
+
+    with open(cache_path, "rb") as cache_file:
+        return cache_file.read()
+
+
+def load_registry(url: str = REGISTRY_URL, cache_dir: str = REGISTRY_CACHE_DIR) -> Registry:
+    """
+    Gets and parses the OBO Foundry registry.
+    :param url: str of URL of the registry YAML
+    :param cache_dir: str of directory to cache it in
+    :return: Registry of its entries
+    """
+
+    return Registry(yaml.load(fetch_registry(url, cache_dir), Loader=SafeLoader)["ontologies"])
@@ -1,26 +1,378 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import hashlib
 import os
-from typing import Dict
+import re
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING, Dict
 
 import sh  # type: ignore
-from curies import Converter  # type: ignore
 from sh import chmod  # type: ignore
 from sh import sed  # type: ignore
 
 from post_setup.post_setup import robot_setup
 
+if TYPE_CHECKING:
+    from curies import Converter  # type: ignore
+
 # Note that sh module can take environment variables, see
 # https://amoffat.github.io/sh/sections/special_arguments.html#env
 
-def initialize_robot(robot_path: str) -> list:
+MEMORY_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+
+# Seconds between checks of ROBOT memory use
+ROBOT_RSS_INTERVAL = 0.5
+
+# ROBOT heap for OBOs with nothing to size it by, as a Java heap size.
+# OBOs whose imports are merged get at least this until ROBOT's peak for them is known,
+# as merging loads the imported ontologies, which their own size says nothing about.
+DEFAULT_ROBOT_HEAP = "12g"
+
+# Otherwise, the heap is this many times the OBO's size, or this much more
+# than ROBOT's previous peak memory use for it, whichever is larger,
+# but never less than MIN_ROBOT_HEAP, and in steps of ROBOT_HEAP_STEP
+ROBOT_HEAP_PER_BYTE = 16
+ROBOT_HEAP_HEADROOM = 1.25
+MIN_ROBOT_HEAP = "1g"
+ROBOT_HEAP_STEP = "256m"
+
+# Heaps up to this size are collected by the serial GC, which needs less memory
+# and fewer threads alongside the heap than G1, so suits many small ROBOTs at once
+SERIAL_GC_MAX_HEAP = "2g"
+
+# Peak memory use of ROBOT commands run by each thread,
+# since that thread last called reset_peak_rss
+robot_usage = threading.local()
+
+# Java class data sharing archives of ROBOT's classes, kept between runs.
+# Each ROBOT command starts a new Java process, which would otherwise load
+# and verify the same classes from robot.jar every time.
+ROBOT_CLASS_ARCHIVE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "kg-obo", "robot")
+
+# Archives of application classes, made at exit, need JDK 13 or later
+CLASS_ARCHIVE_MIN_JAVA_VERSION = 13
+
+# A tiny ontology for ROBOT to process while its classes are archived
+CLASS_ARCHIVE_TRAINING_OWL = """<?xml version="1.0"?>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+         xmlns:rdfs="http://www.w3.org/2000/01/rdf-schema#"
+         xmlns:owl="http://www.w3.org/2002/07/owl#">
+    <owl:Ontology rdf:about="http://purl.obolibrary.org/obo/kgobo_training.owl"/>
+    <owl:Class rdf:about="http://purl.obolibrary.org/obo/KGOBO_0000001">
+        <rdfs:label>root</rdfs:label>
+    </owl:Class>
+    <owl:Class rdf:about="http://purl.obolibrary.org/obo/KGOBO_0000002">
+        <rdfs:subClassOf rdf:resource="http://purl.obolibrary.org/obo/KGOBO_0000001"/>
+    </owl:Class>
+</rdf:RDF>
+"""
+
+def parse_memory_size(size: str) -> int:
+    """
+    Converts a memory size in Java heap format (e.g., 12g, 512m)
+    to a number of bytes.
+    :param size: str of memory size, with optional unit suffix
+    :return: int of bytes
+    """
+
+    size_match = re.fullmatch(r"(\d+)([kmgt]?)b?", size.strip().lower())
+    if not size_match:
+        raise ValueError(f"Could not parse memory size: {size}")
+
+    return int(size_match.group(1)) * MEMORY_UNITS[size_match.group(2)]
+
+def get_robot_heap(robot_env: dict) -> int:
+    """
+    Finds the maximum heap size ROBOT will be allowed to use,
+    as set by -Xmx in ROBOT_JAVA_ARGS.
+    :param robot_env: dict of environment variables, including ROBOT_JAVA_ARGS
+    :return: int of bytes, or 0 if no maximum heap is set
+    """
+
+    heap_match = re.search(r"-Xmx(\S+)", robot_env.get('ROBOT_JAVA_ARGS', ''))
+    if not heap_match:
+        return 0
+
+    return parse_memory_size(heap_match.group(1))
+
+def format_memory_size(size: int) -> str:
+    """
+    Converts a number of bytes to a memory size in Java heap format,
+    rounded down to whole megabytes.
+    :param size: int of bytes
+    :return: str of memory size, e.g., 12g or 1536m
+    """
+
+    if size % MEMORY_UNITS["g"] == 0:
+        return f"{size // MEMORY_UNITS['g']}g"
+
+    return f"{size // MEMORY_UNITS['m']}m"
+
+def choose_robot_heap(input_size: int = 0, previous_peak: int = 0, cap: int = 0,
+                      default: int = 0, needs_merge: bool = True) -> int:
+    """
+    Chooses how large a heap ROBOT should have for one OBO, from the size
+    of its file and the peak memory ROBOT used for it in a previous run.
+    :param input_size: int of bytes of OBO file, or 0 if unknown
+    :param previous_peak: int of bytes of previous ROBOT peak memory use, or 0 if unknown
+    :param cap: int of most bytes to allow, or 0 for no limit
+    :param default: int of bytes, for OBOs whose size and peak are both unknown,
+    or 0 for DEFAULT_ROBOT_HEAP
+    :param needs_merge: bool, True if the OBO's imports will be merged, or if that
+    isn't known yet - without a previous peak, these get at least the default
+    :return: int of bytes
+    """
+
+    default = default or parse_memory_size(DEFAULT_ROBOT_HEAP)
+    if input_size <= 0 and previous_peak <= 0:
+        heap = default
+    else:
+        heap = max(
+            parse_memory_size(MIN_ROBOT_HEAP),
+            input_size * ROBOT_HEAP_PER_BYTE,
+            int(previous_peak * ROBOT_HEAP_HEADROOM),
+        )
+        step = parse_memory_size(ROBOT_HEAP_STEP)
+        heap = -(-heap // step) * step
+        if needs_merge and previous_peak <= 0:
+            heap = max(heap, default)
+
+    if cap > 0:
+        heap = min(heap, cap)
+
+    return heap
+
+def set_robot_heap(robot_env: dict, heap: int) -> dict:
+    """
+    Sets the heap of ROBOT, and a garbage collector to suit it,
+    keeping any other ROBOT_JAVA_ARGS.
+    :param robot_env: dict of environment variables, including ROBOT_JAVA_ARGS
+    :param heap: int of bytes of heap
+    :return: dict of environment variables - a copy, so robot_env is unchanged
+    """
+
+    java_args = re.sub(r"-Xmx\S+|-XX:\+Use\w+GC", "", robot_env.get('ROBOT_JAVA_ARGS', ''))
+    if heap <= parse_memory_size(SERIAL_GC_MAX_HEAP):
+        gc = "-XX:+UseSerialGC"
+    else:
+        gc = "-XX:+UseG1GC"
+
+    env = robot_env.copy()
+    env['ROBOT_JAVA_ARGS'] = " ".join([f"-Xmx{format_memory_size(heap)}", gc] + java_args.split())
+
+    return env
+
+def get_process_tree(pid: int) -> list:
+    """
+    Finds a process and all of its descendants, e.g.,
+    the ROBOT wrapper script and the Java process it starts.
+    Only available where /proc is (i.e., Linux).
+    :param pid: int of process ID
+    :return: list of int process IDs, including pid
+    """
+
+    children: Dict[int, list] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return [pid]
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(os.path.join("/proc", entry, "stat"), "r") as stat_file:
+                stat = stat_file.read()
+        except OSError:  # Process has already exited
+            continue
+        # Process names may contain spaces, so parse after the closing parenthesis
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+
+    tree = [pid]
+    for member in tree:
+        tree.extend(children.get(member, []))
+
+    return tree
+
+def read_peak_rss(pid: int) -> int:
+    """
+    Reads the peak resident memory of a process so far (VmHWM).
+    :param pid: int of process ID
+    :return: int of bytes, or 0 if not available
+    """
+
+    try:
+        with open(os.path.join("/proc", str(pid), "status"), "r") as status_file:
+            for line in status_file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    return 0
+
+def reset_peak_rss() -> None:
+    """
+    Starts a new measurement of ROBOT peak memory use for this thread.
+    """
+
+    robot_usage.peak_rss = 0
+
+def get_peak_rss() -> int:
+    """
+    Gets the highest peak memory use of any ROBOT command
+    run by this thread since reset_peak_rss was last called.
+    :return: int of bytes, or 0 if no ROBOT command was measured
+    """
+
+    return getattr(robot_usage, "peak_rss", 0)
+
+def run_robot(robot_command: sh.Command, *args, **kwargs):
+    """
+    Runs a ROBOT command, waiting for it to complete as usual,
+    while sampling the peak memory use of ROBOT and its Java process.
+    The peak is available from get_peak_rss afterwards.
+    :param robot_command: sh Command for ROBOT
+    :param args: arguments for the ROBOT command
+    :param kwargs: sh special keyword arguments, e.g., _env
+    :return: sh RunningCommand of the completed command
+    :raises sh.ErrorReturnCode: as usual, if ROBOT returns an error
+    """
+
+    process = robot_command(*args, _bg=True, _bg_exc=False, **kwargs)
+
+    peaks: Dict[int, int] = {}
+    while process.is_alive():
+        for member in get_process_tree(process.pid):
+            peaks[member] = max(peaks.get(member, 0), read_peak_rss(member))
+        time.sleep(ROBOT_RSS_INTERVAL)
+
+    robot_usage.peak_rss = max(get_peak_rss(), sum(peaks.values()))
+
+    process.wait()
+
+    return process
+
+def get_java_version(robot_env: dict) -> str:
+    """
+    Gets the version of the Java that ROBOT runs on.
+    :param robot_env: dict of environment variables, including PATH
+    :return: str of the output of java -version, or "" if Java isn't available
+    """
+
+    try:
+        return str(sh.Command("java", search_paths=robot_env.get("PATH", "").split(os.pathsep))(
+            "-version", _env=robot_env, _err_to_out=True
+        ))
+    except (sh.CommandNotFound, sh.ErrorReturnCode):
+        return ""
+
+def parse_java_version(version: str) -> int:
+    """
+    Finds the major version of Java, from the output of java -version.
+    :param version: str of output of java -version
+    :return: int of major version, e.g., 8 for 1.8.0_292, or 0 if not found
+    """
+
+    version_match = re.search(r'version "(\d+)(?:\.(\d+))?', version)
+    if not version_match:
+        return 0
+
+    major = int(version_match.group(1))
+    if major == 1 and version_match.group(2):
+        major = int(version_match.group(2))
+
+    return major
+
+def get_class_archive(robot_path: str, robot_env: dict,
+                      archive_dir: str = ROBOT_CLASS_ARCHIVE_DIR) -> str:
+    """
+    Gets a Java class data sharing archive of the classes ROBOT uses to
+    read, relax, merge, export and convert an ontology, making it if needed.
+    An archive only works with the Java and robot.jar it was made with,
+    so each pair gets its own, made once by running those commands
+    on a tiny ontology. If that fails, a marker is left in place of the
+    archive so it isn't tried again for the same pair.
+    :param robot_path: Path to ROBOT files, with robot.jar alongside
+    :param robot_env: dict of environment variables, including ROBOT_JAVA_ARGS
+    :param archive_dir: str of directory to keep archives in, created if needed
+    :return: str of archive path, or "" if this Java can't make one
+    """
+
+    java_version = get_java_version(robot_env)
+    if parse_java_version(java_version) < CLASS_ARCHIVE_MIN_JAVA_VERSION:
+        return ""
+
+    jar_path = os.path.join(os.path.dirname(os.path.abspath(robot_path)), "robot.jar")
+    try:
+        jar_stat = os.stat(jar_path)
+    except OSError:
+        return ""
+    archive_key = hashlib.sha256(
+        f"{java_version}\n{jar_stat.st_size}\n{jar_stat.st_mtime_ns}".encode("utf-8")
+    ).hexdigest()[:16]
+    archive_path = os.path.join(archive_dir, f"robot-{archive_key}.jsa")
+    if os.path.exists(archive_path):
+        return archive_path
+    # Training that failed once would fail again, so it isn't retried every run
+    failed_path = os.path.join(archive_dir, f"robot-{archive_key}.failed")
+    if os.path.exists(failed_path):
+        return ""
+
+    print(f"Archiving ROBOT classes to {archive_path}...")
+    os.makedirs(archive_dir, exist_ok=True)
+    # Java writes the archive as it exits, so it's only moved into place once complete
+    temp_archive_path = os.path.join(archive_dir, f"robot-{archive_key}.{os.getpid()}.tmp.jsa")
+    training_env = robot_env.copy()
+    training_env['ROBOT_JAVA_ARGS'] = (
+        f"{robot_env.get('ROBOT_JAVA_ARGS', '')} -XX:ArchiveClassesAtExit={temp_archive_path}"
+    ).strip()
+    error = ""
+    with tempfile.TemporaryDirectory() as td:
+        training_owl = os.path.join(td, "training.owl")
+        with open(training_owl, "w") as owl_file:
+            owl_file.write(CLASS_ARCHIVE_TRAINING_OWL)
+        try:
+            sh.Command(robot_path)('relax',
+                '--input', training_owl,
+                'merge',
+                'export',
+                '--header', 'ID',
+                '--export', os.path.join(td, "training.ids.csv"),
+                'convert',
+                '--format', 'json',
+                '--output', os.path.join(td, "training.json"),
+                _env=training_env,
+                _timeout=600
+            )
+        except (sh.ErrorReturnCode, sh.TimeoutException) as e:
+            error = str(e)
+    if error or not os.path.exists(temp_archive_path):
+        print(f"Could not archive ROBOT classes: {error or 'no archive was written'}")
+        # Any partial archive is unusable
+        if os.path.exists(temp_archive_path):
+            os.remove(temp_archive_path)
+        with open(failed_path, "w") as failed_file:
+            failed_file.write(error)
+        return ""
+    os.replace(temp_archive_path, archive_path)
+    print("Complete.")
+
+    return archive_path
+
+def initialize_robot(robot_path: str, share_classes: bool = True) -> list:
     """
     This initializes ROBOT with necessary configuration.
     During install, ROBOT is downloaded to the same directory as kg-obo,
     and the path variable used here is only necessary if it varies from
     the kg-obo location.
+    With share_classes, every ROBOT command starts with its classes loaded
+    from a shared archive (see get_class_archive), if its Java supports one.
     :param path: Path to ROBOT files.
+    :param share_classes: bool, if True, use (and if needed, make) a class archive
     :return: A list consisting an instance of Command and dict of all environment variables.
     """
 
@@ -35,7 +387,13 @@ def initialize_robot(robot_path: str) -> list:
     env = os.environ.copy()
     # (JDK compatibility issue: https://stackoverflow.com/questions/49962437/unrecognized-vm-option-useparnewgc-error-could-not-create-the-java-virtual)
     # env['ROBOT_JAVA_ARGS'] = '-Xmx8g -XX:+UseConcMarkSweepGC' # for JDK 9 and older
-    env['ROBOT_JAVA_ARGS'] = '-Xmx12g -XX:+UseG1GC'  # For JDK 10 and over
+    env['ROBOT_JAVA_ARGS'] = f'-Xmx{DEFAULT_ROBOT_HEAP} -XX:+UseG1GC'  # For JDK 10 and over
+
+    if share_classes:
+        archive_path = get_class_archive(robot_path, env)
+        if archive_path:
+            # Java falls back to loading classes from the jar if the archive can't be used
+            env['ROBOT_JAVA_ARGS'] = f"{env['ROBOT_JAVA_ARGS']} -XX:SharedArchiveFile={archive_path} -Xshare:auto"
 
     try:
         robot_command = sh.Command(robot_path)
@@ -63,7 +421,7 @@ def relax_owl(robot_path: str, input_owl: str, output_owl: str, robot_env: dict)
     robot_command = sh.Command(robot_path)
 
     try:
-        robot_command('relax',
+        run_robot(robot_command, 'relax',
             '--input', input_owl, 
             '--output', output_owl,
             '-vvv',
@@ -97,7 +455,7 @@ def convert_owl(robot_path: str, input_owl: str, output: str, robot_env: dict) -
     robot_command = sh.Command(robot_path)
 
     try:
-        robot_command('convert',
+        run_robot(robot_command, 'convert',
             '--input', input_owl,
             '--format', 'json',
             '--output', output,
@@ -109,7 +467,7 @@ def convert_owl(robot_path: str, input_owl: str, output: str, robot_env: dict) -
         print(f"ROBOT encountered an error: {e}")
         print("Will try to repair by removing object properties...")
         try:
-            robot_command('remove',
+            run_robot(robot_command, 'remove',
                 '--input', input_owl,
                 '--select', 'object-properties',
                 '--output', output,
@@ -120,7 +478,7 @@ def convert_owl(robot_path: str, input_owl: str, output: str, robot_env: dict) -
             print(f"ROBOT encountered another error: {e}")
             print("Will try to repair by removing comments..")
             try:
-                robot_command('remove',
+                run_robot(robot_command, 'remove',
                     '--input', input_owl,
                     '--term', 'rdfs:comment',
                     '--output', output,
@@ -131,7 +489,7 @@ def convert_owl(robot_path: str, input_owl: str, output: str, robot_env: dict) -
                 print(f"ROBOT encountered yet another error: {e}")
                 print("Will try to repair by removing IAO:0000115...")
                 try:
-                    robot_command('remove',
+                    run_robot(robot_command, 'remove',
                         '--input', input_owl,
                         '--exclude-term', 'IAO:0000115',
                         '--output', output,
@@ -142,6 +500,17 @@ def convert_owl(robot_path: str, input_owl: str, output: str, robot_env: dict) -
                     print(f"ROBOT encountered yet a further error: {e}")
                     return False
 
+    neutralize_prefixes(output)
+
+    return success
+
+
+def neutralize_prefixes(output: str) -> None:
+    """
+    Fixes invalid "file:" prefixes in a file converted by ROBOT.
+    :param output: Converted ontology file, rewritten in place
+    """
+
     # Neutralize invalid prefixes.
     print("Replacing any invalid prefixes...")
     sed(['-i', 
@@ -149,8 +518,6 @@ def convert_owl(robot_path: str, input_owl: str, output: str, robot_env: dict) -
         output]
     )
 
-    return success
-
 
 def merge_and_convert_owl(robot_path: str, input_owl: str, output: str, robot_env: dict) -> bool:
     """
@@ -170,7 +537,7 @@ def merge_and_convert_owl(robot_path: str, input_owl: str, output: str, robot_en
     robot_command = sh.Command(robot_path)
 
     try:
-        robot_command('merge',
+        run_robot(robot_command, 'merge',
             '--input', input_owl,
             'convert', 
             '--output', output,
@@ -186,6 +553,105 @@ def merge_and_convert_owl(robot_path: str, input_owl: str, output: str, robot_en
 
     return success
 
+class RobotChain:
+    """
+    Builds one ROBOT command from several, chained so the ontology is
+    parsed once, handed from each command to the next, and only written
+    out where a command is given an output.
+    Commands are added in the order they run, e.g.,
+    RobotChain(input_owl).relax(relaxed_owl).convert(output_json).run(...)
+    """
+
+    def __init__(self, input_owl: str):
+        """
+        :param input_owl: Ontology file for the first command to read
+        """
+        self.input_owl = input_owl
+        self.commands: list = []
+
+    def add(self, command: str, *args) -> "RobotChain":
+        """
+        Adds any ROBOT command to the chain.
+        :param command: str of ROBOT command, e.g., relax
+        :param args: str arguments for the command, other than --input
+        :return: this RobotChain
+        """
+        self.commands.append([command, *args])
+        return self
+
+    def relax(self, output_owl: str) -> "RobotChain":
+        """
+        Relaxes the ontology, as relax_owl.
+        :param output_owl: Ontology file to save the relaxed ontology to
+        :return: this RobotChain
+        """
+        return self.add('relax', '--output', output_owl)
+
+    def merge(self, output_owl: str) -> "RobotChain":
+        """
+        Merges the ontology's imports into it, as merge_and_convert_owl.
+        :param output_owl: Ontology file to save the merged ontology to
+        :return: this RobotChain
+        """
+        return self.add('merge', '--output', output_owl)
+
+    def export_ids(self, output_csv: str) -> "RobotChain":
+        """
+        Exports the ID of every entity, as examine_owl_names.
+        :param output_csv: CSV file to export IDs to
+        :return: this RobotChain
+        """
+        return self.add('export', '--header', 'ID', '--export', output_csv)
+
+    def convert(self, output: str, output_format: str = 'json') -> "RobotChain":
+        """
+        Saves the ontology in another format, as convert_owl.
+        Unlike convert_owl, there's no repair if this fails.
+        :param output: Ontology file to be created
+        :param output_format: str of ROBOT format
+        :return: this RobotChain
+        """
+        return self.add('convert', '--format', output_format, '--output', output)
+
+    def arguments(self) -> list:
+        """
+        :return: list of str arguments for ROBOT, with the input given to the first command
+        """
+        arguments: list = []
+        for i, command in enumerate(self.commands):
+            arguments.append(command[0])
+            if i == 0:
+                arguments.extend(['--input', self.input_owl])
+            arguments.extend(command[1:])
+        return arguments
+
+    def run(self, robot_path: str, robot_env: dict) -> bool:
+        """
+        Runs the chain as one ROBOT command.
+        Has a three-hour timeout limit - process is killed if it takes this long.
+        :param robot_path: Path to ROBOT files
+        :param robot_env: dict of environment variables, including ROBOT_JAVA_ARGS
+        :return: True if completed without errors, False if errors
+        """
+
+        steps = ", ".join(command[0] for command in self.commands)
+        print(f"Running ROBOT {steps} on {self.input_owl}...")
+
+        robot_command = sh.Command(robot_path)
+
+        try:
+            run_robot(robot_command, *self.arguments(),
+                _env=robot_env,
+                _timeout=10800
+            )
+            print("Complete.")
+            success = True
+        except sh.ErrorReturnCode_1 as e: # If ROBOT runs but returns an error
+            print(f"ROBOT encountered an error: {e}")
+            success = False
+
+        return success
+
 def measure_owl(robot_path: str, input_owl: str, output_log: str, robot_env: dict) -> bool:
     """
     This method runs the ROBOT measure command on a single OBO in OWL.
@@ -205,7 +671,7 @@ def measure_owl(robot_path: str, input_owl: str, output_log: str, robot_env: dic
     profile = 'Full'
 
     try:
-        robot_command('measure',
+        run_robot(robot_command, 'measure',
             '--input', input_owl,
             '--format', 'tsv',
             '--metrics', 'all',
@@ -223,9 +689,10 @@ def measure_owl(robot_path: str, input_owl: str, output_log: str, robot_env: dic
 def examine_owl_names(robot_path: str, 
                         input_owl: str,
                         output_dir: str,
-                        curie_converter: Converter, 
-                        iri_converter: Converter, 
-                        robot_env: dict) -> bool:
+                        curie_converter: "Converter", 
+                        iri_converter: "Converter", 
+                        robot_env: dict,
+                        exported: bool = False) -> bool:
     """
     This method attempts to retrieve all entity identifiers for a single OBO in OWL.
 
@@ -241,6 +708,8 @@ def examine_owl_names(robot_path: str,
     :param iri_converter: a curies Converter object with defined prefix maps,
     from IRI prefix to CURIE prefix
     :param robot_env: dict of environment variables, including ROBOT_JAVA_ARGS
+    :param exported: bool, True if the IDs were already exported to
+    input_owl + ".ids.csv", e.g., by a RobotChain, so ROBOT needn't run again
     :return: True if completed without errors, False if errors
     """
 
@@ -259,18 +728,21 @@ def examine_owl_names(robot_path: str,
     mal_id_file_name = os.path.join(output_dir, "unexpected_ids.tsv")
     update_mapfile_name = os.path.join(output_dir, "update_id_maps.tsv")
 
-    try:
-        robot_command('export',
-            '--input', input_owl,
-            '--header', 'ID',
-            '--export', tempfile_name,
-            _env=robot_env,
-        )
-        print(f"Exported IDs to {tempfile_name}.")
-        success = True
-    except sh.ErrorReturnCode_1 as e: # If ROBOT runs but returns an error
-        print(f"ROBOT encountered an error: {e}")
-        success = False
+    if exported:
+        success = os.path.exists(tempfile_name)
+    else:
+        try:
+            run_robot(robot_command, 'export',
+                '--input', input_owl,
+                '--header', 'ID',
+                '--export', tempfile_name,
+                _env=robot_env,
+            )
+            print(f"Exported IDs to {tempfile_name}.")
+            success = True
+        except sh.ErrorReturnCode_1 as e: # If ROBOT runs but returns an error
+            print(f"ROBOT encountered an error: {e}")
+            success = False
 
     if success:
         with open(tempfile_name, 'r') as idfile:
@@ -0,0 +1,363 @@
+"""scheduler.py - orders per-OBO jobs by cost, and shares a memory budget and worker processes between them."""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import requests  # type: ignore
+
+import kg_obo.http_client
+import kg_obo.obolibrary_utils
+
+# OBO sizes are checked concurrently, as this is almost all waiting on the network
+SIZE_CHECK_WORKERS = 16
+
+# Transform throughput assumed when no previous run is available to estimate it from
+DEFAULT_BYTES_PER_SECOND = 1024 ** 2
+
+# Peak memory used by ROBOT for each OBO, kept in the log directory across runs
+ROBOT_PEAKS_FILENAME = "robot_peaks.json"
+
+
+def get_total_memory() -> int:
+    """
+    Gets the total physical memory of this host.
+    :return: int of bytes
+    """
+
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+class MemoryBudget:
+    """
+    Thread-safe account of memory reserved by running jobs.
+    A job may always reserve memory when no other job holds any,
+    so a job larger than the whole budget may still run on its own.
+    """
+
+    def __init__(self, total: int):
+        """
+        :param total: int of bytes available to all running jobs
+        """
+        self.total = total
+        self.used = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, amount: int) -> None:
+        """
+        Reserves memory, waiting until it is available.
+        :param amount: int of bytes to reserve
+        """
+        with self.condition:
+            while self.used > 0 and self.used + amount > self.total:
+                self.condition.wait()
+            self.used = self.used + amount
+
+    def release(self, amount: int) -> None:
+        """
+        Returns reserved memory to the budget.
+        :param amount: int of bytes to return
+        """
+        with self.condition:
+            self.used = self.used - amount
+            self.condition.notify_all()
+
+
+def start_process_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Starts a pool of forked worker processes, for CPU-bound work
+    (e.g., KGX) that threads of one process could only take turns at.
+    Every worker is forked here, before the caller starts any threads,
+    so no worker inherits a lock held by another thread at the time.
+    :param workers: int of worker processes
+    :return: ProcessPoolExecutor, to be shut down by the caller
+    """
+
+    # Forking lets workers inherit the logging setup and converters of the parent
+    context = multiprocessing.get_context("fork")
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+    # Workers are started as jobs arrive with none free, so each of these starts one
+    wait([executor.submit(time.sleep, 0.1) for _ in range(workers)])
+
+    return executor
+
+
+def load_previous_durations(metrics_path: str) -> dict:
+    """
+    Reads the stage metrics of a previous run, as written by
+    metrics.write_metrics, and totals the time taken by each OBO.
+    Only OBOs which were fully downloaded are included, as others
+    were skipped and their time says nothing about their cost.
+    :param metrics_path: str of path to previous run_metrics.json
+    :return: dict of OBO ID to dict of "seconds" and "bytes" downloaded
+    """
+
+    try:
+        with open(metrics_path, "r") as metrics_file:
+            metrics = json.load(metrics_file)
+    except (IOError, ValueError):
+        return {}
+
+    durations: dict = {}
+    for record in metrics:
+        duration = durations.setdefault(record["name"], {"seconds": 0.0, "bytes": 0, "downloaded": False})
+        duration["seconds"] = duration["seconds"] + record["seconds"]
+        if record["stage"] == "download":
+            duration["bytes"] = record["bytes_downloaded"]
+            duration["downloaded"] = True
+
+    return {
+        name: {"seconds": duration["seconds"], "bytes": duration["bytes"]}
+        for name, duration in durations.items()
+        if duration["downloaded"]
+    }
+
+
+def get_peaks(metrics: list) -> dict:
+    """
+    Finds the peak memory used by ROBOT for each OBO, in any stage
+    (e.g., merging its imports), from the stage metrics of a run.
+    :param metrics: list of dicts, each a record from metrics.measure_stage
+    :return: dict of OBO ID to int of peak bytes, for OBOs ROBOT ran on
+    """
+
+    peaks: dict = {}
+    for record in metrics:
+        if record.get("peak_rss", 0) > 0:
+            peaks[record["name"]] = max(peaks.get(record["name"], 0), record["peak_rss"])
+
+    return peaks
+
+
+def load_previous_peaks(metrics_path: str, peaks_path: str = "") -> dict:
+    """
+    Reads the stage metrics of a previous run, as written by
+    metrics.write_metrics, and finds the peak memory used by
+    ROBOT for each OBO, in any stage.
+    OBOs the previous run didn't run ROBOT on (e.g., as they hadn't changed)
+    keep the peaks recorded for them by earlier runs, if any.
+    :param metrics_path: str of path to previous run_metrics.json
+    :param peaks_path: str of path to peaks kept by write_peaks, if any
+    :return: dict of OBO ID to int of peak bytes, for OBOs ROBOT ran on
+    """
+
+    peaks: dict = {}
+    for path in [peaks_path, metrics_path]:
+        if not path:
+            continue
+        try:
+            with open(path, "r") as infile:
+                loaded = json.load(infile)
+        except (IOError, ValueError):
+            continue
+        # The latest peak for each OBO is used, as its size may have changed since
+        peaks.update(get_peaks(loaded) if isinstance(loaded, list) else loaded)
+
+    return peaks
+
+
+def write_peaks(peaks_path: str, peaks: dict) -> None:
+    """
+    Keeps the peak memory used by ROBOT for each OBO, so later runs
+    may size ROBOT's heap by it, even after runs that skip the OBO.
+    The file is replaced in one step, so it is never left half-written.
+    :param peaks_path: str of path to write to
+    :param peaks: dict of OBO ID to int of peak bytes
+    """
+
+    temp_path = peaks_path + ".tmp"
+    with open(temp_path, "w") as outfile:
+        json.dump(peaks, outfile, indent=2, sort_keys=True)
+    os.replace(temp_path, peaks_path)
+
+
+def get_remote_size(name: str, url: str = "") -> int:
+    """
+    Gets the size of an OBO without downloading it.
+    :param name: str of OBO ID, e.g., bfo
+    :param url: str of the OBO's URL, if already resolved
+    :return: int of bytes, as per Content-Length, or 0 if unknown
+    """
+
+    if not url:
+        url = kg_obo.obolibrary_utils.get_url(name)
+    try:
+        req = kg_obo.http_client.head(url)
+        return int(req.headers["Content-Length"])
+    except (KeyError, ValueError, requests.exceptions.RequestException):
+        return 0
+
+
+def get_bytes_per_second(durations: dict) -> float:
+    """
+    Gets the transform throughput seen across all OBOs in a previous run.
+    :param durations: dict from load_previous_durations
+    :return: float of bytes per second, or DEFAULT_BYTES_PER_SECOND if unknown
+    """
+
+    total_seconds = sum(duration["seconds"] for duration in durations.values())
+    total_bytes = sum(duration["bytes"] for duration in durations.values())
+    if total_seconds > 0 and total_bytes > 0:
+        return total_bytes / total_seconds
+    return DEFAULT_BYTES_PER_SECOND
+
+
+def estimate_costs(names: list, durations: dict, check_sizes=True, urls: dict = {}) -> dict:
+    """
+    Estimates how long each OBO will take to transform, in seconds.
+    An OBO's previous duration is used where available.
+    Otherwise, its cost is estimated from its size, using the
+    throughput seen across all OBOs in the previous run.
+    :param names: list of str OBO IDs
+    :param durations: dict from load_previous_durations
+    :param check_sizes: bool, if True, check sizes of OBOs without previous durations
+    :param urls: dict of OBO ID to str of URL, for those already resolved
+    :return: dict of OBO ID to float of estimated seconds, 0 if unknown
+    """
+
+    bytes_per_second = get_bytes_per_second(durations)
+
+    costs = {name: float(durations[name]["seconds"]) for name in names if name in durations}
+
+    unknown = [name for name in names if name not in costs]
+    if check_sizes and len(unknown) > 0:
+        with ThreadPoolExecutor(max_workers=SIZE_CHECK_WORKERS) as executor:
+            sizes = executor.map(get_remote_size, unknown, [urls.get(name, "") for name in unknown])
+        for name, size in zip(unknown, sizes):
+            costs[name] = size / bytes_per_second
+    else:
+        for name in unknown:
+            costs[name] = 0.0
+
+    return costs
+
+
+def order_by_cost(ontologies: list, costs: dict) -> list:
+    """
+    Orders OBOs longest-processing-time first, so the most expensive
+    OBOs start early rather than finishing long after all others.
+    OBOs of equal or unknown cost stay in their original order.
+    :param ontologies: list of dicts of OBO Foundry registry entries
+    :param costs: dict from estimate_costs
+    :return: list of the same registry entries, most expensive first
+    """
+
+    return sorted(ontologies, key=lambda ontology: -costs.get(ontology["id"], 0.0))
+
+
+def parse_shard(shard: str) -> tuple:
+    """
+    Parses a shard specification, e.g., 0/4 for the first of four shards.
+    :param shard: str of shard index and shard count, as i/N, with 0 <= i < N
+    :return: tuple of (int shard index, int shard count)
+    :raises ValueError: if the specification is not valid
+    """
+
+    try:
+        index, count = (int(part) for part in shard.split("/"))
+    except ValueError:
+        raise ValueError(f"Could not parse shard: {shard} - expected i/N, e.g., 0/4")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be from 0 to {count - 1}: {shard}")
+
+    return (index, count)
+
+
+def get_shard_lock_path(lock_path: str, shard: str, queue_worker: str = "") -> str:
+    """
+    Gets the path of the lock file for a shard of a run,
+    so each shard may run at the same time as the others.
+    A worker pulling OBOs from a shared work queue is treated as a shard of its own.
+    :param lock_path: str of path for the lock file of an unsharded run
+    :param shard: str of shard specification, i/N, or empty if not sharded
+    :param queue_worker: str identifying this worker, if pulling from a work queue
+    :return: str of path for the lock file
+    """
+
+    if queue_worker:
+        return f"{lock_path}-shard-queue-{queue_worker}"
+
+    if not shard:
+        return lock_path
+
+    index, count = parse_shard(shard)
+
+    return f"{lock_path}-shard-{index}-of-{count}"
+
+
+def stable_hash(name: str) -> int:
+    """
+    Hashes an OBO ID the same way on every host and every run,
+    unlike the built-in hash.
+    :param name: str of OBO ID, e.g., bfo
+    :return: int hash
+    """
+
+    return int(hashlib.sha256(name.encode("utf-8")).hexdigest(), 16)
+
+
+def assign_shards(names: list, count: int, costs: dict = {}) -> dict:
+    """
+    Assigns each OBO to one of several shards.
+    The assignment depends only on the OBO IDs and costs provided,
+    so every host given the same inputs makes the same assignment.
+    With costs, OBOs are assigned most expensive first to the shard
+    with the least total cost so far, to balance the shards.
+    OBOs without a cost are assigned by a stable hash of their ID.
+    :param names: list of str OBO IDs
+    :param count: int of number of shards
+    :param costs: dict of OBO ID to float of cost, e.g., from a plan
+    :return: dict of OBO ID to int shard index
+    """
+
+    shards = {}
+    loads = [0.0] * count
+
+    weighted = sorted(
+        (name for name in names if costs.get(name, 0) > 0),
+        key=lambda name: (-costs[name], name),
+    )
+    for name in weighted:
+        index = loads.index(min(loads))
+        shards[name] = index
+        loads[index] = loads[index] + costs[name]
+
+    for name in names:
+        if name not in shards:
+            shards[name] = stable_hash(name) % count
+
+    return shards
+
+
+def load_plan_costs(plan_path: str) -> dict:
+    """
+    Reads the estimated costs of OBOs from a plan made with plan.make_plan.
+    :param plan_path: str of path to plan JSON
+    :return: dict of OBO ID to float of estimated seconds
+    """
+
+    with open(plan_path, "r") as plan_file:
+        plan = json.load(plan_file)
+
+    return {entry["name"]: entry["estimated_cost"] for entry in plan["ontologies"]}
+
+
+def select_shard(ontologies: list, shard: str, costs: dict = {}) -> list:
+    """
+    Selects the OBOs in one shard of a run.
+    :param ontologies: list of dicts of OBO Foundry registry entries
+    :param shard: str of shard specification, i/N
+    :param costs: dict of OBO ID to float of cost, to balance shards by
+    :return: list of the registry entries in this shard, in their original order
+    """
+
+    index, count = parse_shard(shard)
+    shards = assign_shards([ontology["id"] for ontology in ontologies], count, costs)
+
+    return [ontology for ontology in ontologies if shards[ontology["id"]] == index]
+
@@ -5,16 +5,19 @@ import os
 import shutil
 import sys
 import tarfile
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List
 
 import boto3  # type: ignore
 import botocore.exceptions  # type: ignore
 import yaml  # type: ignore
-from grape import Graph  # type: ignore
 
 import kg_obo.upload
+from kg_obo.registry import select_ids
 from kg_obo.robot_utils import initialize_robot, measure_owl
 
+if TYPE_CHECKING:
+    from grape import Graph  # type: ignore
+
 IGNORED_FILES = ["index.html",
                  "json_transform.log",
                  "kg-obo_version",
@@ -57,10 +60,9 @@ def retrieve_tracking(bucket, track_file_remote_path,
         tracking = yaml.load(track_file, Loader=yaml.BaseLoader)
 
     # Need to flatten a bit
+    selected = select_ids(tracking["ontologies"], skip, get_only)
     for name in tracking["ontologies"]:
-        if name in skip:
-            continue
-        if len(get_only) > 0 and name not in get_only:
+        if name not in selected:
             continue
         current_version = tracking["ontologies"][name]["current_version"]
         add_all_formats(versions, name, current_version)
@@ -220,8 +222,8 @@ def decompress_graph(name, outpath) -> tuple:
 
     for filepath in path_pair: # Verify the files aren't empty
         with open(filepath, "r") as infile:
-            lines = infile.readlines()
-            if len(lines) < 2:
+            # Only the first two lines are needed to tell
+            if not (infile.readline() and infile.readline()):
                 print(f"{filepath} looks empty!")
                 path_pair = None # type: ignore
 
@@ -332,7 +334,7 @@ def get_graph_details(bucket, remote_path, versions) -> dict:
     return graph_details
 
 def load_graph(name: str, version: str, edges_path: str, 
-                nodes_path: str) -> Graph:
+                nodes_path: str) -> "Graph":
     """
     Load a graph with Ensmallen (from grape).
     :param name: OBO name
@@ -342,6 +344,9 @@ def load_graph(name: str, version: str, edges_path: str,
     :return: ensmallen Graph object
     """
 
+    # grape takes seconds to import, so only import it when loading a graph
+    from grape import Graph  # type: ignore
+
     loaded_graph = Graph.from_csv(name=f"{name}_version_{version}",
                                 edge_path=edges_path,
                                 sources_column="subject",
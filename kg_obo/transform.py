@@ -1,42 +1,145 @@
 import difflib
+import functools
 import hashlib
 import logging
-import mmap
 import os
 import re
 import shutil
 import sys
 import tarfile
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from io import StringIO
+from typing import TYPE_CHECKING, Callable, Optional
 from xml.sax._exceptions import SAXParseException  # type: ignore
 
 import boto3  # type: ignore
-import git
-import kgx.cli  # type: ignore
 import requests  # type: ignore
 import yaml  # type: ignore
-from curies import Converter  # type: ignore
 from kgx.config import get_logger  # type: ignore
-from prefixmaps.io.parser import load_multi_context  # type: ignore
-from rdflib.exceptions import ParserError  # type: ignore
 from tqdm import tqdm  # type: ignore
 
+import kg_obo.governor
+import kg_obo.http_client
 import kg_obo.obolibrary_utils
 import kg_obo.upload
-from kg_obo.prefixes import KGOBO_PREFIXES
+from kg_obo.converters import get_converters
+from kg_obo.download_cache import DEFAULT_CACHE_SIZE, DownloadCache, link_or_copy
+from kg_obo.file_probe import probe_file
+from kg_obo.registry import REGISTRY_URL, load_registry
 from kg_obo.robot_utils import (
+    RobotChain,
+    choose_robot_heap,
     convert_owl,
     examine_owl_names,
+    get_robot_heap,
     initialize_robot,
     merge_and_convert_owl,
+    neutralize_prefixes,
+    parse_memory_size,
     relax_owl,
+    set_robot_heap,
 )
+from kg_obo.metrics import (
+    METRICS_FILENAME,
+    get_path_size,
+    measure_stage,
+    summarize_metrics,
+    write_metrics,
+)
+from kg_obo.checkpoint import (
+    checkpoint_file,
+    clear_checkpoints,
+    get_checkpoint,
+    get_file_hash,
+    has_checkpoints,
+    load_checkpoints,
+    record_checkpoint,
+)
+from kg_obo.pipeline import run_pipeline
+from kg_obo.work_queue import WorkQueue, get_run_id, get_worker_id, run_queue_workers
+from kg_obo.scheduler import (
+    ROBOT_PEAKS_FILENAME,
+    MemoryBudget,
+    estimate_costs,
+    get_peaks,
+    get_shard_lock_path,
+    get_total_memory,
+    load_plan_costs,
+    load_previous_durations,
+    load_previous_peaks,
+    order_by_cost,
+    select_shard,
+    start_process_pool,
+    write_peaks,
+)
+
+if TYPE_CHECKING:
+    from curies import Converter  # type: ignore
 
 
 KGOBO_TRACK_FILE = "kg-obo/tracking.yaml"
 
+# Bytes read at a time from the start of each OBO, until the end of its header,
+# to check for its IRI, version, and imports
+HEADER_SIZE = 4096
+
+# Most bytes read as the header, if its end isn't found before then
+MAX_HEADER_SIZE = 1024 * 1024
+
+# The header ends where RDF/XML closes the owl:Ontology element (or where
+# it's an empty element), or where OWL/XML or functional syntax starts
+# declaring entities. Past a class, it's over in any case.
+HEADER_END = re.compile(
+    rb"</owl:Ontology>|<owl:Ontology\b[^>]*/>|<Declaration>|\bDeclaration\(|<owl:Class\b"
+)
+
+# Bytes before each new chunk searched again for the end of the header,
+# in case it was split between chunks
+HEADER_END_OVERLAP = 1024
+
+# Patterns for the IRI, version, and imports in the header.
+# Most IRIs take the first format - there are some exceptions.
+IRI_TAG = re.compile(rb'owl:versionIRI rdf:resource="(.*)"')
+IRI_ABOUT_TAG = re.compile(rb'owl:Ontology rdf:about="(.*)"')
+VERSION_IRI_ONLY_TAG = re.compile(rb'versionIRI rdf:resource="(.*)"')
+DATE_TAG = re.compile(
+    rb'oboInOwl:date rdf:datatype="http://www.w3.org/2001/XMLSchema#string">([^<]+)'
+)
+DATE_DC_TAG = re.compile(rb'dc:date xml:lang="en">([^<]+)')
+VERSION_INFO_TAG = re.compile(
+    rb'owl:versionInfo rdf:datatype="http://www.w3.org/2001/XMLSchema#string">([^<]+)'
+)
+DECIMAL_VERSION_INFO_TAG = re.compile(
+    rb'owl:versionInfo rdf:datatype="http://www.w3.org/2001/XMLSchema#decimal">([^<]+)'
+)
+EN_VERSION_INFO_TAG = re.compile(rb'owl:versionInfo xml:lang="en">([^<]+)')
+XSD_VERSION_INFO_TAG = re.compile(rb'owl:versionInfo rdf:datatype="&xsd;string">([^<]+)')
+SHORT_VERSION_INFO_TAG = re.compile(rb"owl:versionInfo>([^<]+)")
+IMPORT_TAG = re.compile(rb'owl:imports rdf:resource="(.*)"')
+
+# Bytes read and written at a time while downloading, as a Java heap size
+DEFAULT_CHUNK_SIZE = "1m"
+
+# Times to request the rest of an interrupted download, waiting
+# DOWNLOAD_BACKOFF seconds before the first and twice as long before each after
+DOWNLOAD_RETRIES = 5
+DOWNLOAD_BACKOFF = 2
+
+# Only files at least this large are downloaded in segments
+SEGMENT_MIN_SIZE = 64 * 1024 * 1024
+
+# Dir under data_dir that OBOs are downloaded into, before being linked into place
+DOWNLOAD_DIR = "downloads"
+
+# Workers for the network-bound stages, and queue length between stages,
+# when running the staged pipeline
+PIPELINE_FETCH_WORKERS = 2
+PIPELINE_QUEUE_SIZE = 2
+
 def delete_path(root_dir: str, omit: list = []) -> bool:
     """Deletes a path recursively, i.e., everything in
     the provided directory and all its subdirectories.
@@ -62,42 +165,37 @@ def delete_path(root_dir: str, omit: list = []) -> bool:
 
 
 def retrieve_obofoundry_yaml(
-    yaml_url: str = "https://raw.githubusercontent.com/OBOFoundry/OBOFoundry.github.io/master/registry/ontologies.yml",
+    yaml_url: str = REGISTRY_URL,
     skip: list = [],
     get_only: list = [],
 ) -> list:
     """Retrieve YAML containing list of all ontologies in OBOFoundry
+    The YAML is cached on disk, and only downloaded again once it changes.
     :param yaml_url: a stable URL containing a YAML file that describes all the OBO ontologies:
     :param skip: which ontologies should we skip
-    :return: parsed yaml describing ontologies to transform
+    :param get_only: which ontologies should we transform (otherwise all)
+    :return: parsed yaml describing ontologies to transform, leaving out obsolete ontologies
     """
-    yaml_req = requests.get(yaml_url)
-    yaml_content = yaml_req.content.decode("utf-8")
-    yaml_parsed = yaml.safe_load(yaml_content)
-    yaml_onto_list: list = yaml_parsed["ontologies"]
 
-    if len(skip) > 0:
-        yaml_onto_list_filtered = [
-            ontology
-            for ontology in yaml_onto_list
-            if ontology["id"] not in skip
-            if ("is_obsolete" not in ontology) or not (ontology["is_obsolete"])
-        ]
-    elif len(get_only) > 0:
-        yaml_onto_list_filtered = [
-            ontology
-            for ontology in yaml_onto_list
-            if ontology["id"] in get_only
-            if ("is_obsolete" not in ontology) or not (ontology["is_obsolete"])
-        ]
-    else:
-        yaml_onto_list_filtered = [
-            ontology
-            for ontology in yaml_onto_list
-            if ("is_obsolete" not in ontology) or not (ontology["is_obsolete"])
-        ]
+    return load_registry(yaml_url).select(skip, get_only)
+
 
-    return yaml_onto_list_filtered
+class ThreadFilter(logging.Filter):
+    """Passes only the records logged by one thread.
+    KGX logs through one logger, so transforms running at once in threads
+    each filter its records down to their own.
+    """
+
+    def __init__(self, thread_id: int = 0) -> None:
+        """
+        :param thread_id: int, ident of the thread to pass records from
+        (the current thread if not given)
+        """
+        super().__init__()
+        self.thread_id = thread_id or threading.get_ident()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.thread == self.thread_id
 
 
 def kgx_transform(
@@ -136,6 +234,10 @@ def kgx_transform(
     log_file_handler = logging.FileHandler(log_file_path)
     log_handler.setLevel(logging.WARNING)
     log_file_handler.setLevel(logging.INFO)
+    # Other transforms may be logging at the same time, from other threads
+    thread_filter = ThreadFilter()
+    log_handler.addFilter(thread_filter)
+    log_file_handler.addFilter(thread_filter)
     # Logger doesn't know it's already an instance, so it throws an error
     try:
         logger.addHandler(hdlr=log_handler)  # type: ignore
@@ -146,6 +248,11 @@ def kgx_transform(
     except TypeError:
         pass
 
+    # Imported here, as kgx.cli and rdflib take a second or more to import,
+    # and most uses of this module (e.g., --help, --plan) never transform
+    import kgx.cli  # type: ignore
+    from rdflib.exceptions import ParserError  # type: ignore
+
     try:
         kgx.cli.transform(
             inputs=input_file,
@@ -176,6 +283,14 @@ def kgx_transform(
     log_handler.flush()
     log_file_handler.flush()
 
+    # Detach this transform's handlers, so later transforms don't log to its file
+    for handler in [log_handler, log_file_handler]:
+        try:
+            logger.removeHandler(hdlr=handler)  # type: ignore
+        except TypeError:
+            pass
+    log_file_handler.close()
+
     return (success, errors, output_msg)
 
 
@@ -220,12 +335,157 @@ def replace_illegal_chars(input_string: str, replace_char: str) -> str:
     return input_string
 
 
+class HeaderScanner:
+    """
+    Finds the end of the ontology header at the start of an OWL file,
+    as the file is read chunk by chunk. Each chunk is searched once,
+    so however many chunks the header takes, it's only read once.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.end = -1
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        Adds the next chunk of the file.
+        :param chunk: bytes following those already fed
+        :return: bool, True once the header is complete
+        """
+        if not self.complete():
+            start = max(0, len(self.data) - HEADER_END_OVERLAP)
+            self.data.extend(chunk)
+            end_search = HEADER_END.search(self.data, start)
+            if end_search:
+                self.end = end_search.end()
+        return self.complete()
+
+    def complete(self) -> bool:
+        """
+        :return: bool, True if the end of the header has been found,
+        or MAX_HEADER_SIZE bytes have been fed without finding it
+        """
+        return self.end >= 0 or len(self.data) >= MAX_HEADER_SIZE
+
+    def header(self) -> bytes:
+        """
+        :return: bytes of the header, or of all bytes fed, if its end hasn't been found
+        """
+        return bytes(self.data[:self.end] if self.end >= 0 else self.data)
+
+
+def read_owl_header(input_file_name: str) -> bytes:
+    """
+    Reads the ontology header of an OWL file, and nothing after it.
+    :param input_file_name: name of OWL format file to read
+    :return: bytes of the header, or of the whole file if its end isn't found
+    """
+
+    scanner = HeaderScanner()
+    with open(input_file_name, "rb") as owl_file:
+        while not scanner.complete():
+            chunk = owl_file.read(HEADER_SIZE)
+            if not chunk:
+                break
+            scanner.feed(chunk)
+    return scanner.header()
+
+
+def parse_owl_header(header: bytes) -> tuple:
+    """
+    Extracts the IRI, version, and imports from an ontology header,
+    as get_owl_iri and imports_requested, without reading it again for each.
+    :param header: bytes of the header, e.g., from read_owl_header
+    :return: tuple of (str of IRI, str of version, str describing version format,
+    list of str imports)
+    """
+
+    # The default IRI/version - only used if values aren't provided.
+    iri = "no_iri"
+    version = "no_version"
+
+    # Keep track of where we actually find a usable version value, if any
+    version_format = "none"
+
+    iri_search = IRI_TAG.search(header)
+    iri_about_tag_search = IRI_ABOUT_TAG.search(header)
+    version_iri_only_search = VERSION_IRI_ONLY_TAG.search(header)
+    if iri_search:
+        version_format = "versionIRI"
+        iri = (iri_search.group(1)).decode("utf-8")
+        try:  # We handle some edge cases here
+            version = (iri.split("/"))[-2]
+            if version == "fao":
+                version = (iri.split("/"))[-3]
+            if version == "swo.owl":
+                version = (iri.split("/"))[-1]
+        except IndexError:
+            pass
+    elif iri_about_tag_search:  # In this case, we likely don't have a version
+        version_format = "versionInfo"
+        iri = (iri_about_tag_search.group(1)).decode("utf-8")
+        if (iri.split("/"))[-1] in [
+            "oae.owl",
+            "opmi.owl",
+            "ons.owl",
+            "geo.owl",
+            "dideo.owl",
+            "ino.owl",
+        ]:
+            version_search = EN_VERSION_INFO_TAG.search(header)
+            version = (version_search.group(1)).decode("utf-8")  # type: ignore
+        elif (iri.split("/"))[-1] in ["cheminf.owl"]:
+            version_search = XSD_VERSION_INFO_TAG.search(header)
+            version = (version_search.group(1)).decode("utf-8")  # type: ignore
+    elif version_iri_only_search:
+        version_format = "versionIRI (but missing the owl: prefix)"
+        iri = (version_iri_only_search.group(1)).decode("utf-8")
+        try:  # We handle some edge cases here
+            version = (iri.split("/"))[-2]
+        except IndexError:
+            pass
+    else:
+        print("Version IRI not found.")
+
+    # If we didn't get a version out of the IRI, look elsewhere
+    if version == "no_version":
+
+        version_info_tag = VERSION_INFO_TAG
+        if (iri.split("/"))[-1] in ["ICEO", "KISAO#"]:
+            version_info_tag = DECIMAL_VERSION_INFO_TAG
+
+        for search_tag in [
+            DATE_TAG,
+            DATE_DC_TAG,
+            version_info_tag,
+            SHORT_VERSION_INFO_TAG,
+        ]:
+            search_type = search_tag.search(header)
+            if search_type:
+                version_format = "a date or version info field"
+                version = (search_type.group(1)).decode("utf-8")
+                break
+        if version == "no_version":
+            print("Neither versioned IRI or release date found.")
+
+        if (
+            len(version) > 100
+        ):  # Some versions are just free text, so instead of parsing we hash
+            version = (hashlib.sha256(version.encode())).hexdigest()
+
+    version = replace_illegal_chars(version, "-")
+
+    imports = [match.decode("utf-8") for match in IMPORT_TAG.findall(header)]
+
+    return (iri, version, version_format, imports)
+
+
 def get_owl_iri(input_file_name: str) -> tuple:
     """
     Extracts version IRI from OWL definitions.
     Here, the IRI is the full URL of the origin OWL,
     as naming conventions vary.
-    Avoids much file parsing as the IRI should be near the top of the file.
+    Only the header is read, as the IRI is in the header at the top of the file.
     Does some string parsing to get a shorter version number.
     Versions may take multiple formats across OBOs.
     If an IRI is not provided (i.e., the OWL does not contain owl:versionIRI
@@ -238,112 +498,7 @@ def get_owl_iri(input_file_name: str) -> tuple:
     :return: tuple of (str of IRI, str of version, str describing version format)
     """
 
-    # Most IRIs take this format - there are some exceptions
-    iri_tag = b'owl:versionIRI rdf:resource="(.*)"'
-    iri_about_tag = b'owl:Ontology rdf:about="(.*)"'
-    date_tag = (
-        b'oboInOwl:date rdf:datatype="http://www.w3.org/2001/XMLSchema#string">([^<]+)'
-    )
-    date_dc_tag = b'dc:date xml:lang="en">([^<]+)'
-    version_info_tag = b'owl:versionInfo rdf:datatype="http://www.w3.org/2001/XMLSchema#string">([^<]+)'
-    short_version_info_tag = b"owl:versionInfo>([^<]+)"
-    version_iri_only_tag = b'versionIRI rdf:resource="(.*)"'
-    # The default IRI/version - only used if values aren't provided.
-    iri = "no_iri"
-    version = "no_version"
-
-    # Keep track of where we actually find a usable version value, if any
-    version_format = "none"
-
-    try:
-        with open(input_file_name, "rb", 0) as owl_file, mmap.mmap(
-            owl_file.fileno(), 0, access=mmap.ACCESS_READ
-        ) as owl_string:
-            iri_search = re.search(iri_tag, owl_string)  # type: ignore
-            iri_about_tag_search = re.search(iri_about_tag, owl_string)  # type: ignore
-            version_iri_only_search = re.search(
-                version_iri_only_tag, owl_string
-            )  # type: ignore
-            # mypy doesn't like re and mmap objects
-            if iri_search:
-                version_format = "versionIRI"
-                iri = (iri_search.group(1)).decode("utf-8")
-                try:  # We handle some edge cases here
-                    version = (iri.split("/"))[-2]
-                    if version == "fao":
-                        version = (iri.split("/"))[-3]
-                    if version == "swo.owl":
-                        version = (iri.split("/"))[-1]
-                except IndexError:
-                    pass
-            elif iri_about_tag_search:  # In this case, we likely don't have a version
-                version_format = "versionInfo"
-                iri = (iri_about_tag_search.group(1)).decode("utf-8")
-                if (iri.split("/"))[-1] in [
-                    "oae.owl",
-                    "opmi.owl",
-                    "ons.owl",
-                    "geo.owl",
-                    "dideo.owl",
-                    "ino.owl",
-                ]:
-                    version_tag = b'owl:versionInfo xml:lang="en">([^<]+)'
-                    version_search = re.search(version_tag, owl_string)  # type: ignore
-                    version = (version_search.group(1)).decode("utf-8")  # type: ignore
-                elif (iri.split("/"))[-1] in ["cheminf.owl"]:
-                    version_tag = b'owl:versionInfo rdf:datatype="&xsd;string">([^<]+)'
-                    version_search = re.search(version_tag, owl_string)  # type: ignore
-                    version = (version_search.group(1)).decode("utf-8")  # type: ignore
-            elif version_iri_only_search:
-                version_format = "versionIRI (but missing the owl: prefix)"
-                iri = (version_iri_only_search.group(1)).decode("utf-8")
-                try:  # We handle some edge cases here
-                    version = (iri.split("/"))[-2]
-                except IndexError:
-                    pass
-            else:
-                print("Version IRI not found.")
-
-            # If we didn't get a version out of the IRI, look elsewhere
-            if version == "no_version":
-
-                if (iri.split("/"))[-1] in ["ICEO", "KISAO#"]:
-                    version_info_tag = b'owl:versionInfo rdf:datatype="http://www.w3.org/2001/XMLSchema#decimal">([^<]+)'
-
-                date_search = re.search(date_tag, owl_string)  # type: ignore
-                date_dc_search = re.search(date_dc_tag, owl_string)  # type: ignore
-                version_info_search = re.search(
-                    version_info_tag, owl_string
-                )  # type: ignore
-                short_version_info_search = re.search(
-                    short_version_info_tag, owl_string
-                )  # type: ignore
-
-                for search_type in [
-                    date_search,
-                    date_dc_search,
-                    version_info_search,
-                    short_version_info_search,
-                ]:
-                    if search_type and version == "no_version":
-                        version_format = "a date or version info field"
-                        version = (search_type.group(1)).decode("utf-8")
-                if version == "no_version":
-                    print("Neither versioned IRI or release date found.")
-
-                if (
-                    len(version) > 100
-                ):  # Some versions are just free text, so instead of parsing we hash
-                    version = (hashlib.sha256(version.encode())).hexdigest()
-
-            version = replace_illegal_chars(version, "-")
-
-    except ValueError:  # Should not happen unless OWL definitions are missing/broken
-        print(
-            "Could not parse OWL definitions enough to locate version IRI or release date."
-        )
-
-    return (iri, version, version_format)
+    return parse_owl_header(read_owl_header(input_file_name))[:3]
 
 
 def track_obo_version(
@@ -353,6 +508,7 @@ def track_obo_version(
     bucket: str = "",
     track_file_local_path: str = "data/tracking.yaml",
     track_file_remote_path: str = KGOBO_TRACK_FILE,
+    sha256: str = "",
 ) -> None:
     """
     Writes OBO version as per IRI to tracking.yaml.
@@ -362,6 +518,33 @@ def track_obo_version(
     :param version: OBO version, usually a date
     :param track_file_local_path: where to look for local tracking.yaml file
     :param track_file_remote_path: where to look for remote tracking.yaml file
+    :param sha256: str of hex digest of the OBO's OWL file, if known
+    """
+
+    track_obo_versions(
+        [(name, iri, version, sha256)],
+        bucket,
+        track_file_local_path,
+        track_file_remote_path,
+    )
+
+
+def track_obo_versions(
+    versions: list,
+    bucket: str = "",
+    track_file_local_path: str = "data/tracking.yaml",
+    track_file_remote_path: str = KGOBO_TRACK_FILE,
+    validators: dict = {},
+) -> None:
+    """
+    Writes several OBO versions to tracking.yaml at once,
+    retrieving and uploading the tracking file only once.
+    :param versions: list of tuples of (OBO name, full OBO VersionIRI, OBO version),
+    each optionally followed by the hex digest of the OBO's OWL file
+    :param validators: dict of OBO name to dict of the validators last seen
+    for its file, from http_client.get_validators - these are written after the versions
+    :param track_file_local_path: where to look for local tracking.yaml file
+    :param track_file_remote_path: where to look for remote tracking.yaml file
     """
 
     client = boto3.client("s3")
@@ -373,6 +556,39 @@ def track_obo_version(
     with open(track_file_local_path, "r") as track_file:
         tracking = yaml.load(track_file, Loader=yaml.BaseLoader)
 
+    for name, iri, version, *sha256 in versions:
+        add_tracked_version(tracking, name, iri, version, *sha256)
+
+    for name, obo_validators in validators.items():
+        if name in tracking["ontologies"]:
+            tracking["ontologies"][name]["validators"] = obo_validators
+
+    with open(track_file_local_path, "w") as track_file:
+        track_file.write(yaml.dump(tracking))
+
+    client.upload_file(
+        Filename=track_file_local_path,
+        Bucket=bucket,
+        Key=track_file_remote_path,
+        ExtraArgs={"ACL": "public-read"},
+    )
+
+
+def add_tracked_version(
+    tracking: dict, name: str, iri: str, version: str, sha256: str = ""
+) -> None:
+    """
+    Sets the current version of an OBO in tracking contents,
+    moving any previous version to its archive.
+    Each version keeps the hash of its OWL file, if known,
+    so a later version with the same contents needn't be transformed again.
+    :param tracking: dict of tracking contents, updated in place
+    :param name: name of OBO, as OBO ID, e.g. 'bfo'
+    :param iri: full OBO VersionIRI, usually URL
+    :param version: OBO version, usually a date
+    :param sha256: str of hex digest of the OBO's OWL file, if known
+    """
+
     # Check if this OBO name is in the tracking - it usually is,
     # but it may be a new OBO, so set that up
     if name not in tracking["ontologies"]:
@@ -386,26 +602,44 @@ def track_obo_version(
             tracking["ontologies"][name]["archive"] = []
         prev_iri = tracking["ontologies"][name]["current_iri"]
         prev_version = tracking["ontologies"][name]["current_version"]
-        tracking["ontologies"][name]["archive"].append(
-            {"iri": prev_iri, "version": prev_version}
-        )
+        archived = {"iri": prev_iri, "version": prev_version}
+        if tracking["ontologies"][name].get("current_sha256"):
+            archived["sha256"] = tracking["ontologies"][name]["current_sha256"]
+        tracking["ontologies"][name]["archive"].append(archived)
 
     # Now set the current IRI and version to the most recent transform
     tracking["ontologies"][name]["current_iri"] = iri
     tracking["ontologies"][name]["current_version"] = version
+    if sha256:
+        tracking["ontologies"][name]["current_sha256"] = sha256
+    else:
+        tracking["ontologies"][name].pop("current_sha256", None)
 
     all_versions = tracking["ontologies"][name]
     print(f"Current versions for {name}: {all_versions}")
 
-    with open(track_file_local_path, "w") as track_file:
-        track_file.write(yaml.dump(tracking))
 
-    client.upload_file(
-        Filename=track_file_local_path,
-        Bucket=bucket,
-        Key=track_file_remote_path,
-        ExtraArgs={"ACL": "public-read"},
-    )
+def load_tracking(
+    bucket: str = "",
+    tracking_file_local_path: str = "data/tracking.yaml",
+    tracking_file_remote_path: str = KGOBO_TRACK_FILE,
+) -> dict:
+    """
+    Retrieves tracking.yaml from S3 and parses it.
+    :param bucket: str of S3 bucket
+    :param tracking_file_local_path: where to save the local tracking.yaml file
+    :param tracking_file_remote_path: where to look for remote tracking.yaml file
+    :return: dict of tracking contents
+    """
+
+    client = boto3.client("s3")
+
+    client.download_file(bucket, tracking_file_remote_path, tracking_file_local_path)
+
+    with open(tracking_file_local_path, "r") as track_file:
+        tracking = yaml.load(track_file, Loader=yaml.BaseLoader)
+
+    return tracking
 
 
 def transformed_obo_exists(
@@ -415,12 +649,15 @@ def transformed_obo_exists(
     bucket: str = "",
     tracking_file_local_path: str = "data/tracking.yaml",
     tracking_file_remote_path: str = KGOBO_TRACK_FILE,
+    tracking: dict = {},
 ) -> bool:
     """
     Read tracking.yaml to determine if transformed version of this OBO exists.
 
     :param name: string of short OBO name, e.g., bfo
     :param iri: iri of OBO version
+    :param tracking: dict of already loaded tracking contents, if any -
+    otherwise tracking.yaml is retrieved from S3
     :return: boolean, True if this OBO and version already exist as transformed
     """
 
@@ -430,12 +667,10 @@ def transformed_obo_exists(
     if s3_test:
         return exists
 
-    client = boto3.client("s3")
-
-    client.download_file(bucket, tracking_file_remote_path, tracking_file_local_path)
-
-    with open(tracking_file_local_path, "r") as track_file:
-        tracking = yaml.load(track_file, Loader=yaml.BaseLoader)
+    if not tracking:
+        tracking = load_tracking(
+            bucket, tracking_file_local_path, tracking_file_remote_path
+        )
 
     # Check current and previous versions
     # If it's a new OBO, we'll have a KeyError so catch that
@@ -452,75 +687,407 @@ def transformed_obo_exists(
     return exists
 
 
+def transformed_content_version(
+    name: str,
+    sha256: str,
+    s3_test=False,
+    bucket="",
+    tracking_file_local_path: str = "data/tracking.yaml",
+    tracking_file_remote_path: str = KGOBO_TRACK_FILE,
+    tracking: dict = {},
+) -> str:
+    """
+    Read tracking.yaml to find a transformed version of this OBO
+    with exactly the same OWL file, e.g., if its version
+    was hashed from free text that has changed.
+
+    :param name: string of short OBO name, e.g., bfo
+    :param sha256: str of hex digest of the OBO's OWL file
+    :param tracking: dict of already loaded tracking contents, if any -
+    otherwise tracking.yaml is retrieved from S3
+    :return: str of the transformed version with the same file, or empty if none
+    """
+
+    # If testing, there are no transformed versions to reuse
+    if s3_test or not sha256:
+        return ""
+
+    if not tracking:
+        tracking = load_tracking(
+            bucket, tracking_file_local_path, tracking_file_remote_path
+        )
+
+    tracked = tracking.get("ontologies", {}).get(name, {})
+    if tracked.get("current_sha256") == sha256:
+        return tracked["current_version"]
+    for archived in tracked.get("archive", []):
+        if archived.get("sha256") == sha256:
+            return archived["version"]
+
+    return ""
+
+
 def download_ontology(
-    url: str, file: str, logger: object, no_dl_progress: bool, header_only: bool
+    url: str,
+    file: str,
+    logger: object,
+    no_dl_progress: bool,
+    header_only: bool,
+    check_header: Optional[Callable] = None,
+    download_cache: Optional[DownloadCache] = None,
+    response_headers: Optional[dict] = None,
+    chunk_size: int = parse_memory_size(DEFAULT_CHUNK_SIZE),
+    segments: int = 1,
+    content_hash: Optional[dict] = None,
 ) -> bool:
     """
     Download ontology from URL
 
+    With check_header, the header is checked as soon as it arrives,
+    in the same request as the rest of the file, so an OBO is never
+    requested twice just to find out whether it's needed.
+    If the connection drops after that, and the server accepts Range
+    requests, the rest of the file is requested and appended to the
+    bytes already downloaded, retrying with exponential backoff.
+
+    With segments, a file of at least SEGMENT_MIN_SIZE is downloaded
+    after its header as that many Range requests at once, each
+    written into its own part of the file.
+
+    With download_cache, a file already cached from this URL is revalidated
+    with a conditional request. If it hasn't changed, the cached file is
+    used and nothing is downloaded. Otherwise, the new file is cached.
+
     :param url: url to download from
     :param file: file to download into
     :param logger:
     :param no_dl_progress: bool, if True then download progress bar is suppressed
-    :param header_only: bool, if True then only download enough of file to check IRI/version
+    :param header_only: bool, if True then only download enough of file to check IRI/version,
+    as download_header
+    :param check_header: function called with the file path once the whole header
+    (or the whole file, if it has no recognizable header) has been written to it;
+    if it returns False, the download stops there
+    :param download_cache: DownloadCache to revalidate and store full downloads in, if any
+    :param response_headers: dict to add the response headers to, if any,
+    e.g., to record the file's validators
+    :param chunk_size: int of bytes to read and write at a time, after the header
+    :param segments: int of Range requests to download large files with at once,
+    if the server accepts them
+    :param content_hash: dict to set "sha256" in, if any, to the hex digest of the
+    whole file - it's hashed as it's written, so it needn't be read again.
+    Nothing is set if only the header was downloaded.
     :return: boolean indicating whether download worked
     """
+    written = 0
     try:
-        req = requests.get(url, stream=True)
-        file_size = int(req.headers["Content-Length"])
-        chunk_size = 4096
-        with open(file, "wb") as outfile:
+        # A previous download may be a hardlink to a cached file, so never write into it
+        if os.path.exists(file):
+            os.remove(file)
+        if header_only:
+            download_header(url, file)
+            return True
+        headers = {}
+        if download_cache:
+            headers.update(download_cache.validators(url))
+        req = kg_obo.http_client.get(url, stream=True, headers=headers)
+        if download_cache and req.status_code == 304:
+            req.close()
+            if response_headers is not None:
+                # A 304 needn't repeat every validator, so fill in any from the cached response
+                cached = download_cache.lookup(url)
+                response_headers.update({"ETag": cached.get("etag", ""),
+                                         "Last-Modified": cached.get("last_modified", "")})
+                response_headers.update(req.headers)
+            if use_cached_download(url, file, download_cache, check_header, content_hash):
+                logger.info(f"{url} has not changed - using cached download.")  # type: ignore
+                print(f"{url} has not changed - using cached download.")
+                return True
+            # The cached file was evicted since, so download it after all
+            req = kg_obo.http_client.get(url, stream=True)
+        # Closing the response returns its connection to the pool
+        with req, open(file, "wb") as outfile:
+            if response_headers is not None:
+                response_headers.update(req.headers)
+            file_size = int(req.headers["Content-Length"])
+            # Byte ranges of compressed responses don't line up with the bytes we write
+            accepts_ranges = req.headers.get("Accept-Ranges") == "bytes" and \
+                req.headers.get("Content-Encoding", "identity") == "identity"
+            # Any later Range requests must be for this same version of the file
+            if_range = req.headers.get("ETag") or req.headers.get("Last-Modified", "")
+            pbar = None
             if not no_dl_progress:
-                if not header_only:
-                    pbar = tqdm(
-                        unit="B",
-                        total=file_size,
-                        unit_scale=True,
-                        unit_divisor=chunk_size,
-                    )
-                else:
-                    pbar = tqdm(
-                        unit="B",
-                        total=chunk_size,
-                        unit_scale=True,
-                        unit_divisor=chunk_size,
+                pbar = tqdm(
+                    unit="B",
+                    total=file_size,
+                    unit_scale=True,
+                    unit_divisor=1024,
+                )
+            file_hash = hashlib.sha256()
+            hash_streamed = True
+            governor = kg_obo.governor.get_governor()
+
+            def count(chunk: bytes) -> None:
+                governor.throttle(len(chunk))
+                if pbar:
+                    pbar.update(len(chunk))
+
+            def update(chunk: bytes) -> None:
+                file_hash.update(chunk)
+                count(chunk)
+
+            header_checked = check_header is None
+            try:
+                # The header is read in small chunks, so it's checked as soon as it ends
+                scanner = HeaderScanner()
+                finished = True
+                for chunk in req.iter_content(chunk_size=HEADER_SIZE):
+                    if chunk:
+                        outfile.write(chunk)
+                        update(chunk)
+                        written = written + len(chunk)
+                    if header_checked or scanner.feed(chunk):
+                        finished = False
+                        break
+                if not header_checked:
+                    header_checked = True
+                    outfile.flush()
+                    if not check_header(file):  # type: ignore
+                        return True
+                # If the whole file was no longer than the header, it's all written already
+                if not finished and segments > 1 and accepts_ranges and file_size >= SEGMENT_MIN_SIZE:
+                    req.close()
+                    outfile.flush()
+                    written = written + download_segments(
+                        url, file, written, file_size - 1, segments, chunk_size, if_range, count,
                     )
-            for chunk in req.iter_content(chunk_size=chunk_size):
-                if chunk:
-                    if not no_dl_progress:
-                        pbar.update(len(chunk))
-                    outfile.write(chunk)
-                if header_only:
-                    break
+                    # Segments arrive out of order, so the file is hashed once complete
+                    hash_streamed = False
+                elif not finished:
+                    for chunk in req.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            outfile.write(chunk)
+                            update(chunk)
+                            written = written + len(chunk)
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout) as e:
+                # Once we know we want the whole file, keep what we have
+                if not (header_checked and written > 0 and accepts_ranges):
+                    raise e
+                logger.warning(f"Download from {url} interrupted at {written} bytes: {e}")  # type: ignore
+                # Give back its connection before opening another
+                req.close()
+                written = written + download_range(
+                    url, outfile, written, file_size - 1, chunk_size, if_range, update,
+                )
+        sha256 = file_hash.hexdigest() if hash_streamed else get_file_hash(file)
+        if content_hash is not None:
+            content_hash["sha256"] = sha256
+        if download_cache:
+            download_cache.store(url, file, req.headers, sha256)
         return True
     except (KeyError, requests.exceptions.RequestException) as e:
         logger.error(e)  # type: ignore
         return False
 
 
-def imports_requested(input_file_name: str) -> list:
+def download_header(url: str, file: str) -> int:
     """
-    Given an OWL file, searches for and returns list of import statements.
-    :param file: file to parse
-    :return: list of strings, each the name of an import, e.g. "upheno/metazoa.owl"
+    Downloads the header at the start of an OBO, without the rest of it.
+    The header is requested as Ranges, each as long again as all before it,
+    until the end of the header arrives, so servers which support them send
+    little more than the header - others send the whole file, but only the
+    header is read.
+    :param url: str of URL to download from
+    :param file: str of file to save the header into
+    :return: int of full OBO size in bytes, as per Content-Range or Content-Length
     """
 
-    imports = []
-    import_tag = b'owl:imports rdf:resource="(.*)"'
+    scanner = HeaderScanner()
+    file_size = 0
+    with open(file, "wb") as outfile:
+        while True:
+            start = len(scanner.data)
+            end = min(start + max(start, HEADER_SIZE), MAX_HEADER_SIZE) - 1
+            with kg_obo.http_client.get(url, stream=True, headers={"Range": f"bytes={start}-{end}"}) as req:
+                partial = req.status_code == 206
+                if start == 0:
+                    # A partial response gives the full size after the range, e.g., bytes 0-4095/123456
+                    content_range = req.headers.get("Content-Range", "")
+                    if "/" in content_range and not content_range.endswith("*"):
+                        file_size = int(content_range.split("/")[-1])
+                    else:
+                        file_size = int(req.headers["Content-Length"])
+                elif not partial:
+                    # The Range was ignored this time, so keep what we have
+                    break
+                for chunk in req.iter_content(chunk_size=HEADER_SIZE):
+                    outfile.write(chunk)
+                    if scanner.feed(chunk):
+                        break
+            if (scanner.complete() or not partial
+                    or len(scanner.data) in (start, file_size)):
+                break
+
+    return file_size
 
+
+def use_cached_download(
+    url: str,
+    file: str,
+    download_cache: DownloadCache,
+    check_header: Optional[Callable] = None,
+    content_hash: Optional[dict] = None,
+) -> bool:
+    """
+    Places the cached download of an unchanged URL at a path, as download_ontology
+    would have downloaded it. The header is checked first, from the header
+    alone, just as for a download.
+    :param url: url the file was downloaded from
+    :param file: file to place it into
+    :param download_cache: DownloadCache holding the file
+    :param check_header: function called with the path to the header, as in download_ontology
+    :param content_hash: dict to set "sha256" in, if any, as in download_ontology
+    :return: boolean, True if the cached file was used, False if it is no longer cached
+    """
+    entry = download_cache.lookup(url)
+    if not entry:
+        return False
     try:
-        with open(input_file_name, "rb", 0) as owl_file, mmap.mmap(
-            owl_file.fileno(), 0, access=mmap.ACCESS_READ
-        ) as owl_string:
-            import_search = re.findall(import_tag, owl_string)  # type: ignore
-            # mypy doesn't like re and mmap objects
-            if len(import_search) > 0:
-                for match in import_search:
-                    imports.append(match.decode("utf-8"))
-    except ValueError:  # Should not happen unless OWL definitions are missing/broken
-        print("Could not parse OWL definitions enough to locate any imports.")
+        with open(file, "wb") as outfile:
+            outfile.write(read_owl_header(entry["path"]))
+    except FileNotFoundError:
+        return False
+
+    if check_header and not check_header(file):
+        return True
+
+    if not download_cache.link(url, file):
+        return False
+    if content_hash is not None:
+        content_hash["sha256"] = entry["sha256"]
+
+    return True
+
+
+def download_range(
+    url: str,
+    outfile,
+    start: int,
+    end: int,
+    chunk_size: int,
+    if_range: str = "",
+    on_chunk: Optional[Callable] = None,
+) -> int:
+    """
+    Downloads a range of bytes of a file with a Range request,
+    writing them to a file object at its current position.
+    If the connection drops, the rest of the range is requested again,
+    up to DOWNLOAD_RETRIES times, waiting longer before each.
+    :param url: url to download from
+    :param outfile: file object to write to, positioned at byte start
+    :param start: int of first byte to download
+    :param end: int of last byte to download
+    :param chunk_size: int of bytes to write at a time
+    :param if_range: str of ETag or Last-Modified of the file, if any -
+    the server then only sends the range if the file hasn't changed since
+    :param on_chunk: function called with each chunk written, in order, if any
+    :return: int of bytes written
+    """
+    kg_obo_logger = logging.getLogger("kg-obo")
+
+    written = 0
+    for attempt in range(DOWNLOAD_RETRIES + 1):
+        if start + written > end:
+            return written
+        if attempt > 0:
+            time.sleep(DOWNLOAD_BACKOFF * 2 ** (attempt - 1))
+        headers = {"Range": f"bytes={start + written}-{end}"}
+        if if_range:
+            headers["If-Range"] = if_range
+        try:
+            with kg_obo.http_client.get(url, stream=True, headers=headers) as req:
+                # Anything but Partial Content means the Range was ignored, or the file has changed
+                if req.status_code != 206:
+                    raise requests.exceptions.RequestException(
+                        f"Server did not resume download from {url} at byte {start + written}"
+                    )
+                for chunk in req.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        outfile.write(chunk)
+                        written = written + len(chunk)
+                        if on_chunk:
+                            on_chunk(chunk)
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout) as e:
+            kg_obo_logger.warning(
+                f"Download from {url} interrupted at byte {start + written} "
+                f"(attempt {attempt + 1} of {DOWNLOAD_RETRIES + 1}): {e}"
+            )
+
+    if start + written <= end:
+        raise requests.exceptions.RequestException(
+            f"Download from {url} stopped at byte {start + written} of {end + 1}"
+            f" after {DOWNLOAD_RETRIES + 1} attempts"
+        )
+
+    return written
+
+
+def download_segments(
+    url: str,
+    file: str,
+    start: int,
+    end: int,
+    segments: int,
+    chunk_size: int,
+    if_range: str = "",
+    on_chunk: Optional[Callable] = None,
+) -> int:
+    """
+    Downloads a range of bytes of a file as several Range requests at once,
+    each written directly into its own part of the file, as download_range.
+    :param url: url to download from
+    :param file: str of path to file, already holding the bytes before start
+    :param start: int of first byte to download
+    :param end: int of last byte to download, i.e., the last byte of the file
+    :param segments: int of Range requests to make at once
+    :param chunk_size: int of bytes to write at a time
+    :param if_range: str of ETag or Last-Modified of the file, if any
+    :param on_chunk: function called with each chunk written, if any -
+    chunks of different segments are interleaved
+    :return: int of bytes written
+    """
+    # Every segment may then be written in place
+    with open(file, "r+b") as outfile:
+        outfile.truncate(end + 1)
+
+    segment_size = -(-(end + 1 - start) // segments)
+    bounds = [
+        (segment_start, min(segment_start + segment_size - 1, end))
+        for segment_start in range(start, end + 1, segment_size)
+    ]
+
+    def download_segment(segment_bounds: tuple) -> int:
+        with open(file, "r+b") as outfile:
+            outfile.seek(segment_bounds[0])
+            return download_range(
+                url, outfile, segment_bounds[0], segment_bounds[1], chunk_size, if_range, on_chunk
+            )
+
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        return sum(executor.map(download_segment, bounds))
 
-    return imports
+
+def imports_requested(input_file_name: str) -> list:
+    """
+    Given an OWL file, searches its header for and returns list of import statements.
+    :param file: file to parse
+    :return: list of strings, each the name of an import, e.g. "upheno/metazoa.owl"
+    """
+
+    return parse_owl_header(read_owl_header(input_file_name))[3]
 
 
 def get_file_diff(before_filename, after_filename) -> str:
@@ -560,12 +1127,25 @@ def get_file_length(filename) -> int:
     :param filename: str, name or path of file
     :return: int containing count of lines in file
     """
-    out_value = 0
-    with open(filename, "r") as infile:
-        for _ in infile:
-            out_value = out_value + 1
+    return probe_file(filename)["lines"]
+
+
+def log_probes(stage: str, before: dict, after: dict) -> None:
+    """
+    Logs the lines and classes in the input and output of a ROBOT stage.
+    :param stage: str of stage name, e.g., relax
+    :param before: dict from probe_file of the stage's input
+    :param after: dict from probe_file of the stage's output
+    """
+
+    kg_obo_logger = logging.getLogger("kg-obo")
 
-    return out_value
+    message = (
+        f"Before {stage}: {before['lines']} lines, {before['classes']} classes. "
+        f"After {stage}: {after['lines']} lines, {after['classes']} classes."
+    )
+    kg_obo_logger.info(message)
+    print(message)
 
 
 def clean_and_normalize_graph(filename) -> bool:
@@ -680,58 +1260,1093 @@ def clean_and_normalize_graph(filename) -> bool:
     return success
 
 
-def run_transform(
-    skip: list = [],
-    get_only: list = [],
-    bucket="bucket",
-    save_local=False,
+def new_transform_job(ontology: dict) -> dict:
+    """
+    Sets up the record passed between the stages of an OBO transform:
+    fetch_ontology, process_ontology, and publish_ontology.
+    Each stage adds what later stages need to this record.
+    :param ontology: dict of OBO Foundry registry entry for this OBO
+    :return: dict of the OBO registry entry and its result so far
+    """
+
+    return {
+        "ontology": ontology,
+        "result": {
+            "name": ontology["id"],
+            "status": "incomplete",
+            "weird_version_format": False,
+            "halt": False,
+        },
+    }
+
+
+def fetch_ontology(
+    job: dict,
+    bucket: str = "bucket",
     s3_test=False,
     no_dl_progress=False,
     force_index_refresh=False,
     replace_base_obos=False,
-    robot_path: str = os.path.join(os.getcwd(), "robot"),
-    lock_file_remote_path: str = "kg-obo/lock",
-    force_overwrite=False,
-    log_dir="logs",
     data_dir="data",
     remote_path="kg-obo",
-    track_file_local_path: str = "data/tracking.yaml",
-    tracking_file_remote_path: str = KGOBO_TRACK_FILE,
+    resume=False,
+    resolved_urls: dict = {},
+    download_cache: Optional[DownloadCache] = None,
+    tracking: dict = {},
+    download_chunk_size: int = parse_memory_size(DEFAULT_CHUNK_SIZE),
+    download_segments: int = 1,
 ) -> bool:
     """
-    Perform setup, then kgx-mediated transforms for all specified OBOs.
-    :param skip: list of OBOs to skip, by ID
-    :param get_only: list of OBOs to transform, by ID (otherwise do all)
-    :param bucket: str of S3 bucket, to be specified as argument
-    :param save_local: bool for whether to retain transform results on local disk
+    First stage of an OBO transform: locate the OBO, check its version,
+    and download it if this version has not been transformed yet.
+    If the OBO's file has the same validators (ETag, Last-Modified) as when
+    its current version was tracked, nothing of it is downloaded at all.
+    :param job: dict from new_transform_job
+    :param bucket: str of S3 bucket
     :param s3_test: bool for whether to perform mock S3 upload only
     :param no_dl_progress: bool for whether to hide download progress bars
-    :param force_index_refresh: bool for whether to rebuild all index.html on remote
-    :param robot_path: str of path to robot, if different from default (bin/robot) - don't need '.jar' extension
-    :param lock_file_remote_path: str of path for lock file on S3
-    :param force_overwrite: bool, if True, will overwrite existing transform files on bucket
-    :param log_dir: str of local dir where any logs should be saved
+    :param force_index_refresh: bool for whether to rebuild index.html on remote
+    :param replace_base_obos: bool for whether to replace previous base OBO transforms
     :param data_dir: str of local dir where data should be saved
     :param remote_path: str of remote path on S3 bucket
-    :param track_file_local_path: str of local path for tracking file
-    :param tracking_file_remote_path: str of path of tracking file on S3
-    :return: boolean indicating success or existing run encountered (False for unresolved error)
+    :param resume: bool, if True, continue from any checkpoints left by an interrupted run
+    :param resolved_urls: dict from obolibrary_utils.resolve_urls, if URLs were resolved up front -
+    OBOs not in it are resolved here
+    :param download_cache: DownloadCache of previous downloads, if any
+    :param tracking: dict of tracking contents, loaded at the start of the run -
+    if empty, tracking.yaml is retrieved from S3 to check the OBO's version
+    :param download_chunk_size: int of bytes to read and write at a time while downloading
+    :param download_segments: int of Range requests to download large OBOs with at once
+    :return: bool, True if the OBO should continue to the next stage
     """
 
-    print("Setting up ROBOT...")
-    if not robot_path:
-        robot_path = os.path.join(os.getcwd(), "robot")
-    robot_params = initialize_robot(robot_path)
-    print(f"ROBOT path: {robot_path}")
-    robot_env = robot_params[1]
-    print(f"ROBOT evironment variables: {robot_env['ROBOT_JAVA_ARGS']}")
+    kg_obo_logger = logging.getLogger("kg-obo")
 
-    if not robot_params[0]:  # i.e., if we couldn't find ROBOT
-        sys.exit(
-            "\t*** Could not locate ROBOT - ensure it is available and executable. \n\tExiting..."
-        )
+    ontology = job["ontology"]
+    result = job["result"]
 
-    # Set up logging
+    ontology_name = ontology["id"]
+    print(f"{ontology_name}")
+    kg_obo_logger.info("Loading " + ontology_name)
+    base_obo_path = os.path.join(data_dir, ontology_name)
+    obo_remote_path = os.path.join(remote_path, ontology_name)
+
+    # This will be true if the ontology will be replaced
+    # even if the version has not changed since last upload
+    replace_previous_transform = False
+
+    # Get OBO URL, from its registry entry if listed there
+    resolved = resolved_urls.get(ontology_name) or kg_obo.obolibrary_utils.resolve_url(
+        ontology, check_base=replace_base_obos
+    )
+    url = resolved["url"]
+    print(url)
+
+    # Check if we may have previously used a base version of the OBO -
+    # the base-obo's aren't really informative without reasoning,
+    # so we'll overwrite them if they exist, and
+    # if the replace_base_obos option was used.
+    if replace_base_obos and resolved.get("base_exists"):
+        replace_previous_transform = True
+
+    # Set up local directories
+    os.makedirs(data_dir, exist_ok=True)
+
+    # Each completed stage is checkpointed here
+    # Without resume, start over from nothing
+    checkpoint_path = checkpoint_file(data_dir, ontology_name)
+    job["checkpoint_path"] = checkpoint_path
+    job["resume"] = resume
+    if not resume:
+        clear_checkpoints(checkpoint_path)
+
+    # If the file hasn't changed since the current version was tracked, skip it here,
+    # without downloading any of it or parsing its header.
+    # An unfinished transform may have been tracked already, so this isn't done when resuming one.
+    tracked_validators = tracking.get("ontologies", {}).get(ontology_name, {}).get("validators", {})
+    if (
+        tracked_validators
+        and not replace_previous_transform
+        and not force_index_refresh
+        and not (resume and load_checkpoints(checkpoint_path))
+    ):
+        with measure_stage(result, "validate"):
+            unchanged = kg_obo.http_client.is_unchanged(url, tracked_validators)
+        if unchanged:
+            kg_obo_logger.info(f"{ontology_name} is unchanged since it was last transformed - skipping")
+            print(f"{ontology_name} is unchanged since it was last transformed - skipping")
+            result["status"] = "existing"
+            return False
+
+    # Downloaded OBOs are still tempfiles as we don't intend to keep them
+    # They are removed by discard_ontology once all stages are done
+    # They're kept under data_dir, so they may be hardlinked into the
+    # versioned OBO dir and the download cache, rather than copied
+    download_dir = os.path.join(data_dir, DOWNLOAD_DIR)
+    os.makedirs(download_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(prefix=ontology_name, dir=download_dir, delete=False) as tfile:
+        owl_file = tfile.name
+    job["owl_file"] = owl_file
+
+    # Some OBOs are quite large, so we check the IRI/version in the header
+    # as soon as it arrives, and only download the rest if this version is new.
+    # This is all one request - check_header decides whether it continues.
+    header: dict = {"checked": False, "existing": False, "checkpointed": {}}
+
+    def check_header(header_file: str) -> bool:
+        header["checked"] = True
+
+        # Provide parsed IRI and version info here
+        # If it wasn't in the versionIRI, add it to a list, because this is weird
+        owl_iri, owl_version, owl_version_format = get_owl_iri(header_file)
+        header.update({"owl_iri": owl_iri, "owl_version": owl_version})
+        kg_obo_logger.info(f"Current VersionIRI for {ontology_name}: {owl_iri}")
+        print(f"Current VersionIRI for {ontology_name}: {owl_iri}")
+        kg_obo_logger.info(f"Current version for {ontology_name}: {owl_version}")
+        print(f"Current version for {ontology_name}: {owl_version}")
+        kg_obo_logger.info(
+            f"In {ontology_name}, used this value for version: {owl_version_format}"
+        )
+        print(
+            f"In {ontology_name}, used this value for version: {owl_version_format}"
+        )
+        if owl_version_format != "versionIRI":
+            result["weird_version_format"] = True
+
+        # An interrupted run may have added this version to tracking
+        # before it finished uploading, so finish it regardless
+        unfinished = resume and has_checkpoints(checkpoint_path, owl_version)
+        if unfinished:
+            kg_obo_logger.info(f"Resuming unfinished transform of {ontology_name} {owl_version}")
+            print(f"Resuming unfinished transform of {ontology_name} {owl_version}")
+
+        # Check version here
+        # If it's already in the tracking file, do nothing more with it
+        # unless replace_previous_transform is True
+        if (
+            transformed_obo_exists(ontology_name, owl_iri, s3_test, bucket, tracking=tracking)
+            and not replace_previous_transform
+            and not unfinished
+        ):
+            header["existing"] = True
+            return False
+
+        # Check for imports, but don't retreive yet
+        header["imports"] = imports_requested(header_file)
+
+        # A previous run may have downloaded the whole OBO already
+        if resume:
+            header["checkpointed"] = get_checkpoint(checkpoint_path, owl_version, "download")
+        return not header["checkpointed"]
+
+    response_headers: dict = {}
+    content_hash: dict = {}
+    with measure_stage(result, "download", output_path=owl_file) as stage:
+        downloaded = download_ontology(
+            url=url,
+            file=owl_file,
+            logger=kg_obo_logger,
+            no_dl_progress=no_dl_progress,
+            header_only=False,
+            check_header=check_header,
+            download_cache=download_cache,
+            response_headers=response_headers,
+            chunk_size=download_chunk_size,
+            segments=download_segments,
+            content_hash=content_hash,
+        )
+        stage["bytes_downloaded"] = get_path_size(owl_file)
+        # If only the header was needed, this OBO wasn't downloaded
+        if header["existing"] or header["checkpointed"]:
+            stage["stage"] = "header"
+    if not downloaded or not header["checked"]:
+        kg_obo_logger.warning(
+            f"Failed to load due to KeyError: {ontology_name}"
+        )
+        result["status"] = "failed"
+        return False
+
+    owl_iri = header["owl_iri"]
+    owl_version = header["owl_version"]
+    # Only known if the whole OBO was downloaded, or was by a previous run
+    sha256 = content_hash.get("sha256", "")
+    if header["checkpointed"]:
+        sha256 = header["checkpointed"]["sha256"]
+
+    # Recorded in tracking, with the version if it's new,
+    # so the next run can tell whether the file has changed
+    result["validators"] = kg_obo.http_client.get_validators(url, response_headers)
+
+    if header["existing"]:
+        kg_obo_logger.info(
+            f"Have already transformed {ontology_name}: {owl_iri}"
+        )
+        print(f"Have already transformed {ontology_name}: {owl_iri} - skipping")
+        result["status"] = "existing"
+
+        # If requested, refresh the index.html even if we don't have a new version
+        # This won't touch the individual version directories
+        # Mock version isn't included here as we won't find existing versions under testing
+        if force_index_refresh and not s3_test:
+            print(f"Refreshing index on {bucket} for {obo_remote_path}")
+            if kg_obo.upload.update_index_files(
+                bucket, obo_remote_path, base_obo_path
+            ):
+                kg_obo_logger.info(f"Refreshed index for {ontology_name}")
+                print(f"Refreshed index for {ontology_name}")
+            else:
+                kg_obo_logger.info(
+                    f"Failed to refresh index for {ontology_name}"
+                )
+                print(f"Failed to refresh index for {ontology_name}")
+        return False
+
+    # The same file may have been transformed already as another version,
+    # so its transform is copied to this version rather than redone
+    same_content_version = ""
+    if not replace_previous_transform:
+        same_content_version = transformed_content_version(
+            ontology_name, sha256, s3_test, bucket, tracking=tracking
+        )
+    if same_content_version and same_content_version != owl_version:
+        kg_obo_logger.info(
+            f"{ontology_name} {owl_version} is the same file as version {same_content_version}"
+            " - will copy its transform."
+        )
+        print(
+            f"{ontology_name} {owl_version} is the same file as version {same_content_version}"
+            " - will copy its transform."
+        )
+        job.update(
+            {
+                "url": url,
+                "owl_iri": owl_iri,
+                "owl_version": owl_version,
+                "sha256": sha256,
+                "alias_of": same_content_version,
+                "need_imports": False,
+                "base_obo_path": base_obo_path,
+                "obo_remote_path": obo_remote_path,
+                "versioned_obo_path": os.path.join(base_obo_path, owl_version),
+            }
+        )
+        return True
+    else:
+        kg_obo_logger.info(
+            f"Don't have this version of {ontology_name} yet - will transform."
+        )
+        print(
+            f"Don't have this version of {ontology_name} yet - will transform."
+        )
+
+    need_imports = False
+    imports = header["imports"]
+    if len(imports) > 0:
+        fimports = ", ".join(imports)
+        kg_obo_logger.info(
+            f"Header for {ontology_name} requests these imports: {fimports}"
+        )
+        print(f"Header for {ontology_name} requests these imports: {fimports}")
+        need_imports = True
+    else:
+        kg_obo_logger.info(f"No imports found for {ontology_name}.")
+        print(f"No imports found for {ontology_name}.")
+
+    # Set up output folders for completed transform
+    if not os.path.exists(base_obo_path):
+        print(f"Making directory {base_obo_path}.")
+        os.mkdir(base_obo_path)
+    versioned_obo_path = os.path.join(base_obo_path, owl_version)
+    if not os.path.exists(versioned_obo_path):
+        print(f"Making directory {versioned_obo_path}.")
+        os.mkdir(versioned_obo_path)
+
+    # The downloaded OBO starts as a temp file, but once we have the full version we
+    # copy it to the same dir as where transforms will go.
+    # It may share its contents with the download cache, so is never modified in place.
+    orig_local_path = os.path.join(
+        versioned_obo_path, ontology_name + ".owl"
+    )
+    if header["checkpointed"]:
+        kg_obo_logger.info(f"Resuming from checkpoint: {orig_local_path}")
+        print(f"Resuming from checkpoint: {orig_local_path}")
+        link_or_copy(orig_local_path, owl_file)
+    else:
+        kg_obo_logger.info(f"Completed download from {url} to {owl_file}.")
+        print(f"Completed download from {url} to {owl_file}.")
+        kg_obo_logger.info(f"Moving from {owl_file} to {orig_local_path}.")
+        print(f"Moving from {owl_file} to {orig_local_path}.")
+        link_or_copy(owl_file, orig_local_path)
+        record_checkpoint(checkpoint_path, owl_version, "download", orig_local_path, sha256=sha256)
+
+    # Write the current KG-OBO git commit
+    version_info_path = os.path.join(versioned_obo_path, "kg-obo_version")
+    with open(version_info_path, "w") as version_info_file:
+        import git
+
+        repo = git.Repo(search_parent_directories=True)
+        current_commit_hash = repo.head.object.hexsha
+        version_info_file.write(current_commit_hash)
+
+    job.update(
+        {
+            "url": url,
+            "owl_iri": owl_iri,
+            "owl_version": owl_version,
+            "sha256": sha256,
+            "need_imports": need_imports,
+            "base_obo_path": base_obo_path,
+            "obo_remote_path": obo_remote_path,
+            "versioned_obo_path": versioned_obo_path,
+        }
+    )
+
+    return True
+
+
+def resume_checkpoint(job: dict, stage: str) -> dict:
+    """
+    When resuming, gets the checkpoint for a stage of an OBO transform,
+    so the stage may be skipped.
+    :param job: dict from new_transform_job, after fetch_ontology
+    :param stage: str name of stage, e.g., relax
+    :return: dict of checkpoint, or empty dict if the stage must be run
+    """
+
+    checkpoint = {}
+    if job["resume"]:
+        checkpoint = get_checkpoint(job["checkpoint_path"], job["owl_version"], stage)
+    if checkpoint:
+        ontology_name = job["result"]["name"]
+        logging.getLogger("kg-obo").info(f"Resuming {ontology_name} after {stage} stage.")
+        print(f"Resuming {ontology_name} after {stage} stage.")
+
+    return checkpoint
+
+
+def run_chained_preprocessing(job: dict, robot_path: str, robot_env: dict) -> dict:
+    """
+    Runs all of the ROBOT preprocessing process_ontology needs as one chained
+    ROBOT command: relax, convert to JSON, then merge imports if needed,
+    and export IDs from the result. Each step's output is saved just where
+    process_ontology would have saved it by running the steps one at a time.
+    :param job: dict from new_transform_job, after fetch_ontology
+    :param robot_path: str of path to robot
+    :param robot_env: dict of environment variables, including ROBOT_JAVA_ARGS
+    :return: dict of each stage (relax, merge, names, and convert) to the path of its output,
+    or an empty dict if the chain failed
+    """
+
+    kg_obo_logger = logging.getLogger("kg-obo")
+
+    ontology_name = job["result"]["name"]
+    outputs = {}
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{ontology_name}_relaxed.owl") as tfile_relaxed:
+        outputs["relax"] = tfile_relaxed.name
+    if job["need_imports"]:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=f"_{ontology_name}_merged.owl") as tfile_merged:
+            outputs["merge"] = tfile_merged.name
+    # IDs are exported from the OBO with its imports, but it's converted without them
+    outputs["names"] = outputs.get("merge", outputs["relax"]) + ".ids.csv"
+    outputs["convert"] = os.path.join(job["versioned_obo_path"], f"{ontology_name}.json")
+
+    chain = RobotChain(job["owl_file"]).relax(outputs["relax"]).convert(outputs["convert"])
+    if "merge" in outputs:
+        chain.merge(outputs["merge"])
+    chain.export_ids(outputs["names"])
+
+    kg_obo_logger.info(f"ROBOT preprocessing: chained {ontology_name}")
+    print(f"ROBOT preprocessing: chained {ontology_name}")
+    if not chain.run(robot_path, robot_env):
+        kg_obo_logger.warning(
+            f"Chained ROBOT preprocessing of {ontology_name} failed - running each step alone."
+        )
+        print(f"Chained ROBOT preprocessing of {ontology_name} failed - running each step alone.")
+        for path in outputs.values():
+            if os.path.exists(path):
+                os.remove(path)
+        return {}
+
+    if os.path.exists(outputs["convert"]):
+        neutralize_prefixes(outputs["convert"])
+
+    return outputs
+
+
+def process_ontology(
+    job: dict,
+    robot_path: str,
+    robot_env: dict,
+    curie_converter: Optional["Converter"] = None,
+    iri_converter: Optional["Converter"] = None,
+) -> bool:
+    """
+    Second stage of an OBO transform: preprocess the downloaded OBO
+    with ROBOT, transform it with KGX, and post-process the graph.
+    :param job: dict from new_transform_job, after fetch_ontology
+    :param robot_path: str of path to robot
+    :param robot_env: dict of environment variables, including ROBOT_JAVA_ARGS
+    :param curie_converter: a curies Converter, from CURIE prefix to IRI prefix -
+    if not provided, the cached converters from get_converters are used
+    :param iri_converter: a curies Converter, from IRI prefix to CURIE prefix
+    :return: bool, True if the OBO should continue to the next stage
+    """
+
+    kg_obo_logger = logging.getLogger("kg-obo")
+    kgx_logger = get_logger()
+
+    if curie_converter is None or iri_converter is None:
+        curie_converter, iri_converter = get_converters()
+
+    result = job["result"]
+    ontology_name = result["name"]
+
+    # The same file was transformed as another version, so publish_ontology copies that
+    if job.get("alias_of"):
+        result["status"] = "success"
+        job["success"] = True
+        return True
+
+    owl_file = job["owl_file"]
+    owl_version = job["owl_version"]
+    need_imports = job["need_imports"]
+    versioned_obo_path = job["versioned_obo_path"]
+    checkpoint_path = job["checkpoint_path"]
+
+    # A new transform chains all ROBOT preprocessing into one command, so the OBO is
+    # parsed once. Each output is then checked as usual, and if the chain fails,
+    # the steps are run one at a time instead.
+    chained = {}
+    if not (job["resume"] and has_checkpoints(checkpoint_path, owl_version)):
+        with measure_stage(result, "chain", owl_file):
+            chained = run_chained_preprocessing(job, robot_path, robot_env)
+
+    # Run ROBOT preprocessing here - relax all, then do merge -> convert if needed
+    relaxed = resume_checkpoint(job, "relax")
+    if relaxed:
+        relaxed_path = relaxed["path"]
+    elif "relax" in chained:
+        relaxed_path = chained["relax"]
+    else:
+        kg_obo_logger.info(f"ROBOT preprocessing: relax {ontology_name}")
+        print(f"ROBOT preprocessing: relax {ontology_name}")
+        temp_suffix = f"_{ontology_name}_relaxed.owl"
+        tfile_relaxed = tempfile.NamedTemporaryFile(
+            delete=False, suffix=temp_suffix
+        )
+        relaxed_path = tfile_relaxed.name
+        with measure_stage(result, "relax", owl_file, relaxed_path):
+            relax_success = relax_owl(robot_path, owl_file, relaxed_path, robot_env)
+        if not relax_success:
+            kg_obo_logger.error(
+                f"ROBOT relaxing of {ontology_name} failed - skipping."
+            )
+            print(f"ROBOT relaxing of {ontology_name} failed - skipping.")
+            tfile_relaxed.close()
+            return False
+        tfile_relaxed.close()
+
+    # Each file is probed once, in one pass - the relaxed file is compared again after merging
+    before_probe = probe_file(owl_file)
+    relaxed_probe = probe_file(relaxed_path)
+    log_probes("relax", before_probe, relaxed_probe)
+
+    if relaxed_probe["lines"] == 0:
+        kg_obo_logger.error(
+            f"ROBOT relaxing of {ontology_name} yielded an empty result!"
+        )
+        print(f"ROBOT relaxing of {ontology_name} yielded an empty result!")
+        return False  # Need to skip this one or we will upload empty results
+
+    if not relaxed:
+        record_checkpoint(checkpoint_path, owl_version, "relax", relaxed_path)
+
+    # If we have imports, merge+convert to resolve
+    # Don't do this every time as it is not necessary
+    # We don't convert to JSON just yet
+    if need_imports:
+
+        merged = resume_checkpoint(job, "merge")
+        if merged:
+            merged_path = merged["path"]
+        elif "merge" in chained:
+            merged_path = chained["merge"]
+        else:
+            print(f"ROBOT preprocessing: merge and convert {ontology_name}")
+            temp_suffix = f"_{ontology_name}_merged.owl"
+            tfile_merged = tempfile.NamedTemporaryFile(
+                delete=False, suffix=temp_suffix
+            )
+            merged_path = tfile_merged.name
+            with measure_stage(result, "merge", relaxed_path, merged_path):
+                merge_success = merge_and_convert_owl(
+                    robot_path, relaxed_path, merged_path, robot_env
+                )
+            if not merge_success:
+                kg_obo_logger.error(
+                    f"ROBOT merge of {ontology_name} failed - skipping."
+                )
+                print(f"ROBOT merge of {ontology_name} failed - skipping.")
+                tfile_merged.close()
+                return False
+            tfile_merged.close()
+
+        merged_probe = probe_file(merged_path)
+        log_probes("merge", relaxed_probe, merged_probe)
+
+        if merged_probe["lines"] == 0:
+            kg_obo_logger.error(
+                f"ROBOT merging of {ontology_name} yielded an empty result!"
+            )
+            print(f"ROBOT merging of {ontology_name} yielded an empty result!")
+            return False  # Need to skip this one or we will upload empty results
+
+        if not merged:
+            record_checkpoint(checkpoint_path, owl_version, "merge", merged_path)
+
+        input_owl = merged_path
+
+    else:
+
+        input_owl = relaxed_path
+
+    # Get all ids from the input owl and identify normalized forms
+    # We use this later to convert IDs
+    if not resume_checkpoint(job, "names"):
+        print(f"ROBOT preprocessing: node ID normalization on {ontology_name}")
+        with measure_stage(result, "names", input_owl):
+            names_success = examine_owl_names(
+                robot_path,
+                input_owl,
+                versioned_obo_path,
+                curie_converter,
+                iri_converter,
+                robot_env,
+                exported="names" in chained,
+            )
+        if not names_success:
+            kg_obo_logger.error(
+                f"ROBOT id retrieval for {ontology_name} failed - skipping."
+            )
+            print(f"ROBOT id retrieval for {ontology_name} failed - skipping.")
+        else:
+            record_checkpoint(checkpoint_path, owl_version, "names")
+
+    # Convert to JSON
+    ontology_filename = f"{ontology_name}.json"
+    owl_converted = os.path.join(versioned_obo_path, ontology_filename)
+    if not resume_checkpoint(job, "convert"):
+        if "convert" in chained:
+            convert_success = True
+        else:
+            print(f"ROBOT preprocessing: convert {ontology_name}")
+            with measure_stage(result, "convert", relaxed_path, owl_converted):
+                convert_success = convert_owl(
+                    robot_path, relaxed_path, owl_converted, robot_env
+                )
+        if not convert_success:
+            kg_obo_logger.error(
+                f"ROBOT convert of {ontology_name} failed - skipping."
+            )
+            print(f"ROBOT convert of {ontology_name} failed - skipping.")
+            return False
+
+        if not os.path.exists(owl_converted):
+            kg_obo_logger.error(
+                f"ROBOT convert of {ontology_name} yielded no result!"
+            )
+            print(f"ROBOT convert of {ontology_name} yielded no result!")
+            return False  # Need to skip this one or we will upload empty results
+
+        record_checkpoint(checkpoint_path, owl_version, "convert", owl_converted)
+
+    input_owl = owl_converted
+
+    # Use kgx to transform, but save errors to log
+    # Do separate transforms for different output formats
+    success = True  # for all transforms
+    errors = False  # for all transforms
+    if not resume_checkpoint(job, "graph"):
+        output_format = "tsv"
+        all_success_and_errors = {}
+        print(f"Transforming {ontology_name} to {output_format}...")
+        kg_obo_logger.info(f"Transforming to {output_format}...")
+        if output_format == "tsv":
+            ontology_filename = f"{ontology_name}_kgx_tsv"
+        else:
+            ontology_filename = f"{ontology_name}_kgx"
+        output_path = os.path.join(versioned_obo_path, ontology_filename)
+        with measure_stage(result, "kgx", input_owl, output_path + ".tar.gz"):
+            this_success, this_errors, this_output_msg = kgx_transform(
+                input_file=[input_owl],
+                input_format="obojson",
+                output_file=output_path,
+                output_format=output_format,
+                logger=kgx_logger,
+                knowledge_sources=[
+                    ("knowledge_source", f"{ontology_name.upper()} {owl_version}")
+                ],
+            )
+        all_success_and_errors[output_format] = (this_success, this_errors)
+        kg_obo_logger.info(this_output_msg)
+
+        # Check results of all transforms
+        if output_format == "tsv" and not all_success_and_errors[output_format][0]:
+            success = False
+        if all_success_and_errors[output_format][1]:
+            errors = True
+            result["halt"] = True
+            return False
+
+        # Time for post-processing.
+        print(f"Post-processing {ontology_name}...")
+        kg_obo_logger.info(f"Post-processing {ontology_name}...")
+        input_file = os.path.join(versioned_obo_path, ontology_filename + ".tar.gz")
+        with measure_stage(result, "normalize", input_file, input_file):
+            normalize_success = clean_and_normalize_graph(input_file)
+        if not normalize_success:
+            success = False
+            print(f"Failed post-processing {ontology_name}...")
+            kg_obo_logger.info(f"Failed post-processing {ontology_name}...")
+
+        # Check file size and fail/warn if nodes|edge file is empty
+        for filename in os.listdir(versioned_obo_path):
+            if filename.endswith(".tar.gz"):
+                filesize = os.stat(
+                    os.path.join(versioned_obo_path, filename)
+                ).st_size
+                if filesize < 400:
+                    kg_obo_logger.warning(
+                        f"{filename} appears to contain empty graph files - something went wrong."
+                    )
+                    print(f"{filename} appears to contain empty graph files - something went wrong.")
+                    success = False
+
+        if success:
+            record_checkpoint(checkpoint_path, owl_version, "graph", input_file)
+
+    if success and not errors:
+        kg_obo_logger.info(
+            f"Successfully completed transform of {ontology_name}"
+        )
+        result["status"] = "success"
+
+    elif success and errors:
+        kg_obo_logger.info(
+            f"Completed transform of {ontology_name} with errors - see logs for details."
+        )
+        result["status"] = "errors"
+    else:
+        kg_obo_logger.warning(f"Failed to transform {ontology_name}")
+        result["status"] = "failed"
+
+    job["success"] = success
+
+    return True
+
+
+def process_ontology_job(job: dict, robot_path: str, robot_env: dict) -> tuple:
+    """
+    Runs process_ontology in a worker process, with the converters
+    the process inherited, and sends back its copy of the job.
+    :param job: dict from new_transform_job, after fetch_ontology
+    :param robot_path: str of path to robot
+    :param robot_env: dict of environment variables, including ROBOT_JAVA_ARGS
+    :return: tuple of (bool, True if the OBO should continue to the next stage,
+    dict of the job as updated by process_ontology)
+    """
+
+    return (process_ontology(job, robot_path, robot_env), job)
+
+
+def publish_ontology(
+    job: dict,
+    bucket: str = "bucket",
+    save_local=False,
+    s3_test=False,
+    force_overwrite=False,
+    remote_path="kg-obo",
+    defer_tracking=False,
+) -> bool:
+    """
+    Last stage of an OBO transform: record the new version in tracking,
+    then upload the transform and update its indexes.
+    Incomplete transforms are only cleaned up here.
+    :param job: dict from new_transform_job, after process_ontology
+    :param bucket: str of S3 bucket
+    :param save_local: bool for whether to retain transform results on local disk
+    :param s3_test: bool for whether to perform mock S3 upload only
+    :param force_overwrite: bool, if True, will overwrite existing transform files on bucket
+    :param remote_path: str of remote path on S3 bucket
+    :param defer_tracking: bool, if True, return the new tracking entry
+    as "tracking" in the result rather than writing it to tracking.yaml
+    :return: bool, True if the transform was successful
+    """
+
+    kg_obo_logger = logging.getLogger("kg-obo")
+
+    result = job["result"]
+    ontology_name = result["name"]
+    owl_iri = job["owl_iri"]
+    owl_version = job["owl_version"]
+    base_obo_path = job["base_obo_path"]
+    obo_remote_path = job["obo_remote_path"]
+    versioned_obo_path = job["versioned_obo_path"]
+    checkpoint_path = job["checkpoint_path"]
+    success = job["success"]
+
+    if success:
+        versioned_remote_path = os.path.join(
+            remote_path, ontology_name, owl_version
+        )
+        if not s3_test:
+            # Write to remote tracking file
+            # Concurrent runs leave this to the parent process,
+            # as tracking.yaml can only be safely updated by one process at a time
+            if defer_tracking:
+                result["tracking"] = (ontology_name, owl_iri, owl_version, job["sha256"])
+            elif not resume_checkpoint(job, "tracking"):
+                kg_obo_logger.info(
+                    f"Adding {ontology_name} version {owl_version} to tracking file."
+                )
+                track_obo_version(ontology_name, owl_iri, owl_version, bucket, sha256=job["sha256"])
+                record_checkpoint(checkpoint_path, owl_version, "tracking")
+
+            # Upload the most recently transformed version to bucket
+            # Include the original OWL too (this already happens because it's in the new dir)
+            # Include the current KG-OBO git commit (ditto)
+            # Also verify that files have the expected name format
+            if job.get("alias_of"):
+                # The bucket already has this transform, as another version,
+                # so it's copied there without downloading or uploading it
+                alias_remote_path = os.path.join(
+                    remote_path, ontology_name, job["alias_of"]
+                )
+                kg_obo_logger.info(
+                    f"Copying {alias_remote_path} to {versioned_remote_path}..."
+                )
+                with measure_stage(result, "copy"):
+                    filelist = kg_obo.upload.copy_remote_dir(
+                        bucket,
+                        alias_remote_path,
+                        versioned_remote_path,
+                        make_public=True,
+                        force_overwrite=force_overwrite
+                    )
+            else:
+                kg_obo_logger.info(
+                    f"Uploading {versioned_obo_path} to {versioned_remote_path}..."
+                )
+                with measure_stage(result, "upload", versioned_obo_path) as stage:
+                    filelist = kg_obo.upload.upload_dir_to_s3(
+                        versioned_obo_path,
+                        bucket,
+                        versioned_remote_path,
+                        make_public=True,
+                        force_overwrite=force_overwrite
+                    )
+                    stage["bytes_uploaded"] = stage["input_bytes"]
+            if not kg_obo.upload.verify_uploads(filelist, ontology_name):
+                kg_obo_logger.info(
+                    f"Transform filenames for {ontology_name} and {owl_version} are incorrect!"
+                )
+
+            # Update indexes for this version and OBO only
+            if kg_obo.upload.update_index_files(
+                bucket, versioned_remote_path, base_obo_path
+            ) and kg_obo.upload.update_index_files(
+                bucket, obo_remote_path, base_obo_path
+            ):
+                kg_obo_logger.info(
+                    f"Created index for {ontology_name} and {owl_version}"
+                )
+            else:
+                kg_obo_logger.info(
+                    f"Failed to create index for {ontology_name} and {owl_version}"
+                )
+
+        else:
+            kg_obo_logger.info(
+                f"Mock uploading {versioned_obo_path} to {versioned_remote_path}..."
+            )
+            with measure_stage(result, "upload", versioned_obo_path) as stage:
+                filelist = kg_obo.upload.mock_upload_dir_to_s3(
+                    versioned_obo_path,
+                    bucket,
+                    versioned_remote_path,
+                    make_public=True,
+                )
+                stage["bytes_uploaded"] = stage["input_bytes"]
+            if not kg_obo.upload.verify_uploads(filelist, ontology_name):
+                kg_obo_logger.info(
+                    f"Transform filenames for {ontology_name} and {owl_version} are incorrect!"
+                )
+
+            if kg_obo.upload.mock_update_index_files(
+                bucket, versioned_remote_path, base_obo_path
+            ) and kg_obo.upload.mock_update_index_files(
+                bucket, obo_remote_path, base_obo_path
+            ):
+                kg_obo_logger.info(
+                    f"Mock created index for {ontology_name} and {owl_version}"
+                )
+            else:
+                kg_obo_logger.info(
+                    f"Failed to mock create index for {ontology_name} and {owl_version}"
+                )
+
+    # Clean up any incomplete transform leftovers
+    if not success and not save_local:
+        if delete_path(base_obo_path):
+            kg_obo_logger.info(
+                f"Removed incomplete transform files for {ontology_name}."
+            )
+        else:
+            kg_obo_logger.warning(
+                f"Incomplete version of {ontology_name} may be present."
+            )
+
+    # This transform is finished either way, so there's nothing to resume
+    clear_checkpoints(checkpoint_path)
+
+    return success
+
+
+def discard_ontology(job: dict) -> None:
+    """
+    Removes the temporary download of an OBO, once all stages are done with it.
+    :param job: dict from new_transform_job
+    """
+
+    if "owl_file" in job and os.path.exists(job["owl_file"]):
+        os.remove(job["owl_file"])
+
+
+def transform_ontology(
+    ontology: dict,
+    robot_path: str,
+    robot_env: dict,
+    curie_converter: Optional["Converter"] = None,
+    iri_converter: Optional["Converter"] = None,
+    bucket: str = "bucket",
+    save_local=False,
+    s3_test=False,
+    no_dl_progress=False,
+    force_index_refresh=False,
+    replace_base_obos=False,
+    force_overwrite=False,
+    data_dir="data",
+    remote_path="kg-obo",
+    defer_tracking=False,
+    resume=False,
+    resolved_urls: dict = {},
+    download_cache: Optional[DownloadCache] = None,
+    tracking: dict = {},
+    download_chunk_size: int = parse_memory_size(DEFAULT_CHUNK_SIZE),
+    download_segments: int = 1,
+    process: Optional[Callable] = None,
+) -> dict:
+    """
+    Download, transform, and upload a single OBO.
+    This runs each stage of the transform for one OBO in turn,
+    so it may be run for several OBOs at once by separate workers.
+    :param ontology: dict of OBO Foundry registry entry for this OBO
+    :param robot_path: str of path to robot
+    :param robot_env: dict of environment variables, including ROBOT_JAVA_ARGS
+    :param curie_converter: a curies Converter, from CURIE prefix to IRI prefix
+    :param iri_converter: a curies Converter, from IRI prefix to CURIE prefix
+    :param bucket: str of S3 bucket
+    :param save_local: bool for whether to retain transform results on local disk
+    :param s3_test: bool for whether to perform mock S3 upload only
+    :param no_dl_progress: bool for whether to hide download progress bars
+    :param force_index_refresh: bool for whether to rebuild index.html on remote
+    :param replace_base_obos: bool for whether to replace previous base OBO transforms
+    :param force_overwrite: bool, if True, will overwrite existing transform files on bucket
+    :param data_dir: str of local dir where data should be saved
+    :param remote_path: str of remote path on S3 bucket
+    :param defer_tracking: bool, if True, return the new tracking entry
+    as "tracking" in the result rather than writing it to tracking.yaml
+    :param resume: bool, if True, continue from any checkpoints left by an interrupted run
+    :param resolved_urls: dict from obolibrary_utils.resolve_urls, if URLs were resolved up front
+    :param download_cache: DownloadCache of previous downloads, if any
+    :param tracking: dict of tracking contents, loaded at the start of the run, if any
+    :param download_chunk_size: int of bytes to read and write at a time while downloading
+    :param download_segments: int of Range requests to download large OBOs with at once
+    :param process: function to run the second stage with, called with the job and
+    returning a bool as process_ontology does - e.g., to process the OBO in a worker
+    process, within a memory budget - if not provided, process_ontology is called here
+    :return: dict with the OBO name, its transform status
+    ("success", "errors", "failed", "existing", or "incomplete"),
+    whether its version was found outside versionIRI,
+    and whether the run should halt
+    """
+
+    job = new_transform_job(ontology)
+
+    try:
+        if fetch_ontology(
+            job,
+            bucket=bucket,
+            s3_test=s3_test,
+            no_dl_progress=no_dl_progress,
+            force_index_refresh=force_index_refresh,
+            replace_base_obos=replace_base_obos,
+            data_dir=data_dir,
+            remote_path=remote_path,
+            resume=resume,
+            resolved_urls=resolved_urls,
+            download_cache=download_cache,
+            tracking=tracking,
+            download_chunk_size=download_chunk_size,
+            download_segments=download_segments,
+        ) and (
+            process(job) if process
+            else process_ontology(job, robot_path, robot_env, curie_converter, iri_converter)
+        ):
+            publish_ontology(
+                job,
+                bucket=bucket,
+                save_local=save_local,
+                s3_test=s3_test,
+                force_overwrite=force_overwrite,
+                remote_path=remote_path,
+                defer_tracking=defer_tracking,
+            )
+    finally:
+        discard_ontology(job)
+
+    return job["result"]
+
+
+def adapt_robot_env(
+    robot_env: dict,
+    name: str,
+    input_size: int = 0,
+    previous_peak: int = 0,
+    cap: int = 0,
+    needs_merge: bool = True,
+) -> tuple:
+    """
+    Sizes ROBOT's heap for one OBO, as choose_robot_heap, and logs the choice.
+    OBOs with nothing to size them by get the heap already in robot_env,
+    as do OBOs whose imports may be merged, until ROBOT's peak for them is known.
+    :param robot_env: dict of environment variables, including ROBOT_JAVA_ARGS
+    :param name: str of OBO ID, e.g., bfo
+    :param input_size: int of bytes of OBO file, or 0 if unknown
+    :param previous_peak: int of bytes of ROBOT's peak memory use for this OBO in a previous run,
+    or 0 if unknown
+    :param cap: int of most bytes of heap to allow, or 0 for no limit
+    :param needs_merge: bool, True if the OBO's imports will be merged, or if that isn't known yet
+    :return: tuple of (dict of environment variables for ROBOT, int of bytes of heap)
+    """
+
+    kg_obo_logger = logging.getLogger("kg-obo")
+
+    heap = choose_robot_heap(input_size, previous_peak, cap, get_robot_heap(robot_env), needs_merge)
+    ontology_env = set_robot_heap(robot_env, heap)
+
+    kg_obo_logger.info(
+        f"ROBOT settings for {name}: {ontology_env['ROBOT_JAVA_ARGS']} "
+        f"(OBO of {input_size} bytes, previous peak of {previous_peak} bytes, cap of {cap} bytes, "
+        f"merge {'possible' if needs_merge else 'not needed'})"
+    )
+
+    return (ontology_env, heap)
+
+
+def run_transform(
+    skip: list = [],
+    get_only: list = [],
+    bucket="bucket",
+    save_local=False,
+    s3_test=False,
+    no_dl_progress=False,
+    force_index_refresh=False,
+    replace_base_obos=False,
+    robot_path: str = os.path.join(os.getcwd(), "robot"),
+    lock_file_remote_path: str = "kg-obo/lock",
+    force_overwrite=False,
+    log_dir="logs",
+    data_dir="data",
+    remote_path="kg-obo",
+    track_file_local_path: str = "data/tracking.yaml",
+    tracking_file_remote_path: str = KGOBO_TRACK_FILE,
+    workers: int = 1,
+    memory_budget: str = "",
+    pipeline=False,
+    resume=False,
+    registry_order=False,
+    shard: str = "",
+    shard_plan: str = "",
+    queue_path: str = "",
+    queue_run: str = "",
+    download_cache_dir: str = "",
+    download_cache_size: str = DEFAULT_CACHE_SIZE,
+    download_chunk_size: str = DEFAULT_CHUNK_SIZE,
+    download_segments: int = 1,
+) -> bool:
+    """
+    Perform setup, then kgx-mediated transforms for all specified OBOs.
+    :param skip: list of OBOs to skip, by ID
+    :param get_only: list of OBOs to transform, by ID (otherwise do all)
+    :param bucket: str of S3 bucket, to be specified as argument
+    :param save_local: bool for whether to retain transform results on local disk
+    :param s3_test: bool for whether to perform mock S3 upload only
+    :param no_dl_progress: bool for whether to hide download progress bars
+    :param force_index_refresh: bool for whether to rebuild all index.html on remote
+    :param robot_path: str of path to robot, if different from default (bin/robot) - don't need '.jar' extension
+    :param lock_file_remote_path: str of path for lock file on S3
+    :param force_overwrite: bool, if True, will overwrite existing transform files on bucket
+    :param log_dir: str of local dir where any logs should be saved
+    :param data_dir: str of local dir where data should be saved
+    :param remote_path: str of remote path on S3 bucket
+    :param track_file_local_path: str of local path for tracking file
+    :param tracking_file_remote_path: str of path of tracking file on S3
+    :param workers: int of how many OBOs to transform at once
+    :param memory_budget: str of total memory available to concurrent ROBOT processes,
+    in the same format as a Java heap size (e.g., 100g) - defaults to all system memory
+    :param pipeline: bool, if True, overlap downloads and uploads with transforms
+    by running each stage of the transform in its own workers
+    :param resume: bool, if True, continue each OBO from the last stage it completed
+    in an interrupted run, as recorded in checkpoints under data_dir
+    :param registry_order: bool, if True, transform OBOs in OBO Foundry registry order,
+    rather than most expensive first
+    :param shard: str of which shard of the OBOs to transform, as i/N for shard i of N
+    (from 0) - each shard may be run at once on a different host
+    :param shard_plan: str of path to a plan from plan.make_plan, used to balance
+    shards by estimated cost - all shards must use the same plan
+    :param queue_path: str of path to a SQLite work queue shared with other runs;
+    OBOs are published to the queue, then claimed from it one at a time by each worker
+    of each run, so other runs (e.g., on other hosts) may share the work
+    :param queue_run: str identifying the jobs in the work queue that this run shares;
+    all runs sharing the work must use the same one - defaults to the current UTC date,
+    so the same queue file may be reused on a later day
+    :param download_cache_dir: str of directory to keep downloaded OBOs in between runs,
+    so unchanged OBOs aren't downloaded again - if empty, downloads aren't kept
+    :param download_cache_size: str of total size of cached downloads, in the same format
+    as a Java heap size (e.g., 20g), beyond which the least recently used are removed -
+    if 0, downloads aren't kept
+    :param download_chunk_size: str of bytes to read and write at a time while downloading,
+    in the same format as a Java heap size (e.g., 1m)
+    :param download_segments: int of Range requests to download each large OBO with at once,
+    where its server accepts them - if 1, each OBO is downloaded as a single stream
+    :return: boolean indicating success or existing run encountered (False for unresolved error)
+    """
+
+    print("Setting up ROBOT...")
+    if not robot_path:
+        robot_path = os.path.join(os.getcwd(), "robot")
+    robot_params = initialize_robot(robot_path)
+    print(f"ROBOT path: {robot_path}")
+    robot_env = robot_params[1]
+    print(f"ROBOT evironment variables: {robot_env['ROBOT_JAVA_ARGS']}")
+
+    if not robot_params[0]:  # i.e., if we couldn't find ROBOT
+        sys.exit(
+            "\t*** Could not locate ROBOT - ensure it is available and executable. \n\tExiting..."
+        )
+
+    # Set up logging
     timestring = (datetime.now()).strftime("%Y-%m-%d_%H-%M-%S")
     log_path = os.path.join(log_dir, "obo_transform_" + timestring + ".log")
     log_level = logging.INFO
@@ -749,37 +2364,53 @@ def run_transform(
     kgx_logger.addHandler(root_logger_handler)
 
     # Set up CURIE checking and conversion converters
-    # We need both maps for CURIE -> IRI (for validating) - this is curie_converter
-    # and for IRI -> CURIE (for converting) - this is iri_converter
-    # Note: not all prefixes in all_contexts are in all_reverse_contexts
-    curie_contexts = load_multi_context(["obo", "bioregistry.upper"])
-    all_contexts = curie_contexts.as_dict()
-    all_contexts = {key: val for key, val in all_contexts.items()}
-    curie_converter = Converter.from_prefix_map(all_contexts)
-    all_reverse_contexts = {val: key for key, val in all_contexts.items()}
-    all_reverse_contexts_lc = {val.lower(): key for key, val in all_contexts.items()}
-    all_reverse_contexts.update(all_reverse_contexts_lc)
-    all_reverse_contexts.update(KGOBO_PREFIXES)
-    iri_converter = Converter.from_reverse_prefix_map(all_reverse_contexts)
+    # These are cached on disk, so are only built when the prefix maps change
+    curie_converter, iri_converter = get_converters()
+
+    # A cache size of 0 keeps no downloads
+    download_cache = None
+    if download_cache_dir and parse_memory_size(download_cache_size) > 0:
+        download_cache = DownloadCache(
+            download_cache_dir, parse_memory_size(download_cache_size)
+        )
+        kg_obo_logger.info(f"Caching downloads in {download_cache_dir}, up to {download_cache_size}.")
+
+    # Downloads are limited across all workers, so the limits are set up
+    # before any worker processes are forked
+    kg_obo.governor.get_governor()
+
+    # Each shard of a sharded run has its own lock, so shards may run at once,
+    # but no shard may run alongside an unsharded run
+    # Runs sharing a work queue are each treated as a shard
+    queue_worker = get_worker_id() if queue_path else ""
+    distributed = bool(shard or queue_path)
+    run_lock_path = get_shard_lock_path(lock_file_remote_path, shard, queue_worker)
+    shard_lock_prefix = lock_file_remote_path + "-shard-"
 
     # Check if there's already a run in progress (i.e., lock file exists)
     # This isn't an error so it does not trigger an exit
     if s3_test:
-        if kg_obo.upload.mock_check_lock(bucket, lock_file_remote_path):
+        if kg_obo.upload.mock_check_lock(bucket, run_lock_path):
             print("Could not mock checking for lock file. Exiting...")
             return True
     else:
         if kg_obo.upload.check_lock(bucket, lock_file_remote_path):
             print("A kg-obo run appears to be in progress. Exiting...")
             return True
+        if distributed and kg_obo.upload.check_lock(bucket, run_lock_path):
+            print(f"A kg-obo run of shard {shard or queue_worker} appears to be in progress. Exiting...")
+            return True
+        if not distributed and kg_obo.upload.find_locks(bucket, shard_lock_prefix):
+            print("A sharded kg-obo run appears to be in progress. Exiting...")
+            return True
 
     # Now set the lockfile
     if s3_test:
-        if not kg_obo.upload.mock_set_lock(bucket, lock_file_remote_path, unlock=False):
+        if not kg_obo.upload.mock_set_lock(bucket, run_lock_path, unlock=False):
             print("Could not mock setting lock file. Exiting...")
             return False
     else:
-        if not kg_obo.upload.set_lock(bucket, lock_file_remote_path, unlock=False):
+        if not kg_obo.upload.set_lock(bucket, run_lock_path, unlock=False):
             print("Could not set lock file on remote server. Exiting...")
             return False
 
@@ -827,14 +2458,64 @@ def run_transform(
             kg_obo_logger.info(f"Failed to mock refresh root index at {remote_path}")
             print(f"Failed to mock refresh root index at {remote_path}")
 
+    # Each OBO's version and validators are checked against tracking as it was at the start
+    # Only this run may track these OBOs, so it can't have changed for them since
+    tracking: dict = {}
+    if not s3_test:
+        os.makedirs(data_dir, exist_ok=True)
+        try:
+            tracking = load_tracking(bucket, track_file_local_path, tracking_file_remote_path)
+        except Exception as e:
+            kg_obo_logger.warning(f"Could not load tracking file - will load it for each OBO: {e}")
+
     # Get the OBO Foundry list YAML and process each
     yaml_onto_list_filtered = retrieve_obofoundry_yaml(skip=skip, get_only=get_only)
 
+    # Only transform this host's shard of the OBOs
+    if shard:
+        shard_costs = load_plan_costs(shard_plan) if shard_plan else {}
+        yaml_onto_list_filtered = select_shard(
+            yaml_onto_list_filtered, shard, shard_costs
+        )
+        kg_obo_logger.info(
+            f"Shard {shard} includes {len(yaml_onto_list_filtered)} OBOs: "
+            f"{[ontology['id'] for ontology in yaml_onto_list_filtered]}"
+        )
+        print(f"Shard {shard} includes {len(yaml_onto_list_filtered)} OBOs.")
+
+    # Resolve all OBO URLs up front, many at once, rather than one by one as each OBO starts.
+    # Most are listed in the registry, so need no requests at all.
+    resolved_urls = kg_obo.obolibrary_utils.resolve_urls(
+        yaml_onto_list_filtered, check_base=replace_base_obos
+    )
+    kg_obo_logger.info(f"Resolved URLs for {len(resolved_urls)} OBOs.")
+
+    # The previous run's metrics show how large each OBO was, and how long it took
+    previous_metrics_path = os.path.join(log_dir, METRICS_FILENAME + ".json")
+    durations = load_previous_durations(previous_metrics_path)
+
+    # Start the most expensive OBOs first, so none are left running long after the rest
+    # Costs are the times OBOs took in the previous run, or are estimated from their sizes
+    if not registry_order:
+        costs = estimate_costs(
+            [ontology["id"] for ontology in yaml_onto_list_filtered],
+            durations,
+            urls={name: resolved["url"] for name, resolved in resolved_urls.items()},
+        )
+        yaml_onto_list_filtered = order_by_cost(yaml_onto_list_filtered, costs)
+        kg_obo_logger.info(
+            "Ordered OBOs by estimated seconds: "
+            f"{[(ontology['id'], round(costs[ontology['id']])) for ontology in yaml_onto_list_filtered]}"
+        )
+
     successful_transforms = []
     errored_transforms = []
     failed_transforms = []
     all_completed_transforms = []
     all_obos_with_weird_version_formats = []
+    run_metrics = []
+    tracked_versions = []
+    seen_validators = {}
 
     if len(skip) > 0:
         kg_obo_logger.info(f"Ignoring these OBOs: {skip}")
@@ -842,429 +2523,222 @@ def run_transform(
         kg_obo_logger.info("Will retain all downloaded files.")
     if s3_test:
         kg_obo_logger.info("Will test S3 upload instead of actually uploading.")
-
-    for ontology in tqdm(yaml_onto_list_filtered, "processing ontologies"):
-        ontology_name = ontology["id"]
-        print(f"{ontology_name}")
-        kg_obo_logger.info("Loading " + ontology_name)
-        base_obo_path = os.path.join(data_dir, ontology_name)
-        obo_remote_path = os.path.join(remote_path, ontology_name)
-
-        # This will be true if the ontology will be replaced
-        # even if the version has not changed since last upload
-        replace_previous_transform = False
-
-        # Get OBO URL
-        url = kg_obo.obolibrary_utils.get_url(ontology_name)
-        print(url)
-
-        # Check if we may have previously used a base version of the OBO -
-        # the base-obo's aren't really informative without reasoning,
-        # so we'll overwrite them if they exist, and
-        # if the replace_base_obos option was used.
-        if replace_base_obos and kg_obo.obolibrary_utils.base_url_exists(ontology_name):
-            replace_previous_transform = True
-
-        # Set up local directories
-        if not os.path.exists(data_dir):
-            os.mkdir(data_dir)
-
-        # Downloaded OBOs are still tempfiles as we don't intend to keep them
-        with tempfile.NamedTemporaryFile(prefix=ontology_name) as tfile:
-
-            success = True
-
-            # Some OBOs are quite large, so we download selection first to check IRI/version
-            if not download_ontology(
-                url=url,
-                file=tfile.name,
-                logger=kg_obo_logger,
-                no_dl_progress=no_dl_progress,
-                header_only=True,
-            ):
-                success = False
-                kg_obo_logger.warning(
-                    f"Failed to load due to KeyError: {ontology_name}"
-                )
-                failed_transforms.append(ontology_name)
-                continue
-
-            # Provide parsed IRI and version info here
-            # If it wasn't in the versionIRI, add it to a list, because this is weird
-            owl_iri, owl_version, owl_version_format = get_owl_iri(tfile.name)
-            kg_obo_logger.info(f"Current VersionIRI for {ontology_name}: {owl_iri}")
-            print(f"Current VersionIRI for {ontology_name}: {owl_iri}")
-            kg_obo_logger.info(f"Current version for {ontology_name}: {owl_version}")
-            print(f"Current version for {ontology_name}: {owl_version}")
-            kg_obo_logger.info(
-                f"In {ontology_name}, used this value for version: {owl_version_format}"
-            )
-            print(
-                f"In {ontology_name}, used this value for version: {owl_version_format}"
-            )
-            if owl_version_format != "versionIRI":
-                all_obos_with_weird_version_formats.append(ontology_name)
-
-            # Check version here
-            # If it's already in the tracking file, do nothing more with it
-            # unless replace_previous_transform is True
-            if (
-                transformed_obo_exists(ontology_name, owl_iri, s3_test, bucket)
-                and not replace_previous_transform
-            ):
-                kg_obo_logger.info(
-                    f"Have already transformed {ontology_name}: {owl_iri}"
-                )
-                print(f"Have already transformed {ontology_name}: {owl_iri} - skipping")
-                all_completed_transforms.append(ontology_name)
-
-                # If requested, refresh the index.html even if we don't have a new version
-                # This won't touch the individual version directories
-                # Mock version isn't included here as we won't find existing versions under testing
-                if force_index_refresh and not s3_test:
-                    print(f"Refreshing index on {bucket} for {obo_remote_path}")
-                    if kg_obo.upload.update_index_files(
-                        bucket, obo_remote_path, data_dir
-                    ):
-                        kg_obo_logger.info(f"Refreshed index for {ontology_name}")
-                        print(f"Refreshed index for {ontology_name}")
-                    else:
-                        kg_obo_logger.info(
-                            f"Failed to refresh index for {ontology_name}"
-                        )
-                        print(f"Failed to refresh index for {ontology_name}")
-                continue
+    if resume:
+        kg_obo_logger.info(f"Will resume from any checkpoints in {data_dir}.")
+
+    # Each result from transform_ontology updates the run summary here.
+    # If a result asks to halt, no further ontologies are started.
+    def collect_result(result: dict) -> bool:
+        if result["weird_version_format"]:
+            all_obos_with_weird_version_formats.append(result["name"])
+        if result["status"] == "success":
+            successful_transforms.append(result["name"])
+        elif result["status"] == "errors":
+            errored_transforms.append(result["name"])
+        elif result["status"] == "failed":
+            failed_transforms.append(result["name"])
+        if result["status"] in ["success", "errors", "existing"]:
+            all_completed_transforms.append(result["name"])
+        run_metrics.extend(result.get("metrics", []))
+        if result.get("validators") and result["status"] in ["success", "errors", "existing"]:
+            seen_validators[result["name"]] = result["validators"]
+        if "tracking" in result:
+            name, iri, version, sha256 = result["tracking"]
+            if distributed:
+                tracked_versions.append(tuple(result["tracking"]))
             else:
-                kg_obo_logger.info(
-                    f"Don't have this version of {ontology_name} yet - will transform."
-                )
-                print(
-                    f"Don't have this version of {ontology_name} yet - will transform."
-                )
+                kg_obo_logger.info(f"Adding {name} version {version} to tracking file.")
+                track_obo_version(name, iri, version, bucket, sha256=sha256)
+        return not result["halt"]
+
+    transform_kwargs = {
+        "robot_path": robot_path,
+        "curie_converter": curie_converter,
+        "iri_converter": iri_converter,
+        "bucket": bucket,
+        "save_local": save_local,
+        "s3_test": s3_test,
+        "no_dl_progress": no_dl_progress,
+        "force_index_refresh": force_index_refresh,
+        "replace_base_obos": replace_base_obos,
+        "force_overwrite": force_overwrite,
+        "data_dir": data_dir,
+        "remote_path": remote_path,
+        "resume": resume,
+        "defer_tracking": distributed,
+        "resolved_urls": resolved_urls,
+        "download_cache": download_cache,
+        "tracking": tracking,
+        "download_chunk_size": parse_memory_size(download_chunk_size),
+        "download_segments": download_segments,
+    }
+
+    os.makedirs(data_dir, exist_ok=True)
+
+    if memory_budget:
+        budget = parse_memory_size(memory_budget)
+    else:
+        budget = get_total_memory()
+    # Each OBO's ROBOT heap is sized by the OBO, within the budget,
+    # so small OBOs don't hold memory that others could run in
+    peaks_path = os.path.join(log_dir, ROBOT_PEAKS_FILENAME)
+    previous_peaks = load_previous_peaks(previous_metrics_path, peaks_path)
+
+    def robot_env_for(name: str, input_size: int, needs_merge: bool) -> tuple:
+        return adapt_robot_env(
+            robot_env, name, input_size, previous_peaks.get(name, 0), budget, needs_merge
+        )
 
-            # Check for imports, but don't retreive yet
-            need_imports = False
-            imports = imports_requested(tfile.name)
-            if len(imports) > 0:
-                fimports = ", ".join(imports)
-                kg_obo_logger.info(
-                    f"Header for {ontology_name} requests these imports: {fimports}"
-                )
-                print(f"Header for {ontology_name} requests these imports: {fimports}")
-                need_imports = True
-            else:
-                kg_obo_logger.info(f"No imports found for {ontology_name}.")
-                print(f"No imports found for {ontology_name}.")
-
-            # Set up output folders for completed transform
-            if not os.path.exists(base_obo_path):
-                print(f"Making directory {base_obo_path}.")
-                os.mkdir(base_obo_path)
-            versioned_obo_path = os.path.join(base_obo_path, owl_version)
-            if not os.path.exists(versioned_obo_path):
-                print(f"Making directory {versioned_obo_path}.")
-                os.mkdir(versioned_obo_path)
-
-            # If this version is new, now we download the whole OBO
-            # It starts as a temp file, but once we have the full version we
-            # copy it to the same dir as where transforms will go
-            if not download_ontology(
-                url=url,
-                file=tfile.name,
-                logger=kg_obo_logger,
-                no_dl_progress=no_dl_progress,
-                header_only=False,
-            ):
-                success = False
-                kg_obo_logger.warning(
-                    f"Failed to load due to KeyError: {ontology_name}"
-                )
-                failed_transforms.append(ontology_name)
-                continue
-            else:
-                orig_local_path = os.path.join(
-                    versioned_obo_path, ontology_name + ".owl"
-                )
-                kg_obo_logger.info(f"Completed download from {url} to {tfile.name}.")
-                print(f"Completed download from {url} to {tfile.name}.")
-                kg_obo_logger.info(f"Moving from {tfile.name} to {orig_local_path}.")
-                print(f"Moving from {tfile.name} to {orig_local_path}.")
-                shutil.copy(tfile.name, orig_local_path)
-
-            # Write the current KG-OBO git commit
-            version_info_path = os.path.join(versioned_obo_path, "kg-obo_version")
-            with open(version_info_path, "w") as version_info_file:
-                repo = git.Repo(search_parent_directories=True)
-                current_commit_hash = repo.head.object.hexsha
-                version_info_file.write(current_commit_hash)
-
-            # Run ROBOT preprocessing here - relax all, then do merge -> convert if needed
-            kg_obo_logger.info(f"ROBOT preprocessing: relax {ontology_name}")
-            print(f"ROBOT preprocessing: relax {ontology_name}")
-            temp_suffix = f"_{ontology_name}_relaxed.owl"
-            tfile_relaxed = tempfile.NamedTemporaryFile(
-                delete=False, suffix=temp_suffix
-            )
-            if not relax_owl(robot_path, tfile.name, tfile_relaxed.name, robot_env):
-                kg_obo_logger.error(
-                    f"ROBOT relaxing of {ontology_name} failed - skipping."
-                )
-                print(f"ROBOT relaxing of {ontology_name} failed - skipping.")
-                tfile_relaxed.close()
-                continue
-            tfile_relaxed.close()
+    # KGX and graph normalization are pure Python, so concurrent OBOs are processed
+    # in worker processes, letting them run in parallel rather than take turns.
+    # Each OBO only holds its ROBOT heap from the budget while it is processed,
+    # so OBOs that are skipped (e.g., as unchanged) hold none.
+    memory = MemoryBudget(budget)
+    process_pool = start_process_pool(workers) if pipeline or workers > 1 else None
+
+    def process_within_budget(job: dict) -> bool:
+        # Copies of earlier transforms don't run ROBOT
+        if job.get("alias_of"):
+            return process_ontology(job, robot_path, robot_env, curie_converter, iri_converter)
+        # The OBO is downloaded by now, so its heap is sized by the file itself,
+        # and whether its imports will be merged is known
+        ontology_env, robot_heap = robot_env_for(
+            job["result"]["name"], get_path_size(job["owl_file"]), job["need_imports"]
+        )
+        memory.acquire(robot_heap)
+        try:
+            if not process_pool:
+                return process_ontology(job, robot_path, ontology_env, curie_converter, iri_converter)
+            go_on, processed_job = process_pool.submit(
+                process_ontology_job, job, robot_path, ontology_env
+            ).result()
+        finally:
+            memory.release(robot_heap)
+        # The worker process updated its own copy of the job
+        job.update(processed_job)
+        return go_on
 
-            before_count = get_file_length(tfile.name)
-            after_count = get_file_length(tfile_relaxed.name)
-            kg_obo_logger.info(
-                f"Before relax: {before_count} lines. After relax: {after_count} lines."
+    try:
+        if queue_path:
+            work_queue = WorkQueue(queue_path, run=queue_run or get_run_id())
+            added = work_queue.publish(
+                [(ontology["id"], ontology) for ontology in yaml_onto_list_filtered]
             )
-            print(
-                f"Before relax: {before_count} lines. After relax: {after_count} lines."
+            kg_obo_logger.info(
+                f"Published {added} new jobs to run {work_queue.run} of work queue {queue_path}: {work_queue.counts()}"
             )
+            print(f"Published {added} new jobs to run {work_queue.run} of work queue {queue_path}.")
+            print(f"Claiming jobs as {queue_worker} with {workers} worker(s) within {budget} bytes of ROBOT heap.")
 
-            if after_count == 0:
-                kg_obo_logger.error(
-                    f"ROBOT relaxing of {ontology_name} yielded an empty result!"
-                )
-                print(f"ROBOT relaxing of {ontology_name} yielded an empty result!")
-                continue  # Need to skip this one or we will upload empty results
-
-            # If we have imports, merge+convert to resolve
-            # Don't do this every time as it is not necessary
-            # We don't convert to JSON just yet
-            if need_imports:
-
-                print(f"ROBOT preprocessing: merge and convert {ontology_name}")
-                temp_suffix = f"_{ontology_name}_merged.owl"
-                tfile_merged = tempfile.NamedTemporaryFile(
-                    delete=False, suffix=temp_suffix
-                )
-                if not merge_and_convert_owl(
-                    robot_path, tfile_relaxed.name, tfile_merged.name, robot_env
-                ):
-                    kg_obo_logger.error(
-                        f"ROBOT merge of {ontology_name} failed - skipping."
-                    )
-                    print(f"ROBOT merge of {ontology_name} failed - skipping.")
-                    tfile_relaxed.close()
-                    continue
-                tfile_merged.close()
-
-                before_count = get_file_length(tfile_relaxed.name)
-                after_count = get_file_length(tfile_merged.name)
-                kg_obo_logger.info(
-                    f"Before merge: {before_count} lines. After merge: {after_count} lines."
-                )
-                print(
-                    f"Before merge: {before_count} lines. After merge: {after_count} lines."
+            def transform_claimed(ontology: dict) -> dict:
+                return transform_ontology(
+                    ontology=ontology, robot_env=robot_env, process=process_within_budget,
+                    **transform_kwargs
                 )
 
-                if after_count == 0:
-                    kg_obo_logger.error(
-                        f"ROBOT merging of {ontology_name} yielded an empty result!"
-                    )
-                    print(f"ROBOT merging of {ontology_name} yielded an empty result!")
-                    continue  # Need to skip this one or we will upload empty results
-
-                input_owl = tfile_merged.name
+            with tqdm(desc="processing ontologies") as pbar:
 
-            else:
+                def collect_claimed(result: dict) -> bool:
+                    pbar.update(1)
+                    return collect_result(result)
 
-                input_owl = tfile_relaxed.name
-
-            # Get all ids from the input owl and identify normalized forms
-            # We use this later to convert IDs
-            print(f"ROBOT preprocessing: node ID normalization on {ontology_name}")
-            if not examine_owl_names(
-                robot_path,
-                input_owl,
-                versioned_obo_path,
-                curie_converter,
-                iri_converter,
-                robot_env,
-            ):
-                kg_obo_logger.error(
-                    f"ROBOT id retrieval for {ontology_name} failed - skipping."
-                )
-                print(f"ROBOT id retrieval for {ontology_name} failed - skipping.")
-
-            # Convert to JSON
-            print(f"ROBOT preprocessing: convert {ontology_name}")
-            ontology_filename = f"{ontology_name}.json"
-            owl_converted = os.path.join(versioned_obo_path, ontology_filename)
-            if not convert_owl(
-                robot_path, tfile_relaxed.name, owl_converted, robot_env
-            ):
-                kg_obo_logger.error(
-                    f"ROBOT convert of {ontology_name} failed - skipping."
+                run_queue_workers(
+                    work_queue, transform_claimed, workers, queue_worker, collect_claimed
                 )
-                print(f"ROBOT convert of {ontology_name} failed - skipping.")
-                tfile_relaxed.close()
-                continue
-
-            if not os.path.exists(owl_converted):
-                kg_obo_logger.error(
-                    f"ROBOT convert of {ontology_name} yielded no result!"
+            kg_obo_logger.info(f"Work queue {queue_path} now has: {work_queue.counts()}")
+        elif pipeline:
+            kg_obo_logger.info(
+                f"Running staged pipeline with {workers} transform worker(s) within {budget} bytes of ROBOT heap."
+            )
+            print(f"Running staged pipeline with {workers} transform worker(s) within {budget} bytes of ROBOT heap.")
+            # Only one publish worker, so tracking.yaml is written by one thread at a time
+            stages = [
+                (
+                    "fetch",
+                    functools.partial(
+                        fetch_ontology,
+                        bucket=bucket,
+                        s3_test=s3_test,
+                        no_dl_progress=no_dl_progress,
+                        force_index_refresh=force_index_refresh,
+                        replace_base_obos=replace_base_obos,
+                        data_dir=data_dir,
+                        remote_path=remote_path,
+                        resume=resume,
+                        resolved_urls=resolved_urls,
+                        download_cache=download_cache,
+                        tracking=tracking,
+                        download_chunk_size=parse_memory_size(download_chunk_size),
+                        download_segments=download_segments,
+                    ),
+                    PIPELINE_FETCH_WORKERS,
+                ),
+                ("process", process_within_budget, workers),
+                (
+                    "publish",
+                    functools.partial(
+                        publish_ontology,
+                        bucket=bucket,
+                        save_local=save_local,
+                        s3_test=s3_test,
+                        force_overwrite=force_overwrite,
+                        remote_path=remote_path,
+                        defer_tracking=distributed,
+                    ),
+                    1,
+                ),
+            ]
+            with tqdm(total=len(yaml_onto_list_filtered), desc="processing ontologies") as pbar:
+
+                def collect_job(job: dict) -> bool:
+                    pbar.update(1)
+                    discard_ontology(job)
+                    return collect_result(job["result"])
+
+                run_pipeline(
+                    [new_transform_job(ontology) for ontology in yaml_onto_list_filtered],
+                    stages,
+                    queue_size=PIPELINE_QUEUE_SIZE,
+                    on_result=collect_job,
                 )
-                print(f"ROBOT convert of {ontology_name} yielded no result!")
-                continue  # Need to skip this one or we will upload empty results
-
-            input_owl = owl_converted
-
-            # Use kgx to transform, but save errors to log
-            # Do separate transforms for different output formats
-            success = True  # for all transforms
-            errors = False  # for all transforms
-            output_format = "tsv"
-            all_success_and_errors = {}
-            print(f"Transforming {ontology_name} to {output_format}...")
-            kg_obo_logger.info(f"Transforming to {output_format}...")
-            if output_format == "tsv":
-                ontology_filename = f"{ontology_name}_kgx_tsv"
-            else:
-                ontology_filename = f"{ontology_name}_kgx"
-            this_success, this_errors, this_output_msg = kgx_transform(
-                input_file=[input_owl],
-                input_format="obojson",
-                output_file=os.path.join(versioned_obo_path, ontology_filename),
-                output_format=output_format,
-                logger=kgx_logger,
-                knowledge_sources=[
-                    ("knowledge_source", f"{ontology_name.upper()} {owl_version}")
-                ],
+        elif workers > 1:
+            kg_obo_logger.info(
+                f"Running up to {workers} transforms at once within {budget} bytes of ROBOT heap."
             )
-            all_success_and_errors[output_format] = (this_success, this_errors)
-            kg_obo_logger.info(this_output_msg)
-
-            # Check results of all transforms
-            if output_format == "tsv" and not all_success_and_errors[output_format][0]:
-                success = False
-            if all_success_and_errors[output_format][1]:
-                errors = True
-                break
-
-            # Time for post-processing.
-            print(f"Post-processing {ontology_name}...")
-            kg_obo_logger.info(f"Post-processing {ontology_name}...")
-            input_file = os.path.join(versioned_obo_path, ontology_filename + ".tar.gz")
-            if not clean_and_normalize_graph(input_file):
-                success = False
-                print(f"Failed post-processing {ontology_name}...")
-                kg_obo_logger.info(f"Failed post-processing {ontology_name}...")
-
-            # Check file size and fail/warn if nodes|edge file is empty
-            for filename in os.listdir(versioned_obo_path):
-                if filename.endswith(".tar.gz"):
-                    filesize = os.stat(
-                        os.path.join(versioned_obo_path, filename)
-                    ).st_size
-                    if filesize < 400:
-                        kg_obo_logger.warning(
-                            f"{filename} appears to contain empty graph files - something went wrong."
-                        )
-                        print(f"{filename} appears to contain empty graph files - something went wrong.")
-                        success = False
-
-            if success and not errors:
-                kg_obo_logger.info(
-                    f"Successfully completed transform of {ontology_name}"
+            print(f"Running up to {workers} transforms at once within {budget} bytes of ROBOT heap.")
+
+            # Each worker thread runs one OBO's stages in turn, in order of cost,
+            # with tracking.yaml updated here once each is done
+            def transform_next(job: dict) -> bool:
+                job["result"] = transform_ontology(
+                    ontology=job["ontology"], robot_env=robot_env, process=process_within_budget,
+                    **dict(transform_kwargs, defer_tracking=True)
                 )
-                successful_transforms.append(ontology_name)
-                all_completed_transforms.append(ontology_name)
+                return True
 
-            elif success and errors:
-                kg_obo_logger.info(
-                    f"Completed transform of {ontology_name} with errors - see logs for details."
-                )
-                errored_transforms.append(ontology_name)
-                all_completed_transforms.append(ontology_name)
-            else:
-                kg_obo_logger.warning(f"Failed to transform {ontology_name}")
-                failed_transforms.append(ontology_name)
+            with tqdm(total=len(yaml_onto_list_filtered), desc="processing ontologies") as pbar:
 
-            if success:
-                versioned_remote_path = os.path.join(
-                    remote_path, ontology_name, owl_version
-                )
-                if not s3_test:
-                    # Write to remote tracking file
-                    kg_obo_logger.info(
-                        f"Adding {ontology_name} version {owl_version} to tracking file."
-                    )
-                    track_obo_version(ontology_name, owl_iri, owl_version, bucket)
-
-                    # Upload the most recently transformed version to bucket
-                    # Include the original OWL too (this already happens because it's in the new dir)
-                    # Include the current KG-OBO git commit (ditto)
-                    # Also verify that files have the expected name format
-                    kg_obo_logger.info(
-                        f"Uploading {versioned_obo_path} to {versioned_remote_path}..."
-                    )
-                    filelist = kg_obo.upload.upload_dir_to_s3(
-                        versioned_obo_path,
-                        bucket,
-                        versioned_remote_path,
-                        make_public=True,
-                        force_overwrite=force_overwrite
-                    )
-                    if not kg_obo.upload.verify_uploads(filelist, ontology_name):
-                        kg_obo_logger.info(
-                            f"Transform filenames for {ontology_name} and {owl_version} are incorrect!"
-                        )
-
-                    # Update indexes for this version and OBO only
-                    if kg_obo.upload.update_index_files(
-                        bucket, versioned_remote_path, data_dir
-                    ) and kg_obo.upload.update_index_files(
-                        bucket, obo_remote_path, data_dir
-                    ):
-                        kg_obo_logger.info(
-                            f"Created index for {ontology_name} and {owl_version}"
-                        )
-                    else:
-                        kg_obo_logger.info(
-                            f"Failed to create index for {ontology_name} and {owl_version}"
-                        )
+                def collect_and_count(job: dict) -> bool:
+                    pbar.update(1)
+                    return collect_result(job["result"])
 
-                else:
-                    kg_obo_logger.info(
-                        f"Mock uploading {versioned_obo_path} to {versioned_remote_path}..."
-                    )
-                    filelist = kg_obo.upload.mock_upload_dir_to_s3(
-                        versioned_obo_path,
-                        bucket,
-                        versioned_remote_path,
-                        make_public=True,
-                    )
-                    if not kg_obo.upload.verify_uploads(filelist, ontology_name):
-                        kg_obo_logger.info(
-                            f"Transform filenames for {ontology_name} and {owl_version} are incorrect!"
-                        )
-
-                    if kg_obo.upload.mock_update_index_files(
-                        bucket, versioned_remote_path, data_dir
-                    ) and kg_obo.upload.mock_update_index_files(
-                        bucket, obo_remote_path, data_dir
-                    ):
-                        kg_obo_logger.info(
-                            f"Mock created index for {ontology_name} and {owl_version}"
-                        )
-                    else:
-                        kg_obo_logger.info(
-                            f"Failed to mock create index for {ontology_name} and {owl_version}"
-                        )
-
-            # Clean up any incomplete transform leftovers
-            if not success and not save_local:
-                if delete_path(base_obo_path):
-                    kg_obo_logger.info(
-                        f"Removed incomplete transform files for {ontology_name}."
-                    )
-                else:
-                    kg_obo_logger.warning(
-                        f"Incomplete version of {ontology_name} may be present."
-                    )
+                run_pipeline(
+                    [{"ontology": ontology} for ontology in yaml_onto_list_filtered],
+                    [("transform", transform_next, workers)],
+                    queue_size=workers,
+                    on_result=collect_and_count,
+                )
+        else:
+            for ontology in tqdm(yaml_onto_list_filtered, "processing ontologies"):
+                result = transform_ontology(
+                    ontology=ontology, robot_env=robot_env, process=process_within_budget,
+                    **transform_kwargs
+                )
+                if not collect_result(result):
+                    break
+    finally:
+        if process_pool:
+            process_pool.shutdown()
 
     kg_obo_logger.info(
         f"Successfully transformed {len(successful_transforms)} without errors: {successful_transforms}"
@@ -1292,25 +2766,59 @@ def run_transform(
             f"{all_obos_with_weird_version_formats}"
         )
 
-    if not s3_test:
-        # Update the root index
-        if kg_obo.upload.update_index_files(
-            bucket, remote_path, data_dir, update_root=True
-        ):
-            kg_obo_logger.info(f"Updated root index at {remote_path}")
-            print(f"Updated root index at {remote_path}")
-        else:
-            kg_obo_logger.info(f"Failed to update root index at {remote_path}")
-            print(f"Failed to update root index at {remote_path}")
-    else:
-        if kg_obo.upload.mock_update_index_files(
-            bucket, remote_path, data_dir, update_root=True
-        ):
-            kg_obo_logger.info(f"Mock updated root index at {remote_path}")
-            print(f"Mock updated root index at {remote_path}")
+    # Record time and resources used by each stage of each OBO
+    metrics_paths = write_metrics(run_metrics, log_dir)
+    kg_obo_logger.info(f"Wrote stage metrics to {metrics_paths}.")
+    # Peaks from this run (e.g., of merging imports) replace earlier ones
+    write_peaks(peaks_path, {**previous_peaks, **get_peaks(run_metrics)})
+    kg_obo_logger.info(
+        f"Total seconds by stage: {summarize_metrics(run_metrics)}"
+    )
+
+    # Shards share tracking.yaml and the root index, so shards
+    # update them one at a time, each holding a lock while it does
+    reconciled = True
+    reconcile_lock_path = lock_file_remote_path + "-reconcile"
+    if distributed and not s3_test:
+        reconciled = kg_obo.upload.acquire_lock(bucket, reconcile_lock_path)
+        if not reconciled:
+            kg_obo_logger.error(
+                f"Could not lock tracking file - these versions were not tracked: {tracked_versions}"
+            )
+            print(f"Could not lock tracking file - these versions were not tracked: {tracked_versions}")
+
+    try:
+        if not s3_test and (tracked_versions or seen_validators) and reconciled:
+            kg_obo_logger.info(
+                f"Adding {len(tracked_versions)} versions to tracking file: {tracked_versions}"
+            )
+            kg_obo_logger.info(
+                f"Adding validators for {len(seen_validators)} OBOs to tracking file."
+            )
+            track_obo_versions(tracked_versions, bucket, validators=seen_validators)
+
+        if not s3_test:
+            # Update the root index
+            if kg_obo.upload.update_index_files(
+                bucket, remote_path, data_dir, update_root=True
+            ):
+                kg_obo_logger.info(f"Updated root index at {remote_path}")
+                print(f"Updated root index at {remote_path}")
+            else:
+                kg_obo_logger.info(f"Failed to update root index at {remote_path}")
+                print(f"Failed to update root index at {remote_path}")
         else:
-            kg_obo_logger.info(f"Failed to mock update root index at {remote_path}")
-            print(f"Failed to mock update root index at {remote_path}")
+            if kg_obo.upload.mock_update_index_files(
+                bucket, remote_path, data_dir, update_root=True
+            ):
+                kg_obo_logger.info(f"Mock updated root index at {remote_path}")
+                print(f"Mock updated root index at {remote_path}")
+            else:
+                kg_obo_logger.info(f"Failed to mock update root index at {remote_path}")
+                print(f"Failed to mock update root index at {remote_path}")
+    finally:
+        if distributed and not s3_test and reconciled:
+            kg_obo.upload.set_lock(bucket, reconcile_lock_path, unlock=True)
 
     # Remove all local data files
     if not save_local:
@@ -1321,10 +2829,10 @@ def run_transform(
 
     # Now un-set the lockfile
     if s3_test:
-        if not kg_obo.upload.mock_set_lock(bucket, lock_file_remote_path, unlock=True):
+        if not kg_obo.upload.mock_set_lock(bucket, run_lock_path, unlock=True):
             sys.exit("Could not mock setting lock file. Exiting...")
     else:
-        if not kg_obo.upload.set_lock(bucket, lock_file_remote_path, unlock=True):
+        if not kg_obo.upload.set_lock(bucket, run_lock_path, unlock=True):
             sys.exit("Could not set lock file on remote server. Exiting...")
 
-    return True
+    return reconciled
@@ -1,14 +1,32 @@
 import botocore.exceptions  # type: ignore
 import boto3  # type: ignore
-from moto import mock_aws
+import functools
 import os
 import logging
-from time import time
+from time import sleep, time
 
 IFILENAME = "index.html"
 EXPECTED_UPLOADS = ['tsv_transform.log', '{}_kgx.json', 
                     'json_transform.log', '{}_kgx_tsv.tar.gz']
 
+def mock_aws(func):
+    """
+    Runs a function with AWS mocked by moto, as moto.mock_aws does.
+    moto is only imported when the function is called, as it is only
+    needed for test runs, and is slow to import.
+    :param func: function to mock AWS for
+    :return: wrapped function
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        from moto import mock_aws as moto_mock_aws
+
+        with moto_mock_aws():
+            return func(*args, **kwargs)
+
+    return wrapper
+
 def check_tracking(s3_bucket: str, s3_bucket_dir: str) -> bool:
     """
     Checks on existence of the tracking.yaml file on S3.
@@ -90,6 +108,64 @@ def set_lock(s3_bucket: str, s3_bucket_dir: str, unlock: bool) -> bool:
 
     return lock_created
 
+def find_locks(s3_bucket: str, lock_prefix: str) -> list:
+    """
+    Finds all lock files on S3 with a shared prefix,
+    e.g., the locks set by each shard of a sharded run.
+    :param s3_bucket: str ID of the bucket
+    :param lock_prefix: str of start of lock file paths
+    :return: list of str paths of lock files found
+    """
+
+    locks = []
+
+    client = boto3.client('s3')
+    pager = client.get_paginator("list_objects_v2")
+
+    try:
+        for page in pager.paginate(Bucket=s3_bucket, Prefix=lock_prefix):
+            for lock in page.get("Contents", []):
+                locks.append(lock["Key"])
+    except botocore.exceptions.ClientError as e:
+        print(f"Encountered error in finding lockfiles on S3: {e}")
+    except botocore.exceptions.NoCredentialsError:
+        print("Could not find AWS S3 credentials, so could not find lock files.")
+
+    return locks
+
+def acquire_lock(s3_bucket: str, s3_bucket_dir: str, attempts: int = 60, wait: int = 10) -> bool:
+    """
+    Creates a lock file on S3, waiting for any existing lock to be removed first.
+    The lock is only created if it does not already exist, in one request,
+    so if several hosts try at once, only one acquires it.
+    :param s3_bucket: str ID of the bucket
+    :param s3_bucket_dir: str of path of lock file
+    :param attempts: int of how many times to try
+    :param wait: int of seconds to wait between attempts
+    :return: boolean returns True if lock was acquired, and False otherwise.
+    """
+
+    client = boto3.client('s3')
+    s3_path = s3_bucket_dir
+
+    for _ in range(attempts):
+        try:
+            client.put_object(Bucket=s3_bucket, Key=s3_path, IfNoneMatch="*")
+            print(f"acquired lock file s3_bucket:{s3_bucket}, s3_path:{s3_path}")
+            return True
+        except botocore.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ["PreconditionFailed",
+                                                               "ConditionalRequestConflict"]:
+                print(f"Encountered error in acquiring lockfile on S3: {e}")
+                return False
+        except botocore.exceptions.NoCredentialsError:
+            print("Could not find AWS S3 credentials, so could not acquire lock.")
+            return False
+        print(f"Waiting for lock file s3_bucket:{s3_bucket}, s3_path:{s3_path}")
+        sleep(wait)
+
+    return False
+
 
 def upload_dir_to_s3(local_directory: str,
                      s3_bucket: str,
@@ -148,6 +224,57 @@ def upload_dir_to_s3(local_directory: str,
 
     return filelist
 
+def copy_remote_dir(s3_bucket: str,
+                    source_dir: str,
+                    s3_bucket_dir: str,
+                    make_public=False,
+                    force_overwrite=False) -> list:
+    """
+    Copy a directory on an AWS S3 bucket to another directory on the same bucket.
+    Objects are copied by S3 itself, so none are downloaded or uploaded here.
+    The index is not copied, as it names its own directory -
+    update_index_files writes a new one.
+    Returns list of files processed, whether they're copied or not.
+    :param s3_bucket: str ID of the bucket
+    :param source_dir: str of name of directory to copy from
+    :param s3_bucket_dir: str of name of directory to create on S3
+    :param make_public: bool, if True, sets 'ACL' on objects to 'public-read'
+    :param force_overwrite: bool, if True, will overwrite objects
+    if they already exist on the bucket.
+    :return: list of copied files
+    """
+
+    filelist = []
+
+    client = boto3.client('s3')
+    pager = client.get_paginator("list_objects_v2")
+    for page in pager.paginate(Bucket=s3_bucket, Prefix=source_dir+"/"):
+        for key in page.get('Contents', []):
+            relative_path = os.path.relpath(key['Key'], source_dir)
+            filename = os.path.basename(relative_path)
+            if filename == IFILENAME:
+                continue
+            filelist.append(filename)
+            s3_path = os.path.join(s3_bucket_dir, relative_path)
+
+            if not force_overwrite:
+                try:
+                    client.head_object(Bucket=s3_bucket, Key=s3_path)
+                    logging.warning(f"Existing file {s3_path} found on S3! Skipping.")
+                    continue
+                except botocore.exceptions.ClientError:  # Exception abuse
+                    pass
+
+            # Each copy keeps the content type and other metadata of its source
+            extra_args = {}
+            if make_public:
+                extra_args['ACL'] = 'public-read'
+            logging.info(f"Copying {key['Key']} to {s3_path}")
+            client.copy({'Bucket': s3_bucket, 'Key': key['Key']}, s3_bucket, s3_path,
+                        ExtraArgs=extra_args)
+
+    return filelist
+
 @mock_aws
 def mock_check_tracking(s3_bucket: str, s3_bucket_dir: str) -> bool:
     """
@@ -444,10 +571,12 @@ def verify_uploads(filelist: list, name: str) -> bool:
 
     return success
 
-def upload_reports(s3_bucket: str) -> bool:
+def upload_reports(s3_bucket: str, log_dir: str = "logs") -> bool:
     """
     Upload the stats and validation reports to stats directory on S3 bucket.
+    Stage metrics from the most recent transform run are included, if present.
     :param s3_bucket: str ID of the bucket to upload to
+    :param log_dir: str of local dir where the transform run saved its logs and metrics
     :return: bool, True if completed successfully
     """
 
@@ -458,6 +587,11 @@ def upload_reports(s3_bucket: str) -> bool:
     local_report_paths = ["./stats/stats.tsv",
                     "./stats/validation.tsv"]
 
+    for metrics_path in [os.path.join(log_dir, "run_metrics.tsv"),
+                        os.path.join(log_dir, "run_metrics.json")]:
+        if os.path.exists(metrics_path):
+            local_report_paths.append(metrics_path)
+
 
     try:
         for filepath in local_report_paths:
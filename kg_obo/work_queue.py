@@ -0,0 +1,294 @@
+"""work_queue.py - a shared queue of per-OBO jobs, claimed with expiring leases."""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+# Seconds a claimed job stays claimed without its lease being renewed
+DEFAULT_LEASE_SECONDS = 600
+
+# Times a job may be claimed before it is given up on,
+# e.g., if it crashes every worker that claims it
+MAX_ATTEMPTS = 3
+
+
+def get_worker_id() -> str:
+    """
+    Identifies this worker process among all those sharing a queue.
+    :return: str of host name and process ID
+    """
+
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def get_run_id() -> str:
+    """
+    Identifies a run by the day it is started on, so workers started
+    together share one run, and runs on later days get their own jobs.
+    :return: str of current UTC date, e.g., 2021-08-26
+    """
+
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class WorkQueue:
+    """
+    Queue of jobs in a SQLite file, shared by any number of worker
+    processes, on one host or on several with a shared filesystem.
+    Each job is claimed by one worker at a time, with a lease.
+    If the worker stops renewing its lease (e.g., it crashed),
+    the lease expires and another worker may claim the job.
+    Jobs belong to a run, and a queue only sees the jobs of its own run,
+    so a file may be reused by a later run without its jobs being skipped
+    as already done.
+    """
+
+    def __init__(self, path: str, lease_seconds: int = DEFAULT_LEASE_SECONDS, run: str = ""):
+        """
+        :param path: str of path to SQLite file, created if needed
+        :param lease_seconds: int of seconds a lease lasts without renewal
+        :param run: str identifying the run, shared by all of its workers
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.run = run
+        with closing(self.connect()) as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "run TEXT, name TEXT, position INTEGER, payload TEXT, "
+                "status TEXT, worker TEXT, lease_expires REAL, "
+                "attempts INTEGER, result TEXT, PRIMARY KEY (run, name))"
+            )
+
+    def connect(self) -> sqlite3.Connection:
+        """
+        Opens a new connection, so each thread may use its own.
+        Transactions are begun explicitly, and any left open
+        when a connection is closed are rolled back.
+        :return: sqlite3 Connection
+        """
+        return sqlite3.connect(self.path, timeout=60, isolation_level=None)
+
+    def publish(self, jobs: list) -> int:
+        """
+        Adds jobs to this run, in the order they should be claimed.
+        Jobs already in this run are left as they are, so several
+        workers of the run may publish the same job list.
+        :param jobs: list of tuples of (str job name, dict payload)
+        :return: int of jobs added
+        """
+        with closing(self.connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            start = connection.execute(
+                "SELECT COALESCE(MAX(position), -1) + 1 FROM jobs WHERE run = ?",
+                (self.run,),
+            ).fetchone()[0]
+            added = 0
+            for position, (name, payload) in enumerate(jobs):
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO jobs VALUES (?, ?, ?, ?, 'pending', '', 0, 0, '')",
+                    (self.run, name, start + position, json.dumps(payload)),
+                )
+                added = added + cursor.rowcount
+            connection.execute("COMMIT")
+        return added
+
+    def claim(self, worker: str) -> Optional[dict]:
+        """
+        Claims the next pending job, or a job whose lease has expired.
+        Jobs whose leases have expired too many times are marked failed.
+        :param worker: str identifying the claiming worker
+        :return: dict with the job "name" and "payload", or None if no jobs are available
+        """
+        now = time.time()
+        with closing(self.connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', "
+                "result = '{\"status\": \"failed\", \"reason\": \"lease expired\"}' "
+                "WHERE run = ? AND status = 'claimed' AND lease_expires < ? AND attempts >= ?",
+                (self.run, now, MAX_ATTEMPTS),
+            )
+            row = connection.execute(
+                "SELECT name, payload FROM jobs "
+                "WHERE run = ? AND (status = 'pending' OR (status = 'claimed' AND lease_expires < ?)) "
+                "ORDER BY position LIMIT 1",
+                (self.run, now),
+            ).fetchone()
+            if row:
+                connection.execute(
+                    "UPDATE jobs SET status = 'claimed', worker = ?, lease_expires = ?, "
+                    "attempts = attempts + 1 WHERE run = ? AND name = ?",
+                    (worker, now + self.lease_seconds, self.run, row[0]),
+                )
+            connection.execute("COMMIT")
+
+        if not row:
+            return None
+
+        return {"name": row[0], "payload": json.loads(row[1])}
+
+    def renew(self, name: str, worker: str) -> bool:
+        """
+        Extends the lease on a claimed job.
+        :param name: str of job name
+        :param worker: str identifying the worker holding the lease
+        :return: bool, True if the lease was renewed - False if
+        the worker no longer holds it (e.g., it expired and was reclaimed)
+        """
+        with closing(self.connect()) as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET lease_expires = ? "
+                "WHERE run = ? AND name = ? AND worker = ? AND status = 'claimed'",
+                (time.time() + self.lease_seconds, self.run, name, worker),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, name: str, worker: str, result: dict) -> bool:
+        """
+        Reports the result of a claimed job.
+        :param name: str of job name
+        :param worker: str identifying the worker holding the lease
+        :param result: dict of job result, as JSON-serializable values
+        :return: bool, True if recorded - False if the worker no longer held the lease
+        """
+        with closing(self.connect()) as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_expires = 0 "
+                "WHERE run = ? AND name = ? AND worker = ? AND status = 'claimed'",
+                (json.dumps(result), self.run, name, worker),
+            )
+        return cursor.rowcount == 1
+
+    def counts(self) -> dict:
+        """
+        Counts this run's jobs by status.
+        :return: dict of status (pending, claimed, done, failed) to int count
+        """
+        with closing(self.connect()) as connection:
+            rows = connection.execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE run = ? GROUP BY status",
+                (self.run,),
+            ).fetchall()
+        return dict(rows)
+
+    def results(self) -> dict:
+        """
+        Gets the results of all of this run's finished jobs.
+        :return: dict of job name to dict of result
+        """
+        with closing(self.connect()) as connection:
+            rows = connection.execute(
+                "SELECT name, result FROM jobs WHERE run = ? AND status IN ('done', 'failed') "
+                "ORDER BY position",
+                (self.run,),
+            ).fetchall()
+        return {name: json.loads(result) for name, result in rows}
+
+
+class LeaseKeeper:
+    """
+    Renews the lease on a claimed job in the background,
+    for as long as the job is running.
+    """
+
+    def __init__(self, queue: WorkQueue, name: str, worker: str):
+        """
+        :param queue: WorkQueue the job was claimed from
+        :param name: str of job name
+        :param worker: str identifying the worker holding the lease
+        """
+        self.queue = queue
+        self.name = name
+        self.worker = worker
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.renew, daemon=True)
+
+    def renew(self) -> None:
+        """
+        Renews the lease a few times per lease period until stopped.
+        """
+        while not self.stopped.wait(self.queue.lease_seconds / 3):
+            if not self.queue.renew(self.name, self.worker):
+                print(f"Lost lease on {self.name} - another worker may repeat it.")
+                return
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+
+def run_queue_workers(
+    queue: WorkQueue,
+    worker: Callable,
+    workers: int,
+    worker_id: str,
+    on_result: Optional[Callable] = None,
+) -> list:
+    """
+    Claims and runs jobs from a queue in worker threads, until no jobs are left.
+    Each job's lease is renewed while it runs, and its result is reported to the queue.
+    Jobs running at once share this process's loggers, so any per-job log
+    must only take records from its own thread, as kgx_transform's do.
+    Threads only take turns at pure Python work, so CPU-bound parts of a job
+    should be handed to worker processes (see scheduler.start_process_pool).
+    If a job raises an error, no further jobs are claimed, and the error is
+    raised once running jobs finish - the failed job's lease then expires,
+    so another worker may retry it.
+    :param queue: WorkQueue to claim jobs from
+    :param worker: function called with each job payload, returning a JSON-serializable dict
+    :param workers: int of number of worker threads
+    :param worker_id: str identifying this process, e.g., host name and process ID
+    :param on_result: function called with each result as it completes;
+    if it returns False, no further jobs are claimed
+    :return: list of results from the worker function, in order of completion
+    """
+
+    results: list = []
+    errors: list = []
+    result_lock = threading.Lock()
+    halted = threading.Event()
+
+    def work(thread_id: str) -> None:
+        while not halted.is_set():
+            job = queue.claim(thread_id)
+            if not job:
+                return
+            try:
+                with LeaseKeeper(queue, job["name"], thread_id):
+                    result = worker(job["payload"])
+            except Exception as e:
+                errors.append(e)
+                halted.set()
+                return
+            queue.complete(job["name"], thread_id, result)
+            with result_lock:
+                results.append(result)
+                if on_result and not on_result(result):
+                    print(f"Job {job['name']} requested a halt - no more jobs will be claimed.")
+                    halted.set()
+
+    threads = [
+        threading.Thread(target=work, args=(f"{worker_id}-{i}",))
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+    return results
+
@@ -8,8 +8,14 @@ to KGX TSV, with intermediate JSON.
 
 import click  #type: ignore
 import sys
-from kg_obo.transform import run_transform
+from kg_obo.transform import DEFAULT_CHUNK_SIZE, run_transform
+from kg_obo.plan import make_plan
+from kg_obo.scheduler import get_shard_lock_path
+from kg_obo.work_queue import get_worker_id
+import kg_obo.http_client
+from kg_obo.download_cache import DEFAULT_CACHE_SIZE
 import kg_obo.upload
+from kg_obo.robot_utils import parse_memory_size
 
 @click.command()
 @click.option("--skip",
@@ -47,15 +53,124 @@ import kg_obo.upload
 @click.option("--force_overwrite",
                is_flag=True,
                help="""If used, will overwrite existing transform files on the bucket.""")
+@click.option("--workers",
+               default=1,
+               type=int,
+               help="""Number of OBOs to transform at once. Each OBO's ROBOT and KGX steps
+                     run in a separate worker process. Defaults to 1.""")
+@click.option("--memory_budget",
+               default="",
+               help="""Total memory available to ROBOT processes, as a Java heap size, e.g., 100g.
+                     An OBO reserves its ROBOT heap only while it is being processed, and waits
+                     while that heap does not fit alongside other OBOs. Also caps each ROBOT heap,
+                     in every mode. Defaults to all system memory.""")
+@click.option("--pipeline",
+               is_flag=True,
+               help="""If used, runs downloads, transforms, and uploads as separate stages,
+                     so downloading and uploading other OBOs overlaps with each transform.
+                     The --workers option then sets the number of concurrent transforms,
+                     each run in its own worker process.""")
+@click.option("--resume",
+               is_flag=True,
+               help="""If used, continues each OBO from the last stage it completed in an interrupted run,
+                     rather than downloading and transforming it again from the start.""")
+@click.option("--plan",
+               is_flag=True,
+               help="""If used, only works out which OBOs have new versions, how much must be downloaded,
+                     and which OBOs need imports merged, then writes this plan and exits.
+                     With --resume, OBOs left unfinished by an interrupted run are planned as resumed.
+                     Nothing is transformed or uploaded.""")
+@click.option("--plan_path",
+               default="plan.json",
+               help="""Where to write the plan made with --plan, as JSON. Defaults to plan.json.""")
+@click.option("--registry_order",
+               is_flag=True,
+               help="""If used, transforms OBOs in the order of the OBO Foundry registry.
+                     Otherwise, the OBOs expected to take longest, based on the previous run
+                     and on their sizes, are started first.""")
+@click.option("--shard",
+               default="",
+               help="""Transform only one shard of the OBOs, as i/N for shard i of N, counting from 0,
+                     e.g., 0/4. Each shard may be run at once on a different host.""")
+@click.option("--shard_plan",
+               default="",
+               help="""A plan made with --plan, used to balance shards by estimated cost.
+                     All shards must use the same plan. Otherwise, OBOs are sharded by ID.""")
+@click.option("--queue",
+               default="",
+               help="""Path to a work queue (a SQLite file, created if needed) shared with other runs,
+                     e.g., on other hosts with a shared filesystem. OBOs are added to the queue,
+                     then each worker claims one at a time, so no worker is idle while work remains.
+                     If a run stops, its claimed OBOs are picked up by other runs after a timeout.""")
+@click.option("--queue_run",
+               default="",
+               help="""ID of the jobs in the --queue shared by these runs. Every run sharing the work
+                     must use the same ID, and a later run of the whole transform needs a new one.
+                     Defaults to the current UTC date, e.g., 2021-08-26.""")
+@click.option("--http_timeout",
+               default=kg_obo.http_client.DEFAULT_READ_TIMEOUT,
+               type=float,
+               help="""Seconds to wait for a response, or for more of a download, before giving up.
+                     Defaults to 60.""")
+@click.option("--http_connections",
+               default=kg_obo.http_client.DEFAULT_HOST_CONNECTIONS,
+               type=int,
+               help="""Maximum connections open at once to any one host, e.g., purl.obolibrary.org.
+                     Connections are kept open and reused, and shared fairly by all workers.
+                     Defaults to 8.""")
+@click.option("--download_bandwidth",
+               default="0",
+               help="""Maximum total download rate, in bytes per second, for all workers, e.g., 50m.
+                     Use to leave bandwidth for uploads. Defaults to 0, for no limit.""")
+@click.option("--download_cache",
+               default="",
+               help="""Directory to keep downloaded OBOs in between runs, e.g., ~/.cache/kg-obo/downloads.
+                     OBOs which haven't changed since they were cached aren't downloaded again.
+                     Use a directory on the same filesystem as the data directory, so cached OBOs
+                     are hardlinked rather than copied. By default, downloads aren't kept.""")
+@click.option("--download_cache_size",
+               default=DEFAULT_CACHE_SIZE,
+               help=f"""Total size of cached downloads, e.g., 50g. The least recently used are
+                     removed beyond this. Use 0 to keep no downloads. Defaults to {DEFAULT_CACHE_SIZE}.""")
+@click.option("--download_chunk_size",
+               default=DEFAULT_CHUNK_SIZE,
+               help=f"""Bytes to read and write at a time while downloading, e.g., 4m.
+                     Defaults to {DEFAULT_CHUNK_SIZE}.""")
+@click.option("--download_segments",
+               default=1,
+               type=int,
+               help="""Number of Range requests to download each large OBO (over 64 MB) with at once,
+                     where its server accepts them. Interrupted downloads are resumed either way.
+                     Defaults to 1, downloading each OBO as a single stream.""")
 def run(skip, get_only, bucket, save_local, s3_test, no_dl_progress, force_index_refresh, replace_base_obos,
-        robot_path, force_overwrite):
+        robot_path, force_overwrite, workers, memory_budget, pipeline, resume, plan, plan_path,
+        registry_order, shard, shard_plan, queue, queue_run, http_timeout, http_connections, download_bandwidth,
+        download_cache, download_cache_size, download_chunk_size, download_segments):
+    kg_obo.http_client.configure(read_timeout=http_timeout, host_connections=http_connections,
+                                 bandwidth=parse_memory_size(download_bandwidth))
+
+    if plan:
+        make_plan(skip, get_only, bucket, s3_test, replace_base_obos, plan_path, resume=resume)
+        return
+
     lock_file_remote_path = "kg-obo/lock"
+    try:
+        run_lock_path = get_shard_lock_path(lock_file_remote_path, shard,
+                                            get_worker_id() if queue else "")
+    except ValueError as e:
+        sys.exit(f"{e}")
     if force_overwrite:
         print("*** Will overwrite existing graph files with new transforms! ***")
     try:
         if run_transform(skip, get_only, bucket, save_local, s3_test, no_dl_progress, 
                          force_index_refresh, replace_base_obos, robot_path, lock_file_remote_path,
-                         force_overwrite):
+                         force_overwrite, workers=workers, memory_budget=memory_budget,
+                         pipeline=pipeline, resume=resume, registry_order=registry_order,
+                         shard=shard, shard_plan=shard_plan, queue_path=queue, queue_run=queue_run,
+                         download_cache_dir=download_cache,
+                         download_cache_size=download_cache_size,
+                         download_chunk_size=download_chunk_size,
+                         download_segments=download_segments):
             print("Operation completed without errors (not counting any OBO-specific errors).")
         else:
             print("Operation encountered errors. See logs for details.")
@@ -64,10 +179,10 @@ def run(skip, get_only, bucket, save_local, s3_test, no_dl_progress, force_index
         print(f"Encountered unresolvable error: {type(e)} - {e} ({e.args})")
         print("Removing lock due to error...")
         if s3_test:
-            if not kg_obo.upload.mock_set_lock(bucket,lock_file_remote_path,unlock=True):
+            if not kg_obo.upload.mock_set_lock(bucket,run_lock_path,unlock=True):
                 print("Could not mock setting lock file.")
         else:
-            if not kg_obo.upload.set_lock(bucket,lock_file_remote_path,unlock=True):
+            if not kg_obo.upload.set_lock(bucket,run_lock_path,unlock=True):
                 print("Could not remove lock file due to yet another error.")
             else:
                 print("Lock removed.")
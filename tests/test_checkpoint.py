@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+from kg_obo.checkpoint import checkpoint_file, clear_checkpoints, get_checkpoint, \
+                              get_file_hash, has_checkpoints, record_checkpoint
+
+
+class TestCheckpoint(TestCase):
+
+    def setUp(self) -> None:
+        self.data_dir = tempfile.mkdtemp()
+        self.checkpoint_path = checkpoint_file(self.data_dir, "bfo")
+        self.owl_path = os.path.join(self.data_dir, "bfo.owl")
+        shutil.copy('tests/resources/download_ontology/bfo.owl', self.owl_path)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.data_dir)
+
+    def test_get_file_hash(self):
+        self.assertEqual(len(get_file_hash(self.owl_path)), 64)
+
+    def test_record_checkpoint(self):
+        self.assertFalse(has_checkpoints(self.checkpoint_path, "2019-08-26"))
+        record_checkpoint(self.checkpoint_path, "2019-08-26", "download", self.owl_path)
+        record_checkpoint(self.checkpoint_path, "2019-08-26", "names")
+        self.assertTrue(has_checkpoints(self.checkpoint_path, "2019-08-26"))
+        self.assertEqual(get_checkpoint(self.checkpoint_path, "2019-08-26", "download")["path"],
+                         self.owl_path)
+        self.assertTrue(get_checkpoint(self.checkpoint_path, "2019-08-26", "names"))
+        self.assertFalse(get_checkpoint(self.checkpoint_path, "2019-08-26", "relax"))
+
+        # A different version can't resume from these checkpoints
+        self.assertFalse(get_checkpoint(self.checkpoint_path, "2020-01-01", "download"))
+        self.assertFalse(has_checkpoints(self.checkpoint_path, "2020-01-01"))
+
+    @mock.patch('kg_obo.checkpoint.get_file_hash')
+    def test_record_checkpoint_no_hashing(self, mock_get_file_hash):
+        # Stages are checked by size and modification time, not by hashing
+        record_checkpoint(self.checkpoint_path, "2019-08-26", "relax", self.owl_path)
+        record_checkpoint(self.checkpoint_path, "2019-08-26", "download", self.owl_path,
+                          sha256="abc123")
+        self.assertTrue(get_checkpoint(self.checkpoint_path, "2019-08-26", "relax"))
+        self.assertEqual(get_checkpoint(self.checkpoint_path, "2019-08-26", "download")["sha256"],
+                         "abc123")
+        self.assertFalse(mock_get_file_hash.called)
+
+    def test_get_checkpoint_changed_file(self):
+        record_checkpoint(self.checkpoint_path, "2019-08-26", "download", self.owl_path)
+        with open(self.owl_path, "a") as owl_file:
+            owl_file.write("truncated")
+        self.assertFalse(get_checkpoint(self.checkpoint_path, "2019-08-26", "download"))
+
+        # Same size, but rewritten since
+        record_checkpoint(self.checkpoint_path, "2019-08-26", "download", self.owl_path)
+        stat = os.stat(self.owl_path)
+        os.utime(self.owl_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+        self.assertFalse(get_checkpoint(self.checkpoint_path, "2019-08-26", "download"))
+        os.remove(self.owl_path)
+        self.assertFalse(get_checkpoint(self.checkpoint_path, "2019-08-26", "download"))
+
+    def test_clear_checkpoints(self):
+        record_checkpoint(self.checkpoint_path, "2019-08-26", "names")
+        clear_checkpoints(self.checkpoint_path)
+        self.assertFalse(os.path.exists(self.checkpoint_path))
+        self.assertFalse(has_checkpoints(self.checkpoint_path, "2019-08-26"))
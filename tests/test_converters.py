@@ -0,0 +1,46 @@
+import os
+import tempfile
+from unittest import TestCase, mock
+
+from kg_obo.converters import build_converters, get_converter_cache_key, get_converters
+
+
+class TestConverters(TestCase):
+
+    def setUp(self) -> None:
+        get_converters.cache_clear()
+
+    def tearDown(self) -> None:
+        get_converters.cache_clear()
+
+    def test_get_converter_cache_key(self):
+        key = get_converter_cache_key()
+        self.assertEqual(key, get_converter_cache_key())
+        with mock.patch('kg_obo.converters.KGOBO_PREFIXES', {"http://example.org/": "EX"}):
+            self.assertNotEqual(key, get_converter_cache_key())
+
+    def test_get_converters(self):
+        with tempfile.TemporaryDirectory() as td:
+            curie_converter, iri_converter = get_converters(td)
+            self.assertEqual(len(os.listdir(td)), 1)
+            self.assertTrue(curie_converter.expand("GO:0008150"))
+            self.assertEqual(iri_converter.compress("http://purl.obolibrary.org/obo/GO_0008150"),
+                             "GO:0008150")
+
+            # Loaded from the cache, without building again
+            get_converters.cache_clear()
+            with mock.patch('kg_obo.converters.build_converters') as mock_build:
+                cached_curie_converter, _ = get_converters(td)
+                self.assertFalse(mock_build.called)
+            self.assertEqual(cached_curie_converter.expand("GO:0008150"),
+                             curie_converter.expand("GO:0008150"))
+
+            # A damaged cache is replaced
+            cache_path = os.path.join(td, os.listdir(td)[0])
+            with open(cache_path, "wb") as cache_file:
+                cache_file.write(b"not a pickle")
+            get_converters.cache_clear()
+            with mock.patch('kg_obo.converters.build_converters',
+                            return_value=build_converters()) as mock_build:
+                get_converters(td)
+                self.assertTrue(mock_build.called)
@@ -0,0 +1,69 @@
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from kg_obo.download_cache import DownloadCache, link_or_copy
+
+
+class TestDownloadCache(TestCase):
+
+    def setUp(self) -> None:
+        self.td = tempfile.TemporaryDirectory()
+        self.cache = DownloadCache(os.path.join(self.td.name, "cache"))
+        self.owl_path = os.path.join(self.td.name, "bfo.owl")
+        with open(self.owl_path, "wb") as owl_file:
+            owl_file.write(b"<rdf:RDF>bfo</rdf:RDF>")
+        self.url = "http://purl.obolibrary.org/obo/bfo.owl"
+
+    def tearDown(self) -> None:
+        self.td.cleanup()
+
+    def test_link_or_copy(self):
+        dest = os.path.join(self.td.name, "linked.owl")
+        with open(dest, "w") as dest_file:
+            dest_file.write("replaced")
+        link_or_copy(self.owl_path, dest)
+        self.assertTrue(os.path.samefile(self.owl_path, dest))
+
+    def test_store_and_link(self):
+        self.assertEqual(self.cache.lookup(self.url), {})
+        self.assertEqual(self.cache.validators(self.url), {})
+
+        sha256 = self.cache.store(self.url, self.owl_path,
+                                  {"ETag": '"abc"', "Last-Modified": "Mon, 26 Aug 2019 00:00:00 GMT"})
+        self.assertEqual(self.cache.lookup(self.url)["sha256"], sha256)
+        self.assertEqual(self.cache.validators(self.url),
+                         {"If-None-Match": '"abc"',
+                          "If-Modified-Since": "Mon, 26 Aug 2019 00:00:00 GMT"})
+
+        # The same content from another URL is stored once
+        self.cache.store("http://purl.obolibrary.org/obo/bfo/bfo.owl", self.owl_path, {})
+        self.assertEqual(len(os.listdir(self.cache.objects_dir)), 1)
+
+        dest = os.path.join(self.td.name, "data", "bfo.owl")
+        os.makedirs(os.path.dirname(dest))
+        self.assertTrue(self.cache.link(self.url, dest))
+        self.assertTrue(os.path.samefile(dest, self.cache.lookup(self.url)["path"]))
+        self.assertFalse(self.cache.link("http://purl.obolibrary.org/obo/go.owl", dest))
+
+    def test_evict(self):
+        cache = DownloadCache(os.path.join(self.td.name, "cache"), max_bytes=100)
+        paths = []
+        for i in range(3):
+            path = os.path.join(self.td.name, f"{i}.owl")
+            with open(path, "wb") as owl_file:
+                owl_file.write(bytes([i]) * 40)
+            paths.append(path)
+
+        first = cache.store("https://0", paths[0], {})
+        os.utime(cache.object_path(first), (time.time() - 60, time.time() - 60))
+        second = cache.store("https://1", paths[1], {})
+        os.utime(cache.object_path(second), (time.time() - 30, time.time() - 30))
+        # Using the first file makes the second the least recently used
+        cache.link("https://0", os.path.join(self.td.name, "used.owl"))
+        cache.store("https://2", paths[2], {})
+
+        self.assertTrue(cache.lookup("https://0"))
+        self.assertEqual(cache.lookup("https://1"), {})
+        self.assertTrue(cache.lookup("https://2"))
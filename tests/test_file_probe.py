@@ -0,0 +1,43 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from kg_obo.file_probe import probe_file
+
+
+class TestFileProbe(TestCase):
+
+    def setUp(self) -> None:
+        self.td = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.td.name, "test.owl")
+
+    def tearDown(self) -> None:
+        self.td.cleanup()
+
+    def write(self, content: bytes) -> None:
+        with open(self.path, "wb") as outfile:
+            outfile.write(content)
+
+    def test_probe_file(self):
+        probe = probe_file('tests/resources/download_ontology/bfo.owl')
+        with open('tests/resources/download_ontology/bfo.owl', "r") as infile:
+            self.assertEqual(probe["lines"], len(infile.readlines()))
+        self.assertEqual(probe["bytes"], os.path.getsize('tests/resources/download_ontology/bfo.owl'))
+        self.assertEqual(probe["classes"], 35)
+
+        # A last line without a newline still counts, but an empty file has none
+        self.write(b"one\n\nthree")
+        self.assertEqual(probe_file(self.path)["lines"], 3)
+        self.write(b"")
+        self.assertEqual(probe_file(self.path)["lines"], 0)
+
+    def test_probe_split(self):
+        declaration = b'<owl:Class rdf:about="http://purl.obolibrary.org/obo/BFO_0000001">\n'
+        content = declaration * 50 + b"Declaration(Class(<http://purl.obolibrary.org/obo/BFO_0000002>))\n"
+        self.write(content)
+        expected = probe_file(self.path)
+        self.assertEqual(expected["classes"], 51)
+
+        # The same counts, however the file is split into chunks
+        for chunk_size in [1, 7, 64, 1000]:
+            self.assertEqual(probe_file(self.path, chunk_size=chunk_size), expected)
@@ -0,0 +1,90 @@
+import multiprocessing
+import threading
+import time
+from unittest import TestCase, mock
+
+from kg_obo.governor import DownloadGovernor, configure, get_governor
+
+
+class TestGovernor(TestCase):
+
+    def tearDown(self) -> None:
+        configure()
+
+    def test_configure(self):
+        configure(host_connections=3, bandwidth=1000)
+        self.assertEqual(get_governor().host_connections, 3)
+        self.assertEqual(get_governor().bandwidth, 1000)
+        self.assertIs(get_governor(), get_governor())
+
+    def test_acquire_in_order(self):
+        governor = DownloadGovernor(host_connections=1)
+        governor.acquire("purl.obolibrary.org")
+        # Other hosts have their own connections
+        with governor.connection("https://github.com/some/file"):
+            pass
+
+        order = []
+
+        def download(i: int) -> None:
+            with governor.connection("http://purl.obolibrary.org/obo/bfo.owl"):
+                order.append(i)
+
+        # Each waits in turn, as each was started after the last was waiting
+        threads = []
+        for i in range(4):
+            thread = threading.Thread(target=download, args=(i,))
+            thread.start()
+            threads.append(thread)
+            time.sleep(0.05)
+        self.assertEqual(order, [])
+
+        governor.release("purl.obolibrary.org")
+        for thread in threads:
+            thread.join(timeout=5)
+        self.assertEqual(order, [0, 1, 2, 3])
+
+    def test_acquire_across_processes(self):
+        governor = DownloadGovernor(host_connections=1)
+        context = multiprocessing.get_context("fork")
+        held = context.Event()
+        done = context.Event()
+
+        def hold() -> None:
+            with governor.connection("http://purl.obolibrary.org/obo/bfo.owl"):
+                held.set()
+                done.wait(5)
+
+        worker = context.Process(target=hold)
+        worker.start()
+        self.assertTrue(held.wait(5))
+
+        acquired = threading.Event()
+
+        def download() -> None:
+            with governor.connection("http://purl.obolibrary.org/obo/go.owl"):
+                acquired.set()
+
+        thread = threading.Thread(target=download)
+        thread.start()
+        # The worker process has the only connection until it's done
+        self.assertFalse(acquired.wait(0.2))
+        done.set()
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+        worker.join()
+
+    @mock.patch('kg_obo.governor.time.sleep')
+    def test_throttle(self, mock_sleep):
+        DownloadGovernor().throttle(10 ** 9)
+        self.assertFalse(mock_sleep.called)
+
+        governor = DownloadGovernor(bandwidth=1000)
+        # A second's worth may be downloaded at once
+        governor.throttle(1000)
+        self.assertFalse(mock_sleep.called)
+        # Beyond that, each waits for its share
+        governor.throttle(500)
+        self.assertAlmostEqual(mock_sleep.call_args.args[0], 0.5, places=1)
+        governor.throttle(500)
+        self.assertAlmostEqual(mock_sleep.call_args.args[0], 1.0, places=1)
@@ -0,0 +1,129 @@
+import os
+from unittest import TestCase, mock
+
+import requests
+
+import kg_obo.http_client
+from kg_obo.governor import get_governor
+from kg_obo.http_client import (
+    GovernedAdapter,
+    configure,
+    get,
+    get_session,
+    get_validators,
+    head,
+    is_unchanged,
+)
+
+
+class TestHttpClient(TestCase):
+
+    def tearDown(self) -> None:
+        configure()
+
+    def test_get_session(self):
+        session = get_session()
+        self.assertIs(get_session(), session)
+        adapter = session.get_adapter("https://purl.obolibrary.org")
+        self.assertEqual(adapter._pool_maxsize, kg_obo.http_client.DEFAULT_HOST_CONNECTIONS)
+
+    def test_configure(self):
+        session = get_session()
+        configure(connect_timeout=1, read_timeout=2, host_connections=3)
+        self.assertIsNot(get_session(), session)
+        self.assertEqual(get_session().get_adapter("https://purl.obolibrary.org")._pool_maxsize, 3)
+
+        with mock.patch('requests.Session.request') as mock_request:
+            get("https://some/url", stream=True)
+            mock_request.assert_called_with("GET", "https://some/url", stream=True, timeout=(1, 2))
+            head("https://some/url", timeout=5)
+            mock_request.assert_called_with("HEAD", "https://some/url",
+                                            timeout=5, allow_redirects=True)
+
+    def test_fork(self):
+        session = get_session()
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # The child must not reuse the parent's connections
+            os.write(write_end, b"1" if get_session() is not session else b"0")
+            os._exit(0)
+        os.waitpid(pid, 0)
+        self.assertEqual(os.read(read_end, 1), b"1")
+
+    @mock.patch('requests.adapters.HTTPAdapter.send')
+    def test_governed_adapter(self, mock_send):
+        configure(host_connections=1)
+        governor = get_governor()
+        slot = governor.host_slot("purl.obolibrary.org")
+        adapter = GovernedAdapter()
+        request = mock.Mock(url="http://purl.obolibrary.org/obo/bfo.owl")
+
+        def streamed_response(*args, **kwargs):
+            response = requests.Response()
+            response.raw = mock.Mock()
+            return response
+
+        # A response that isn't streamed is read, then its connection is free
+        adapter.send(request)
+        self.assertEqual(governor._released[slot], governor._issued[slot])
+
+        # A streamed response holds its connection until it's closed
+        mock_send.side_effect = streamed_response
+        response = adapter.send(request, stream=True)
+        self.assertEqual(governor._released[slot] + 1, governor._issued[slot])
+        with response:
+            pass
+        self.assertEqual(governor._released[slot], governor._issued[slot])
+        # Closing it again doesn't give back another
+        response.close()
+        self.assertEqual(governor._released[slot], governor._issued[slot])
+
+        # or until it's no longer used
+        adapter.send(request, stream=True)
+        self.assertEqual(governor._released[slot], governor._issued[slot])
+
+        # A failed request gives back its connection
+        mock_send.side_effect = requests.exceptions.ConnectionError
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            adapter.send(request, stream=True)
+        self.assertEqual(governor._released[slot], governor._issued[slot])
+
+    def test_get_validators(self):
+        url = "http://purl.obolibrary.org/obo/bfo.owl"
+        self.assertEqual(get_validators(url, {"Content-Length": "100"}), {})
+        self.assertEqual(get_validators(url, {"ETag": '"abc"', "Content-Length": "100"}),
+                         {"url": url, "etag": '"abc"', "last_modified": "", "content_length": "100"})
+
+    @mock.patch('kg_obo.http_client.head')
+    def test_is_unchanged(self, mock_head):
+        url = "http://purl.obolibrary.org/obo/bfo.owl"
+        validators = {"url": url, "etag": '"abc"', "last_modified": "", "content_length": "100"}
+
+        mock_head.return_value.status_code = 304
+        self.assertTrue(is_unchanged(url, validators))
+        mock_head.assert_called_with(url, headers={"If-None-Match": '"abc"'})
+
+        # Servers which ignore the conditions are checked against the validators
+        mock_head.return_value.status_code = 200
+        mock_head.return_value.headers = {"ETag": '"abc"', "Content-Length": "100"}
+        self.assertTrue(is_unchanged(url, validators))
+        mock_head.return_value.headers = {"ETag": '"abc"'}
+        self.assertTrue(is_unchanged(url, validators))
+        mock_head.return_value.headers = {"ETag": '"abc"', "Content-Length": "200"}
+        self.assertFalse(is_unchanged(url, validators))
+        mock_head.return_value.headers = {"ETag": '"def"', "Content-Length": "100"}
+        self.assertFalse(is_unchanged(url, validators))
+        mock_head.return_value.headers = {"Content-Length": "100"}
+        self.assertFalse(is_unchanged(url, validators))
+
+        mock_head.return_value.status_code = 404
+        self.assertFalse(is_unchanged(url, validators))
+        mock_head.side_effect = requests.exceptions.ConnectionError
+        self.assertFalse(is_unchanged(url, validators))
+
+        # Validators from another URL, or none at all, can't tell
+        mock_head.reset_mock()
+        self.assertFalse(is_unchanged("http://purl.obolibrary.org/obo/bfo/bfo.owl", validators))
+        self.assertFalse(is_unchanged(url, {}))
+        self.assertFalse(mock_head.called)
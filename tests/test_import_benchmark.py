@@ -0,0 +1,36 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from kg_obo.import_benchmark import benchmark_entry_points, get_loaded_modules, time_command
+
+
+class TestImportBenchmark(TestCase):
+
+    def test_get_loaded_modules(self):
+        self.assertEqual(get_loaded_modules("import kg_obo"), [])
+        # The entry points only need their heavy dependencies once they do any work
+        self.assertEqual(get_loaded_modules("import kg_obo.upload"), [])
+        self.assertEqual(get_loaded_modules("import kg_obo.stats"), [])
+        self.assertEqual(get_loaded_modules("import kg_obo.transform, kg_obo.plan"), [])
+        self.assertIn("kgx.cli", get_loaded_modules("import kg_obo.transform, kgx.cli"))
+
+    def test_lazy_exports(self):
+        import kg_obo
+        from kg_obo.transform import run_transform
+        self.assertIs(kg_obo.run_transform, run_transform)
+        self.assertTrue(kg_obo.transform.kgx_transform)
+        with self.assertRaises(AttributeError):
+            kg_obo.not_a_module
+
+    def test_time_command(self):
+        result = time_command(["-c", "pass"], runs=3)
+        self.assertTrue(result["min"] <= result["median"] <= result["max"])
+
+    def test_benchmark_entry_points(self):
+        with tempfile.TemporaryDirectory() as td:
+            outpath = os.path.join(td, "startup.tsv")
+            results = benchmark_entry_points(runs=1, outpath=outpath)
+            self.assertEqual(len(results), 4)
+            with open(outpath) as outfile:
+                self.assertEqual(len(outfile.readlines()), 5)
@@ -0,0 +1,60 @@
+import csv
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from kg_obo.metrics import get_path_size, measure_stage, summarize_metrics, write_metrics
+
+
+class TestMetrics(TestCase):
+
+    def setUp(self) -> None:
+        self.result = {"name": "bfo"}
+        self.input_path = 'tests/resources/download_ontology/bfo.owl'
+
+    def test_get_path_size(self):
+        self.assertEqual(get_path_size(self.input_path), os.path.getsize(self.input_path))
+        self.assertGreaterEqual(get_path_size('tests/resources/download_ontology'),
+                                get_path_size(self.input_path))
+        self.assertEqual(get_path_size('tests/resources/not_a_file'), 0)
+
+    def test_measure_stage(self):
+        with tempfile.TemporaryDirectory() as td:
+            output_path = os.path.join(td, "bfo_relaxed.owl")
+            with measure_stage(self.result, "relax", self.input_path, output_path) as stage:
+                with open(output_path, "w") as outfile:
+                    outfile.write("relaxed")
+                stage["bytes_downloaded"] = 10
+        record = self.result["metrics"][0]
+        self.assertEqual(record["stage"], "relax")
+        self.assertEqual(record["input_bytes"], os.path.getsize(self.input_path))
+        self.assertEqual(record["output_bytes"], 7)
+        self.assertEqual(record["bytes_downloaded"], 10)
+        self.assertGreaterEqual(record["seconds"], 0)
+
+        # Failed stages are recorded too
+        with self.assertRaises(ValueError):
+            with measure_stage(self.result, "convert"):
+                raise ValueError
+        self.assertEqual(self.result["metrics"][1]["stage"], "convert")
+
+    def test_write_metrics(self):
+        with measure_stage(self.result, "relax"):
+            pass
+        with measure_stage(self.result, "convert"):
+            pass
+        with tempfile.TemporaryDirectory() as td:
+            tsv_path, json_path = write_metrics(self.result["metrics"], td)
+            with open(tsv_path) as tsv_file:
+                rows = list(csv.DictReader(tsv_file, delimiter="\t"))
+            self.assertEqual([row["stage"] for row in rows], ["relax", "convert"])
+            with open(json_path) as json_file:
+                self.assertEqual(json.load(json_file), self.result["metrics"])
+
+    def test_summarize_metrics(self):
+        metrics = [{"stage": "relax", "seconds": 1.0},
+                   {"stage": "convert", "seconds": 5.0},
+                   {"stage": "relax", "seconds": 2.0}]
+        self.assertEqual(list(summarize_metrics(metrics).items()),
+                         [("convert", 5.0), ("relax", 3.0)])
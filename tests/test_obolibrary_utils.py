@@ -1,41 +1,76 @@
 from unittest import TestCase, mock
 from unittest.mock import Mock
 
-from kg_obo.obolibrary_utils import get_url, base_url_exists
+from kg_obo.obolibrary_utils import base_url_exists, get_product_url, get_url, resolve_url, resolve_urls
 
 
 class TestOboLibraryUtils(TestCase):
 
     def setUp(self) -> None:
-        self.url_values = "1\n2\n3\n"
-        pass
+        self.url_values = [b"1", b"2", b"3"]
+        self.bucket_values = [b'<?xml version="1.0" encoding="UTF-8"?>',
+                              b'<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">']
 
-    @mock.patch('requests.head')
-    @mock.patch('urllib.request.urlopen')
-    def test_get_url(self, mock_urlopen, mock_head):
+    @mock.patch('kg_obo.http_client.head')
+    @mock.patch('kg_obo.http_client.get')
+    def test_get_url(self, mock_get, mock_head):
         for status in 200, 404:
             mock_head.return_value = Mock(status_code=status)
-            mock_urlopen.return_value = self.url_values
+            mock_get.return_value.__enter__.return_value.iter_lines.return_value = self.url_values
             ret_url = get_url("test")
             self.assertTrue(mock_head.called)
-            self.assertTrue(mock_urlopen.called)
+            self.assertTrue(mock_get.called)
             if status == 200:
                 self.assertEqual(ret_url, "http://purl.obolibrary.org/obo/test/test.owl")
             else:
                 self.assertEqual(ret_url, "http://purl.obolibrary.org/obo/test.owl")
+
+        # A listing of a bucket isn't an OBO
+        mock_head.return_value = Mock(status_code=200)
+        mock_get.return_value.__enter__.return_value.iter_lines.return_value = self.bucket_values
+        self.assertEqual(get_url("test"), "http://purl.obolibrary.org/obo/test.owl")
             
 
-    @mock.patch('requests.head')
-    @mock.patch('urllib.request.urlopen')
-    def test_base_url_exists(self, mock_urlopen, mock_head):
+    @mock.patch('kg_obo.http_client.head')
+    @mock.patch('kg_obo.http_client.get')
+    def test_base_url_exists(self, mock_get, mock_head):
         for status in 200, 404:
             mock_head.return_value = Mock(status_code=status)
-            mock_urlopen.return_value = self.url_values
+            mock_get.return_value.__enter__.return_value.iter_lines.return_value = self.url_values
             base_exists = base_url_exists("test")
             self.assertTrue(mock_head.called)
-            self.assertTrue(mock_urlopen.called)
+            self.assertTrue(mock_get.called)
             if status == 200:
                 self.assertTrue(base_exists)
             else:
                 self.assertFalse(base_exists)
 
+    @mock.patch('kg_obo.obolibrary_utils.base_url_exists', return_value=True)
+    @mock.patch('kg_obo.obolibrary_utils.get_url', return_value="https://probed/url")
+    def test_resolve_url(self, mock_get_url, mock_base_url_exists):
+        # Products listed in the registry need no requests
+        ontology = {"id": "bfo",
+                    "products": [{"id": "bfo.owl", "ontology_purl": "http://purl.obolibrary.org/obo/bfo.owl"},
+                                 {"id": "bfo.obo", "ontology_purl": "http://purl.obolibrary.org/obo/bfo.obo"}]}
+        self.assertEqual(get_product_url(ontology, "bfo.obo"), "http://purl.obolibrary.org/obo/bfo.obo")
+        self.assertIsNone(get_product_url(ontology, "bfo-base.owl"))
+        self.assertEqual(resolve_url(ontology, check_base=True),
+                         {"url": "http://purl.obolibrary.org/obo/bfo.owl", "base_exists": False})
+        ontology["products"].append({"id": "bfo-base.owl",
+                                     "ontology_purl": "http://purl.obolibrary.org/obo/bfo/bfo-base.owl"})
+        self.assertTrue(resolve_url(ontology, check_base=True)["base_exists"])
+        self.assertEqual(resolve_url({"id": "go", "ontology_purl": "http://purl.obolibrary.org/obo/go.owl"}),
+                         {"url": "http://purl.obolibrary.org/obo/go.owl"})
+        self.assertFalse(mock_get_url.called)
+        self.assertFalse(mock_base_url_exists.called)
+
+        # Otherwise, the URLs are probed
+        self.assertEqual(resolve_url({"id": "go"}, check_base=True),
+                         {"url": "https://probed/url", "base_exists": True})
+        self.assertTrue(mock_get_url.called)
+        self.assertTrue(mock_base_url_exists.called)
+
+    @mock.patch('kg_obo.obolibrary_utils.get_url', side_effect=lambda oid: f"https://{oid}")
+    def test_resolve_urls(self, mock_get_url):
+        self.assertEqual(resolve_urls([{"id": "bfo"}, {"id": "go"}], workers=2),
+                         {"bfo": {"url": "https://bfo"}, "go": {"url": "https://go"}})
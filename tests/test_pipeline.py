@@ -0,0 +1,53 @@
+import threading
+from unittest import TestCase
+
+from kg_obo.pipeline import run_pipeline
+
+
+class TestPipeline(TestCase):
+
+    def setUp(self) -> None:
+        self.items = [{"value": i, "stages": []} for i in range(5)]
+
+    def stage(self, name):
+        def run_stage(item):
+            item["stages"].append(name)
+            return item["value"] != 3
+        return run_stage
+
+    def test_run_pipeline(self):
+        stages = [("first", self.stage("first"), 2),
+                  ("second", self.stage("second"), 1)]
+        results = run_pipeline(self.items, stages, queue_size=1)
+        self.assertEqual(len(results), 5)
+        for item in results:
+            if item["value"] == 3:
+                self.assertEqual(item["stages"], ["first"])
+            else:
+                self.assertEqual(item["stages"], ["first", "second"])
+
+    def test_run_pipeline_halt(self):
+        items = [{"value": i, "stages": []} for i in range(20)]
+        halting = threading.Event()
+
+        def run_stage(item):
+            # Hold later items until the halt, so the feed can't finish first
+            if item["value"] > 1:
+                halting.wait(timeout=5)
+            return True
+
+        def on_result(item):
+            if item["value"] < 1:
+                return True
+            halting.set()
+            return False
+
+        results = run_pipeline(items, [("first", run_stage, 1)], queue_size=1,
+                               on_result=on_result)
+        self.assertTrue(len(results) < 20)
+
+    def test_run_pipeline_error(self):
+        def fail(item):
+            raise ValueError("failed")
+        with self.assertRaises(ValueError):
+            run_pipeline(self.items, [("fail", fail, 1)])
@@ -0,0 +1,124 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+import requests
+
+from kg_obo.checkpoint import checkpoint_file, record_checkpoint
+from kg_obo.plan import estimate_cost, make_plan, plan_ontology
+from kg_obo.scheduler import DEFAULT_BYTES_PER_SECOND
+
+
+def copy_header(source):
+    # Stands in for download_header, with a local OWL as the OBO
+    def fetch(url, file):
+        shutil.copy(source, file)
+        return 1000
+    return fetch
+
+
+class TestPlan(TestCase):
+
+    def setUp(self) -> None:
+        self.ontology = {"id": "bfo"}
+        self.tracking = {"ontologies": {"bfo": {
+            "current_iri": "http://purl.obolibrary.org/obo/bfo/2019-08-26/bfo.owl",
+            "current_version": "2019-08-26"}}}
+
+    def test_estimate_cost(self):
+        self.assertEqual(estimate_cost(DEFAULT_BYTES_PER_SECOND, False), 1)
+        self.assertEqual(estimate_cost(100, False, bytes_per_second=10), 10)
+        self.assertGreater(estimate_cost(100, True), estimate_cost(100, False))
+        # A previous duration is used as it is
+        self.assertEqual(estimate_cost(100, True, previous_seconds=5.0), 5.0)
+
+    @mock.patch('kg_obo.obolibrary_utils.get_url', return_value="https://some/url")
+    def test_plan_ontology(self, mock_get_url):
+        with mock.patch('kg_obo.plan.download_header',
+                        side_effect=copy_header('tests/resources/download_ontology/bfo.owl')):
+            entry = plan_ontology(self.ontology, self.tracking)
+            self.assertEqual(entry["action"], "existing")
+            self.assertEqual(entry["version"], "2019-08-26")
+
+            entry = plan_ontology(self.ontology, {"ontologies": {}})
+            self.assertEqual(entry["action"], "transform")
+            self.assertEqual(entry["bytes"], 1000)
+            self.assertEqual(entry["download_bytes"], 1000)
+            self.assertFalse(entry["needs_merge"])
+            self.assertEqual(entry["estimated_cost"], 1000 / DEFAULT_BYTES_PER_SECOND)
+
+            entry = plan_ontology(self.ontology, {"ontologies": {}}, durations={"bfo": {"seconds": 30.0}})
+            self.assertEqual(entry["estimated_cost"], 30.0)
+
+        with mock.patch('kg_obo.plan.download_header',
+                        side_effect=copy_header('tests/resources/download_ontology/upheno_SNIPPET.owl')):
+            entry = plan_ontology(self.ontology, {"ontologies": {}})
+            self.assertTrue(entry["needs_merge"])
+            self.assertGreater(entry["estimated_cost"], entry["bytes"] / DEFAULT_BYTES_PER_SECOND)
+
+        with mock.patch('kg_obo.plan.download_header',
+                        side_effect=requests.exceptions.ConnectionError):
+            entry = plan_ontology(self.ontology, self.tracking)
+            self.assertEqual(entry["action"], "failed")
+
+    @mock.patch('kg_obo.obolibrary_utils.get_url', return_value="https://some/url")
+    def test_plan_ontology_unchanged(self, mock_get_url):
+        # As in fetch_ontology, an unchanged file's header isn't retrieved
+        tracking = {"ontologies": {"bfo": dict(self.tracking["ontologies"]["bfo"],
+                                               validators={"url": "https://some/url", "etag": '"abc"'})}}
+        with mock.patch('kg_obo.http_client.is_unchanged', return_value=True) as mock_is_unchanged, \
+                mock.patch('kg_obo.plan.download_header') as mock_download_header:
+            entry = plan_ontology(self.ontology, tracking)
+            self.assertEqual(entry["action"], "existing")
+            mock_is_unchanged.assert_called_once_with(
+                "https://some/url", tracking["ontologies"]["bfo"]["validators"])
+            self.assertFalse(mock_download_header.called)
+
+    @mock.patch('kg_obo.obolibrary_utils.get_url', return_value="https://some/url")
+    def test_plan_ontology_resume(self, mock_get_url):
+        with tempfile.TemporaryDirectory() as td, \
+                mock.patch('kg_obo.plan.download_header',
+                           side_effect=copy_header('tests/resources/download_ontology/bfo.owl')):
+            owl_path = os.path.join(td, "bfo.owl")
+            shutil.copy('tests/resources/download_ontology/bfo.owl', owl_path)
+            os.makedirs(os.path.dirname(checkpoint_file(td, "bfo")), exist_ok=True)
+            record_checkpoint(checkpoint_file(td, "bfo"), "2019-08-26", "download", owl_path)
+
+            # Without resume, a tracked version is left as it is
+            entry = plan_ontology(self.ontology, self.tracking, data_dir=td)
+            self.assertEqual(entry["action"], "existing")
+
+            # An unfinished transform is resumed, without downloading the OBO again
+            entry = plan_ontology(self.ontology, self.tracking, data_dir=td, resume=True)
+            self.assertEqual(entry["action"], "transform")
+            self.assertTrue(entry["resume"])
+            self.assertEqual(entry["download_bytes"], 0)
+
+    @mock.patch('kg_obo.obolibrary_utils.base_url_exists')
+    def test_plan_ontology_replace_base(self, mock_base_url_exists):
+        # Base versions listed in the registry are found without probing for them
+        ontology = {"id": "bfo", "products": [
+            {"id": "bfo.owl", "ontology_purl": "http://purl.obolibrary.org/obo/bfo.owl"},
+            {"id": "bfo-base.owl", "ontology_purl": "http://purl.obolibrary.org/obo/bfo-base.owl"}]}
+        with mock.patch('kg_obo.plan.download_header',
+                        side_effect=copy_header('tests/resources/download_ontology/bfo.owl')):
+            self.assertEqual(plan_ontology(ontology, self.tracking)["action"], "existing")
+            entry = plan_ontology(ontology, self.tracking, replace_base_obos=True)
+            self.assertEqual(entry["action"], "transform")
+            self.assertEqual(entry["url"], "http://purl.obolibrary.org/obo/bfo.owl")
+        self.assertFalse(mock_base_url_exists.called)
+
+    @mock.patch('kg_obo.plan.retrieve_obofoundry_yaml', return_value=[{"id": "bfo"}, {"id": "go"}])
+    @mock.patch('kg_obo.obolibrary_utils.get_url', return_value="https://some/url")
+    @mock.patch('kg_obo.plan.download_header',
+                side_effect=copy_header('tests/resources/download_ontology/bfo.owl'))
+    def test_make_plan(self, mock_download_header, mock_get_url, mock_retrieve):
+        with tempfile.TemporaryDirectory() as td:
+            plan_path = os.path.join(td, "plan.json")
+            plan = make_plan(s3_test=True, plan_path=plan_path, log_dir=td)
+            self.assertEqual(plan["summary"]["transform"], ["bfo", "go"])
+            self.assertEqual(plan["summary"]["download_bytes"], 2000)
+            with open(plan_path) as plan_file:
+                self.assertEqual(json.load(plan_file), plan)
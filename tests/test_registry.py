@@ -0,0 +1,62 @@
+import tempfile
+from unittest import TestCase, mock
+
+import requests
+
+from kg_obo.registry import Registry, fetch_registry, load_registry, select_ids
+
+
+class TestRegistry(TestCase):
+
+    def setUp(self) -> None:
+        self.td = tempfile.TemporaryDirectory()
+        self.url = "https://some/ontologies.yml"
+        with open("tests/resources/ontologies.yml", "rb") as registry_file:
+            self.content = registry_file.read()
+
+    def tearDown(self) -> None:
+        self.td.cleanup()
+
+    def test_select_ids(self):
+        ids = ["bfo", "chebi", "go"]
+        self.assertEqual(select_ids(ids), {"bfo", "chebi", "go"})
+        self.assertEqual(select_ids(ids, skip=["chebi"]), {"bfo", "go"})
+        self.assertEqual(select_ids(ids, get_only=["go", "not_an_obo"]), {"go"})
+        # Skipping takes precedence
+        self.assertEqual(select_ids(ids, skip=["chebi"], get_only=["go"]), {"bfo", "go"})
+
+    def test_registry(self):
+        registry = Registry([{"id": "bfo"}, {"id": "old", "is_obsolete": True}, {"id": "go"}])
+        self.assertIn("old", registry)
+        self.assertEqual(registry["go"], {"id": "go"})
+        self.assertEqual(registry.ids(), {"bfo", "go"})
+        self.assertEqual(registry.select(), [{"id": "bfo"}, {"id": "go"}])
+        self.assertEqual(registry.select(get_only=["go", "old"]), [{"id": "go"}])
+
+    @mock.patch('kg_obo.http_client.get')
+    def test_fetch_registry(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {"ETag": '"v1"'}
+        mock_get.return_value.content = self.content
+        self.assertEqual(fetch_registry(self.url, self.td.name), self.content)
+
+        # Once cached, it's revalidated, and used if unchanged
+        mock_get.return_value.status_code = 304
+        mock_get.return_value.content = b""
+        self.assertEqual(fetch_registry(self.url, self.td.name), self.content)
+        self.assertEqual(mock_get.call_args.kwargs["headers"], {"If-None-Match": '"v1"'})
+
+        # or if it can't be retrieved
+        mock_get.side_effect = requests.exceptions.ConnectionError
+        self.assertEqual(fetch_registry(self.url, self.td.name), self.content)
+        with self.assertRaises(requests.exceptions.RequestException):
+            fetch_registry("https://other/ontologies.yml", self.td.name)
+
+    @mock.patch('kg_obo.http_client.get')
+    def test_load_registry(self, mock_get):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {}
+        mock_get.return_value.content = self.content
+        registry = load_registry(self.url, self.td.name)
+        self.assertEqual(registry.ids(), {"bfo", "chebi"})
+        self.assertEqual(registry.select(skip=["chebi"]), [registry["bfo"]])
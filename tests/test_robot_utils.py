@@ -1,8 +1,16 @@
 import os
+import stat
+import tempfile
 from unittest import TestCase, mock
 from unittest.mock import Mock
 
-from kg_obo.robot_utils import initialize_robot, relax_owl, merge_and_convert_owl
+import sh
+
+from kg_obo.robot_utils import initialize_robot, relax_owl, merge_and_convert_owl, \
+                            parse_memory_size, get_robot_heap, \
+                            get_process_tree, run_robot, reset_peak_rss, get_peak_rss, \
+                            parse_java_version, get_class_archive, RobotChain, \
+                            choose_robot_heap, set_robot_heap, format_memory_size
 from post_setup.post_setup import robot_setup
 
 class TestRobotUtils(TestCase):
@@ -20,4 +28,137 @@ class TestRobotUtils(TestCase):
     def test_merge_and_convert_owl(self):
         robot_setup()
         robot_command, env = initialize_robot(self.robot_path)
-        relax_owl(self.robot_path, self.input_owl, self.output_owl, env)
\ No newline at end of file
+        relax_owl(self.robot_path, self.input_owl, self.output_owl, env)
+
+    def test_parse_memory_size(self):
+        self.assertEqual(parse_memory_size("12g"), 12 * 1024 ** 3)
+        self.assertEqual(parse_memory_size("512M"), 512 * 1024 ** 2)
+        self.assertEqual(parse_memory_size("1024"), 1024)
+        with self.assertRaises(ValueError):
+            parse_memory_size("lots")
+
+    def test_get_robot_heap(self):
+        self.assertEqual(get_robot_heap({'ROBOT_JAVA_ARGS': '-Xmx12g -XX:+UseG1GC'}),
+                         12 * 1024 ** 3)
+        self.assertEqual(get_robot_heap({}), 0)
+
+    def test_choose_robot_heap(self):
+        gib = 1024 ** 3
+        # Without a size or previous peak, the default is used
+        self.assertEqual(choose_robot_heap(), 12 * gib)
+        self.assertEqual(choose_robot_heap(default=4 * gib), 4 * gib)
+        # Small OBOs get the minimum
+        self.assertEqual(choose_robot_heap(50 * 1024, needs_merge=False), gib)
+        # Large ones are sized by file, or by previous peak, whichever needs more
+        self.assertEqual(choose_robot_heap(gib, needs_merge=False), 16 * gib)
+        self.assertEqual(choose_robot_heap(gib, previous_peak=20 * gib), 25 * gib)
+        # Heaps are rounded up to the next 256m
+        self.assertEqual(choose_robot_heap(100 * 1024 ** 2, needs_merge=False), 1792 * 1024 ** 2)
+        # Small OBOs that may merge large imports get the default, until their peak is known
+        self.assertEqual(choose_robot_heap(50 * 1024), 12 * gib)
+        self.assertEqual(choose_robot_heap(50 * 1024, default=4 * gib), 4 * gib)
+        self.assertEqual(choose_robot_heap(gib), 16 * gib)
+        self.assertEqual(choose_robot_heap(50 * 1024, previous_peak=gib), 1280 * 1024 ** 2)
+        # But never beyond the cap
+        self.assertEqual(choose_robot_heap(gib, cap=8 * gib), 8 * gib)
+        self.assertEqual(choose_robot_heap(cap=8 * gib), 8 * gib)
+
+    def test_set_robot_heap(self):
+        env = {'ROBOT_JAVA_ARGS': '-Xmx12g -XX:+UseG1GC -Xshare:auto', 'PATH': '/bin'}
+        small_env = set_robot_heap(env, 1024 ** 3)
+        self.assertEqual(small_env['ROBOT_JAVA_ARGS'], '-Xmx1g -XX:+UseSerialGC -Xshare:auto')
+        self.assertEqual(small_env['PATH'], '/bin')
+        self.assertEqual(get_robot_heap(small_env), 1024 ** 3)
+        self.assertEqual(env['ROBOT_JAVA_ARGS'], '-Xmx12g -XX:+UseG1GC -Xshare:auto')
+        self.assertEqual(set_robot_heap(env, 2560 * 1024 ** 2)['ROBOT_JAVA_ARGS'],
+                         '-Xmx2560m -XX:+UseG1GC -Xshare:auto')
+
+    def test_format_memory_size(self):
+        self.assertEqual(format_memory_size(12 * 1024 ** 3), "12g")
+        self.assertEqual(format_memory_size(1536 * 1024 ** 2), "1536m")
+        self.assertEqual(parse_memory_size(format_memory_size(1536 * 1024 ** 2)), 1536 * 1024 ** 2)
+
+    def test_get_process_tree(self):
+        self.assertEqual(get_process_tree(os.getpid())[0], os.getpid())
+
+    def test_run_robot(self):
+        reset_peak_rss()
+        self.assertEqual(get_peak_rss(), 0)
+        run_robot(sh.Command("sh"), "-c", "sleep 1")
+        if os.path.exists("/proc"):
+            self.assertGreater(get_peak_rss(), 0)
+        with self.assertRaises(sh.ErrorReturnCode_1):
+            run_robot(sh.Command("sh"), "-c", "exit 1")
+
+    def test_parse_java_version(self):
+        self.assertEqual(parse_java_version('openjdk version "17.0.2" 2022-01-18'), 17)
+        self.assertEqual(parse_java_version('java version "1.8.0_292"'), 8)
+        self.assertEqual(parse_java_version('openjdk version "21" 2023-09-19'), 21)
+        self.assertEqual(parse_java_version(''), 0)
+
+    def test_get_class_archive(self):
+        with tempfile.TemporaryDirectory() as td:
+            # Stands in for ROBOT, writing any archive it's asked to
+            robot_path = os.path.join(td, "robot")
+            with open(robot_path, "w") as robot_file:
+                robot_file.write('#!/bin/sh\n'
+                                 'for arg in $ROBOT_JAVA_ARGS; do\n'
+                                 '  case "$arg" in -XX:ArchiveClassesAtExit=*) touch "${arg#*=}";; esac\n'
+                                 'done\n')
+            os.chmod(robot_path, os.stat(robot_path).st_mode | stat.S_IEXEC)
+            with open(os.path.join(td, "robot.jar"), "w") as jar_file:
+                jar_file.write("jar")
+            archive_dir = os.path.join(td, "archives")
+            env = dict(os.environ, ROBOT_JAVA_ARGS="-Xmx1g")
+
+            # Old versions of Java can't make one
+            with mock.patch('kg_obo.robot_utils.get_java_version', return_value='java version "1.8.0_292"'):
+                self.assertEqual(get_class_archive(robot_path, env, archive_dir), "")
+
+            with mock.patch('kg_obo.robot_utils.get_java_version', return_value='openjdk version "17.0.2"'):
+                archive_path = get_class_archive(robot_path, env, archive_dir)
+                self.assertTrue(os.path.exists(archive_path))
+                self.assertEqual(os.listdir(archive_dir), [os.path.basename(archive_path)])
+                # Once made, it's reused
+                with mock.patch('sh.Command') as mock_command:
+                    self.assertEqual(get_class_archive(robot_path, env, archive_dir), archive_path)
+                    self.assertFalse(mock_command.called)
+
+            # Another version of Java needs another archive
+            with mock.patch('kg_obo.robot_utils.get_java_version', return_value='openjdk version "21"'):
+                self.assertNotEqual(get_class_archive(robot_path, env, archive_dir), archive_path)
+
+            # Training that fails isn't retried for the same Java and robot.jar
+            with mock.patch('kg_obo.robot_utils.get_java_version', return_value='openjdk version "22"'):
+                with mock.patch('sh.Command') as mock_command:
+                    mock_command.return_value.side_effect = sh.TimeoutException(-9, "robot relax")
+                    self.assertEqual(get_class_archive(robot_path, env, archive_dir), "")
+                    self.assertEqual(get_class_archive(robot_path, env, archive_dir), "")
+                    self.assertEqual(mock_command.return_value.call_count, 1)
+                self.assertTrue(any(name.endswith(".failed") for name in os.listdir(archive_dir)))
+
+    def test_robot_chain(self):
+        chain = RobotChain("in.owl").relax("relaxed.owl").convert("out.json")
+        chain.merge("merged.owl").export_ids("ids.csv")
+        self.assertEqual(chain.arguments(),
+                         ['relax', '--input', 'in.owl', '--output', 'relaxed.owl',
+                          'convert', '--format', 'json', '--output', 'out.json',
+                          'merge', '--output', 'merged.owl',
+                          'export', '--header', 'ID', '--export', 'ids.csv'])
+
+        with tempfile.TemporaryDirectory() as td:
+            # Stands in for ROBOT, recording how it was run
+            robot_path = os.path.join(td, "robot")
+            args_path = os.path.join(td, "args")
+            with open(robot_path, "w") as robot_file:
+                robot_file.write(f'#!/bin/sh\necho "$@" > {args_path}\n')
+            os.chmod(robot_path, os.stat(robot_path).st_mode | stat.S_IEXEC)
+
+            # All commands run as one
+            self.assertTrue(chain.run(robot_path, dict(os.environ)))
+            with open(args_path) as args_file:
+                self.assertEqual(args_file.read().split(), chain.arguments())
+
+            with open(robot_path, "w") as robot_file:
+                robot_file.write('#!/bin/sh\nexit 1\n')
+            self.assertFalse(chain.run(robot_path, dict(os.environ)))
@@ -0,0 +1,142 @@
+import json
+import os
+import tempfile
+import threading
+from unittest import TestCase, mock
+
+import requests
+
+from kg_obo.scheduler import MemoryBudget, assign_shards, estimate_costs, get_remote_size, \
+                             get_shard_lock_path, get_total_memory, load_plan_costs, \
+                             load_previous_durations, load_previous_peaks, order_by_cost, parse_shard, \
+                             select_shard, start_process_pool, write_peaks
+
+
+def double(value):
+    return {"name": value, "value": value * 2}
+
+
+class TestScheduler(TestCase):
+
+    def test_get_total_memory(self):
+        self.assertTrue(get_total_memory() > 0)
+
+    def test_memory_budget(self):
+        budget = MemoryBudget(8)
+        # A job larger than the whole budget may still run on its own
+        budget.acquire(10)
+        waiting = threading.Thread(target=budget.acquire, args=(4,))
+        waiting.start()
+        waiting.join(timeout=0.2)
+        self.assertTrue(waiting.is_alive())
+        budget.release(10)
+        waiting.join(timeout=5)
+        self.assertFalse(waiting.is_alive())
+        self.assertEqual(budget.used, 4)
+
+    def test_start_process_pool(self):
+        # Every worker is forked up front
+        with start_process_pool(3) as executor:
+            self.assertEqual(len(executor._processes), 3)
+            self.assertEqual(executor.submit(double, 2).result(), {"name": 2, "value": 4})
+
+    def test_load_previous_durations(self):
+        metrics = [{"name": "bfo", "stage": "download", "seconds": 2.0, "bytes_downloaded": 100},
+                   {"name": "bfo", "stage": "relax", "seconds": 8.0, "bytes_downloaded": 0},
+                   {"name": "go", "stage": "header", "seconds": 1.0, "bytes_downloaded": 4096}]
+        with tempfile.TemporaryDirectory() as td:
+            metrics_path = os.path.join(td, "run_metrics.json")
+            with open(metrics_path, "w") as metrics_file:
+                json.dump(metrics, metrics_file)
+            # go was only checked, not transformed, so it has no duration
+            self.assertEqual(load_previous_durations(metrics_path),
+                             {"bfo": {"seconds": 10.0, "bytes": 100}})
+            self.assertEqual(load_previous_durations(os.path.join(td, "none.json")), {})
+
+    def test_load_previous_peaks(self):
+        metrics = [{"name": "bfo", "stage": "download", "seconds": 2.0, "peak_rss": 0},
+                   {"name": "bfo", "stage": "relax", "seconds": 8.0, "peak_rss": 300},
+                   {"name": "bfo", "stage": "convert", "seconds": 8.0, "peak_rss": 200},
+                   {"name": "go", "stage": "header", "seconds": 1.0, "peak_rss": 0}]
+        with tempfile.TemporaryDirectory() as td:
+            metrics_path = os.path.join(td, "run_metrics.json")
+            with open(metrics_path, "w") as metrics_file:
+                json.dump(metrics, metrics_file)
+            # ROBOT never ran on go
+            self.assertEqual(load_previous_peaks(metrics_path), {"bfo": 300})
+            self.assertEqual(load_previous_peaks(os.path.join(td, "none.json")), {})
+
+            # Peaks kept from earlier runs are used for OBOs the previous run skipped,
+            # and replaced for those it ran ROBOT on
+            peaks_path = os.path.join(td, "robot_peaks.json")
+            write_peaks(peaks_path, {"bfo": 100, "go": 5000})
+            self.assertEqual(load_previous_peaks(metrics_path, peaks_path), {"bfo": 300, "go": 5000})
+            self.assertEqual(load_previous_peaks(os.path.join(td, "none.json"), peaks_path),
+                             {"bfo": 100, "go": 5000})
+
+    @mock.patch('kg_obo.obolibrary_utils.get_url', return_value="https://some/url")
+    @mock.patch('kg_obo.http_client.head')
+    def test_get_remote_size(self, mock_head, mock_get_url):
+        mock_head.return_value.headers = {"Content-Length": "1000"}
+        self.assertEqual(get_remote_size("bfo"), 1000)
+        # An already resolved URL isn't resolved again
+        mock_get_url.reset_mock()
+        self.assertEqual(get_remote_size("bfo", "https://other/url"), 1000)
+        self.assertFalse(mock_get_url.called)
+        mock_head.assert_called_with("https://other/url")
+        mock_head.side_effect = requests.exceptions.ConnectionError
+        self.assertEqual(get_remote_size("bfo"), 0)
+
+    def test_estimate_costs(self):
+        durations = {"bfo": {"seconds": 10.0, "bytes": 100}}
+        with mock.patch('kg_obo.scheduler.get_remote_size', return_value=500):
+            costs = estimate_costs(["bfo", "go"], durations)
+        # go has no previous duration, so is estimated at the throughput of bfo
+        self.assertEqual(costs, {"bfo": 10.0, "go": 50.0})
+        self.assertEqual(estimate_costs(["bfo", "go"], durations, check_sizes=False),
+                         {"bfo": 10.0, "go": 0.0})
+
+    def test_order_by_cost(self):
+        ontologies = [{"id": "bfo"}, {"id": "go"}, {"id": "pr"}, {"id": "xao"}]
+        costs = {"bfo": 1.0, "go": 50.0, "pr": 0.0, "xao": 1.0}
+        self.assertEqual([ontology["id"] for ontology in order_by_cost(ontologies, costs)],
+                         ["go", "bfo", "xao", "pr"])
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("0/4"), (0, 4))
+        self.assertEqual(parse_shard("3/4"), (3, 4))
+        for shard in ["4/4", "-1/4", "0/0", "one/4", "1"]:
+            with self.assertRaises(ValueError):
+                parse_shard(shard)
+
+    def test_get_shard_lock_path(self):
+        self.assertEqual(get_shard_lock_path("kg-obo/lock", ""), "kg-obo/lock")
+        self.assertEqual(get_shard_lock_path("kg-obo/lock", "1/4"), "kg-obo/lock-shard-1-of-4")
+
+    def test_assign_shards(self):
+        names = [f"obo{i}" for i in range(40)]
+        shards = assign_shards(names, 4)
+        self.assertEqual(shards, assign_shards(list(reversed(names)), 4))
+        self.assertEqual(set(shards.values()), {0, 1, 2, 3})
+
+        # With costs, the most expensive OBOs are spread across shards
+        costs = {"obo0": 100.0, "obo1": 90.0, "obo2": 10.0, "obo3": 5.0}
+        shards = assign_shards(names[:4], 2, costs)
+        self.assertNotEqual(shards["obo0"], shards["obo1"])
+        self.assertEqual(shards["obo0"], shards["obo3"])
+
+    def test_select_shard(self):
+        ontologies = [{"id": f"obo{i}"} for i in range(40)]
+        selected = [select_shard(ontologies, f"{i}/3") for i in range(3)]
+        self.assertEqual(sorted(ontology["id"] for shard in selected for ontology in shard),
+                         sorted(ontology["id"] for ontology in ontologies))
+
+    def test_load_plan_costs(self):
+        plan = {"ontologies": [{"name": "bfo", "estimated_cost": 10.0},
+                               {"name": "go", "estimated_cost": 0.0}]}
+        with tempfile.TemporaryDirectory() as td:
+            plan_path = os.path.join(td, "plan.json")
+            with open(plan_path, "w") as plan_file:
+                json.dump(plan, plan_file)
+            self.assertEqual(load_plan_costs(plan_path), {"bfo": 10.0, "go": 0.0})
+
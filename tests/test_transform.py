@@ -1,28 +1,76 @@
+import hashlib
+import itertools
+import json
 import logging
+import os
+import shutil
 import tempfile
+import threading
 from unittest import TestCase, mock
 from unittest.mock import Mock
 
 import pytest
 import requests
+import yaml
 
+from kg_obo.download_cache import DownloadCache
 from kg_obo.transform import (
+    adapt_robot_env,
     clean_and_normalize_graph,
     delete_path,
+    discard_ontology,
+    DOWNLOAD_RETRIES,
+    download_header,
     download_ontology,
+    download_range,
+    fetch_ontology,
     get_file_diff,
     get_file_length,
     get_owl_iri,
+    HeaderScanner,
     imports_requested,
     kgx_transform,
+    new_transform_job,
+    process_ontology,
     replace_illegal_chars,
     retrieve_obofoundry_yaml,
     run_transform,
     track_obo_version,
+    track_obo_versions,
+    transformed_content_version,
     transformed_obo_exists,
 )
 
 
+# A header of HEADER_SIZE bytes, ending in the first chunk of a download
+HEADER = b"</owl:Ontology>".rjust(4096)
+
+
+def stream_of(body):
+    """
+    Mocks the body of a streamed response from an iterator of chunks.
+    """
+    body = iter(body)
+    return lambda chunk_size: body
+
+
+def interrupted_stream(*sizes):
+    """
+    Yields chunks of the given sizes, then drops the connection.
+    """
+    for size in sizes:
+        yield b"a" * size
+    raise requests.exceptions.ChunkedEncodingError("Connection broken")
+
+
+def stream(*chunks):
+    """
+    Mocks the body of a streamed response. As with requests,
+    each call to iter_content continues where the last stopped.
+    """
+    return stream_of(chunks)
+
+
 class TestRunTransform(TestCase):
 
     def setUp(self) -> None:
@@ -133,9 +181,9 @@ class TestRunTransform(TestCase):
                        }], 'user': 'http://zfin.org'}],
             }]
 
-    @mock.patch('requests.get')
+    @mock.patch('kg_obo.http_client.get')
     @mock.patch('kg_obo.transform.retrieve_obofoundry_yaml')
-    @mock.patch('kg_obo.obolibrary_utils.get_url')
+    @mock.patch('kg_obo.obolibrary_utils.get_url', return_value='http://purl.obolibrary.org/obo/bfo.owl')
     @mock.patch('kg_obo.transform.get_owl_iri', return_value=('http://purl.obolibrary.org/obo/bfo/2019-08-26/bfo.owl', '2019-08-26', 'versionIRI'))
     @mock.patch('kgx.cli.transform')
     @mock.patch('kg_obo.transform.clean_and_normalize_graph')
@@ -153,6 +201,7 @@ class TestRunTransform(TestCase):
             self.assertTrue(mock_retrieve_obofoundry_yaml.called)
             self.assertTrue(mock_kgx_transform.called)
             self.assertTrue(mock_clean_and_normalize_graph.called)
+            self.assertTrue(os.path.exists(os.path.join(td, "run_metrics.tsv")))
 
         # Test with s3_test option off
         with tempfile.TemporaryDirectory() as td:
@@ -205,6 +254,52 @@ class TestRunTransform(TestCase):
             run_transform(log_dir=td,s3_test=True,get_only=['apollo_sv'])
             self.assertTrue(mock_kgx_transform.called)
 
+        # Test with multiple workers
+        with tempfile.TemporaryDirectory() as td:
+            self.assertTrue(run_transform(log_dir=td,s3_test=True,workers=2,memory_budget="24g"))
+
+        # Test with a shard that includes every OBO
+        with tempfile.TemporaryDirectory() as td:
+            mock_kgx_transform.reset_mock()
+            self.assertTrue(run_transform(log_dir=td,s3_test=True,shard="0/1"))
+            self.assertTrue(mock_kgx_transform.called)
+
+        # Test claiming from a work queue
+        with tempfile.TemporaryDirectory() as td:
+            mock_kgx_transform.reset_mock()
+            queue_path = os.path.join(td, "queue.sqlite")
+            self.assertTrue(run_transform(log_dir=td,s3_test=True,queue_path=queue_path))
+            self.assertTrue(mock_kgx_transform.called)
+            # A later run reusing the queue claims its jobs again
+            mock_kgx_transform.reset_mock()
+            self.assertTrue(run_transform(log_dir=td,s3_test=True,queue_path=queue_path,
+                                          queue_run="later-run"))
+            self.assertTrue(mock_kgx_transform.called)
+
+        # Test claiming with several workers, each processing OBOs in a worker process
+        with tempfile.TemporaryDirectory() as td:
+            queue_path = os.path.join(td, "queue.sqlite")
+            self.assertTrue(run_transform(log_dir=td,s3_test=True,queue_path=queue_path,workers=2,
+                                          memory_budget="24g"))
+            with open(os.path.join(td, "run_metrics.json")) as metrics_file:
+                stages = [record["stage"] for record in json.load(metrics_file)]
+            self.assertIn("kgx", stages)
+
+        # Test resuming - with nothing to resume from, this runs as usual
+        with tempfile.TemporaryDirectory() as td:
+            mock_kgx_transform.reset_mock()
+            self.assertTrue(run_transform(log_dir=td,s3_test=True,resume=True))
+            self.assertTrue(mock_kgx_transform.called)
+
+        # Test with the staged pipeline
+        with tempfile.TemporaryDirectory() as td:
+            mock_kgx_transform.reset_mock()
+            self.assertTrue(run_transform(log_dir=td,s3_test=True,pipeline=True))
+            # OBOs are processed in worker processes, which send back their stage metrics
+            with open(os.path.join(td, "run_metrics.json")) as metrics_file:
+                stages = [record["stage"] for record in json.load(metrics_file)]
+            self.assertIn("kgx", stages)
+
     @mock.patch('kgx.cli.transform')
     def test_kgx_transform(self, mock_kgx_transform) -> None:
         ret_val = kgx_transform(**self.kgx_transform_kwargs)
@@ -220,32 +315,261 @@ class TestRunTransform(TestCase):
         self.assertTrue(mock_kgx_transform.called)
         self.assertFalse(ret_val[0])
 
-    @mock.patch('requests.get')
+    @mock.patch('kgx.cli.transform')
+    def test_kgx_transform_concurrent(self, mock_kgx_transform) -> None:
+        # Two transforms share one logger at once; only one of them warns
+        logger = logging.getLogger("fake-kgx-log")
+        both_started = threading.Barrier(2)
+        warned = threading.Event()
+
+        def transform(inputs, **kwargs):
+            both_started.wait(timeout=5)
+            if inputs == ["bad"]:
+                logger.warning("Trouble in bad")
+                warned.set()
+            else:
+                warned.wait(timeout=5)
+
+        mock_kgx_transform.side_effect = transform
+        results = {}
+        with tempfile.TemporaryDirectory() as td:
+            def run(name):
+                os.makedirs(os.path.join(td, name))
+                results[name] = kgx_transform(**{**self.kgx_transform_kwargs,
+                                                 'input_file': [name],
+                                                 'output_file': os.path.join(td, name, name),
+                                                 'logger': logger})
+
+            threads = [threading.Thread(target=run, args=(name,)) for name in ["bad", "good"]]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertTrue(results["bad"][1])
+            self.assertFalse(results["good"][1])
+            with open(os.path.join(td, "good", "tsv_transform.log")) as log_file:
+                self.assertNotIn("Trouble in bad", log_file.read())
+            with open(os.path.join(td, "bad", "tsv_transform.log")) as log_file:
+                self.assertIn("Trouble in bad", log_file.read())
+
+    @mock.patch('kg_obo.http_client.get')
     def test_download_ontology(self, mock_get):
         ret_val = download_ontology(**self.download_ontology_kwargs, header_only=False)
         self.assertTrue(mock_get.called)
         self.assertTrue(ret_val)
 
-    @mock.patch('requests.get')
+    @mock.patch('kg_obo.http_client.get')
     def test_download_ontology_headeronly(self, mock_get):
         ret_val = download_ontology(**self.download_ontology_kwargs, header_only=True)
         self.assertTrue(mock_get.called)
         self.assertTrue(ret_val)
 
-    @mock.patch('requests.get')
+    @mock.patch('kg_obo.http_client.get')
     def test_download_ontology_fail(self, mock_get):
         mock_get.side_effect = KeyError(mock.Mock())
         ret_val = download_ontology(**self.download_ontology_kwargs, header_only=False)
         self.assertTrue(mock_get.called)
         self.assertFalse(ret_val)
 
-    @mock.patch('requests.get')
+    @mock.patch('kg_obo.http_client.get')
     def test_download_ontology_connectionerror(self, mock_get):
         mock_get.side_effect = requests.ConnectionError(mock.Mock())
         ret_val = download_ontology(**self.download_ontology_kwargs, header_only=False)
         self.assertTrue(mock_get.called)
         self.assertFalse(ret_val)
 
+    @mock.patch('kg_obo.http_client.get')
+    def test_download_ontology_check_header(self, mock_get):
+        mock_get.return_value.headers = {"Content-Length": "10000"}
+        mock_get.return_value.iter_content.side_effect = stream(HEADER, b"b" * 4096, b"c" * 1808)
+        kwargs = dict(self.download_ontology_kwargs, no_dl_progress=True, header_only=False)
+
+        # If the header shows this version isn't needed, nothing more is written
+        check_header = mock.Mock(return_value=False)
+        self.assertTrue(download_ontology(**kwargs, check_header=check_header))
+        check_header.assert_called_once_with(kwargs["file"])
+        self.assertEqual(os.path.getsize(kwargs["file"]), 4096)
+        self.assertEqual(mock_get.call_count, 1)
+
+        # Otherwise the same request continues to the end of the file,
+        # which is hashed as it's written
+        mock_get.return_value.iter_content.side_effect = stream(HEADER, b"b" * 4096, b"c" * 1808)
+        check_header = mock.Mock(return_value=True)
+        content_hash = {}
+        self.assertTrue(download_ontology(**kwargs, check_header=check_header, content_hash=content_hash))
+        self.assertEqual(check_header.call_count, 1)
+        self.assertEqual(os.path.getsize(kwargs["file"]), 10000)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(content_hash["sha256"],
+                         hashlib.sha256(HEADER + b"b" * 4096 + b"c" * 1808).hexdigest())
+
+    @mock.patch('kg_obo.http_client.get')
+    def test_download_ontology_long_header(self, mock_get):
+        mock_get.return_value.headers = {"Content-Length": "16384"}
+        mock_get.return_value.iter_content.side_effect = stream(
+            b"a" * 4096, b"a" * 4090 + b"</owl:", b"Ontology>".ljust(4096), b"b" * 4096)
+        kwargs = dict(self.download_ontology_kwargs, no_dl_progress=True, header_only=False)
+
+        # The header is read until it ends, even if its end is split between chunks
+        check_header = mock.Mock(return_value=False)
+        self.assertTrue(download_ontology(**kwargs, check_header=check_header))
+        check_header.assert_called_once_with(kwargs["file"])
+        self.assertEqual(os.path.getsize(kwargs["file"]), 12288)
+
+    def test_header_scanner(self):
+        scanner = HeaderScanner()
+        self.assertFalse(scanner.feed(b'<owl:Ontology rdf:about="http://purl.obolibrary.org/obo/bfo.owl">'))
+        self.assertTrue(scanner.feed(b"</owl:Ontology>\n<owl:Class"))
+        self.assertTrue(scanner.header().endswith(b"</owl:Ontology>"))
+
+        # Functional syntax has no end tag, so its header ends at its first declaration
+        scanner = HeaderScanner()
+        self.assertTrue(scanner.feed(b"Ontology(<http://purl.obolibrary.org/obo/bfo.owl>\nDeclaration(Class("))
+
+        # Without any end, the header is cut off after MAX_HEADER_SIZE bytes
+        with mock.patch('kg_obo.transform.MAX_HEADER_SIZE', 8192):
+            scanner = HeaderScanner()
+            self.assertFalse(scanner.feed(b"a" * 4096))
+            self.assertTrue(scanner.feed(b"a" * 4096))
+            self.assertEqual(len(scanner.header()), 8192)
+
+    @mock.patch('kg_obo.http_client.get')
+    def test_download_header(self, mock_get):
+        content = b"a" * 10000 + b"</owl:Ontology>" + b"b" * 10000
+
+        def respond(url, headers={}, **kwargs):
+            start, end = [int(i) for i in headers["Range"][len("bytes="):].split("-")]
+            response = mock.MagicMock(status_code=206, headers={
+                "Content-Range": f"bytes {start}-{end}/{len(content)}"})
+            response.__enter__.return_value = response
+            response.iter_content.side_effect = stream(content[start:end + 1])
+            return response
+
+        # Each Range is as long again as those before it, until the header ends
+        mock_get.side_effect = respond
+        with tempfile.TemporaryDirectory() as td:
+            header_path = os.path.join(td, "header.owl")
+            self.assertEqual(download_header("https://some/url", header_path), len(content))
+            self.assertEqual(os.path.getsize(header_path), 16384)
+        self.assertEqual([call.kwargs["headers"]["Range"] for call in mock_get.call_args_list],
+                         ["bytes=0-4095", "bytes=4096-8191", "bytes=8192-16383"])
+
+    @mock.patch('kg_obo.http_client.get')
+    def test_download_ontology_cached(self, mock_get):
+        kwargs = dict(self.download_ontology_kwargs, no_dl_progress=True, header_only=False)
+        with tempfile.TemporaryDirectory() as td:
+            cache = DownloadCache(td)
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.headers = {"Content-Length": "10000", "ETag": '"v1"'}
+            mock_get.return_value.iter_content.side_effect = stream(b"a" * 4096, b"b" * 5904)
+
+            # A full download is cached
+            self.assertTrue(download_ontology(**kwargs, download_cache=cache))
+            self.assertEqual(cache.lookup("https://some/url")["size"], 10000)
+
+            # Once cached, it's revalidated, and used if unchanged
+            mock_get.return_value.status_code = 304
+            mock_get.return_value.iter_content.side_effect = stream()
+            os.remove(kwargs["file"])
+            check_header = mock.Mock(return_value=True)
+            self.assertTrue(download_ontology(**kwargs, check_header=check_header, download_cache=cache))
+            self.assertEqual(mock_get.call_args.kwargs["headers"], {"If-None-Match": '"v1"'})
+            self.assertEqual(os.path.getsize(kwargs["file"]), 10000)
+            # The header is checked from the header alone
+            check_header.assert_called_once_with(kwargs["file"])
+
+    @mock.patch('kg_obo.http_client.get')
+    def test_download_ontology_interrupted(self, mock_get):
+        full = mock.MagicMock(headers={"Content-Length": "6000", "Accept-Ranges": "bytes", "ETag": '"v1"'})
+        full.iter_content.side_effect = stream_of(itertools.chain([HEADER], interrupted_stream()))
+        remainder = mock.MagicMock(status_code=206)
+        remainder.__enter__.return_value = remainder
+        remainder.iter_content.side_effect = stream(b"b" * 1904)
+        mock_get.side_effect = [full, remainder]
+        kwargs = dict(self.download_ontology_kwargs, no_dl_progress=True, header_only=False)
+
+        # The rest of the file is requested as a Range, and appended to what we have
+        content_hash = {}
+        self.assertTrue(download_ontology(**kwargs, check_header=mock.Mock(return_value=True),
+                                          content_hash=content_hash))
+        self.assertEqual(mock_get.call_args.kwargs["headers"],
+                         {"Range": "bytes=4096-5999", "If-Range": '"v1"'})
+        self.assertEqual(os.path.getsize(kwargs["file"]), 6000)
+        self.assertEqual(content_hash["sha256"], hashlib.sha256(HEADER + b"b" * 1904).hexdigest())
+
+        # Without Range support, the download fails
+        full.headers = {"Content-Length": "6000"}
+        full.iter_content.side_effect = stream_of(itertools.chain([HEADER], interrupted_stream()))
+        mock_get.side_effect = [full]
+        self.assertFalse(download_ontology(**kwargs, check_header=mock.Mock(return_value=True)))
+
+    @mock.patch('kg_obo.transform.DOWNLOAD_BACKOFF', 0)
+    @mock.patch('kg_obo.http_client.get')
+    def test_download_range(self, mock_get):
+        def partial(*chunks, interrupted=False):
+            response = mock.MagicMock(status_code=206)
+            response.__enter__.return_value = response
+            body = (interrupted_stream(*[len(chunk) for chunk in chunks]) if interrupted
+                    else iter(chunks))
+            response.iter_content.side_effect = stream_of(body)
+            return response
+
+        # Each retry requests only what's still missing
+        mock_get.side_effect = [partial(b"a" * 100, interrupted=True),
+                                partial(b"a" * 50, interrupted=True),
+                                partial(b"a" * 50)]
+        with tempfile.TemporaryFile() as outfile:
+            self.assertEqual(download_range("https://some/url", outfile, 1000, 1199, 100), 200)
+            self.assertEqual(outfile.tell(), 200)
+        self.assertEqual([call.kwargs["headers"]["Range"] for call in mock_get.call_args_list],
+                         ["bytes=1000-1199", "bytes=1100-1199", "bytes=1150-1199"])
+
+        # It gives up after DOWNLOAD_RETRIES
+        mock_get.reset_mock()
+        mock_get.side_effect = [partial(interrupted=True) for _ in range(DOWNLOAD_RETRIES + 1)]
+        with tempfile.TemporaryFile() as outfile, self.assertRaises(requests.exceptions.RequestException):
+            download_range("https://some/url", outfile, 0, 99, 100)
+        self.assertEqual(mock_get.call_count, DOWNLOAD_RETRIES + 1)
+
+        # A file which has changed isn't resumed
+        mock_get.reset_mock()
+        mock_get.side_effect = [mock.MagicMock(status_code=200)]
+        with tempfile.TemporaryFile() as outfile, self.assertRaises(requests.exceptions.RequestException):
+            download_range("https://some/url", outfile, 0, 99, 100, if_range='"v1"')
+        self.assertEqual(mock_get.call_count, 1)
+
+    @mock.patch('kg_obo.transform.SEGMENT_MIN_SIZE', 0)
+    @mock.patch('kg_obo.http_client.get')
+    def test_download_ontology_segments(self, mock_get):
+        content = HEADER + bytes(range(256)) * 48
+
+        def respond(url, headers={}, **kwargs):
+            if "Range" not in headers:
+                response = mock.MagicMock(status_code=200, headers={
+                    "Content-Length": str(len(content)), "Accept-Ranges": "bytes"})
+                response.iter_content.side_effect = stream_of(
+                    content[i:i + 4096] for i in range(0, len(content), 4096))
+                return response
+            start, end = [int(i) for i in headers["Range"][len("bytes="):].split("-")]
+            response = mock.MagicMock(status_code=206)
+            response.__enter__.return_value = response
+            response.iter_content.side_effect = stream(content[start:end + 1])
+            return response
+
+        mock_get.side_effect = respond
+        kwargs = dict(self.download_ontology_kwargs, no_dl_progress=True, header_only=False)
+
+        # After the header, the rest is downloaded in segments and stitched together
+        content_hash = {}
+        self.assertTrue(download_ontology(**kwargs, check_header=mock.Mock(return_value=True), segments=3,
+                                          content_hash=content_hash))
+        ranges = sorted(call.kwargs["headers"]["Range"] for call in mock_get.call_args_list[1:])
+        self.assertEqual(ranges, ["bytes=12288-16383", "bytes=4096-8191", "bytes=8192-12287"])
+        with open(kwargs["file"], "rb") as owl_file:
+            self.assertEqual(owl_file.read(), content)
+        self.assertEqual(content_hash["sha256"], hashlib.sha256(content).hexdigest())
+
     def test_get_owl_iri(self):
         iri = get_owl_iri('tests/resources/download_ontology/bfo.owl')
         self.assertEqual(('http://purl.obolibrary.org/obo/bfo/2019-08-26/bfo.owl', '2019-08-26',
@@ -343,6 +667,162 @@ class TestRunTransform(TestCase):
                           track_file_remote_path=track_path)
         self.assertTrue(mock_boto.called)
 
+    @mock.patch('boto3.client')
+    def test_track_obo_versions(self, mock_boto):
+        track_path = "tests/resources/tracking.yaml"
+        validators = {"url": "http://purl.obolibrary.org/obo/bfo.owl", "etag": '"abc"',
+                      "last_modified": "", "content_length": "100"}
+        track_obo_versions([("bfo", "iri-3", "version-3", "abc123"), ("go", "iri-4", "version-4")],
+                           "test",
+                           track_file_local_path=track_path,
+                           track_file_remote_path=track_path,
+                           validators={"bfo": validators, "not_tracked": validators})
+        self.assertEqual(mock_boto.return_value.upload_file.call_count, 1)
+        with open(track_path) as track_file:
+            tracking = yaml.safe_load(track_file)
+        self.assertEqual(tracking["ontologies"]["bfo"]["validators"], validators)
+        self.assertEqual(tracking["ontologies"]["bfo"]["current_sha256"], "abc123")
+        self.assertNotIn("current_sha256", tracking["ontologies"]["go"])
+        self.assertNotIn("not_tracked", tracking["ontologies"])
+
+        # Each version keeps its hash once archived
+        track_obo_versions([("bfo", "iri-5", "version-5")], "test",
+                           track_file_local_path=track_path,
+                           track_file_remote_path=track_path)
+        with open(track_path) as track_file:
+            tracking = yaml.safe_load(track_file)
+        self.assertNotIn("current_sha256", tracking["ontologies"]["bfo"])
+        self.assertEqual(tracking["ontologies"]["bfo"]["archive"][-1],
+                         {"iri": "iri-3", "version": "version-3", "sha256": "abc123"})
+        self.assertEqual(transformed_content_version("bfo", "abc123", tracking=tracking), "version-3")
+        self.assertEqual(transformed_content_version("bfo", "def456", tracking=tracking), "")
+        self.assertEqual(transformed_content_version("bfo", "abc123", s3_test=True, tracking=tracking), "")
+
+    @mock.patch('kg_obo.http_client.get')
+    def test_fetch_ontology_same_content(self, mock_get):
+        with open('tests/resources/download_ontology/bfo.owl', 'rb') as owl_file:
+            content = owl_file.read()
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.headers = {"Content-Length": str(len(content))}
+        mock_get.return_value.iter_content.side_effect = stream_of(
+            content[i:i + 4096] for i in range(0, len(content), 4096))
+        sha256 = hashlib.sha256(content).hexdigest()
+        # The same file was transformed before, but its version was read differently
+        tracking = {"ontologies": {"bfo": {"current_iri": "old-iri", "current_version": "old-version",
+                                           "current_sha256": sha256}}}
+        resolved_urls = {"bfo": {"url": "http://purl.obolibrary.org/obo/bfo.owl"}}
+        with tempfile.TemporaryDirectory() as td:
+            job = new_transform_job({"id": "bfo"})
+            try:
+                self.assertTrue(fetch_ontology(job, data_dir=td, resolved_urls=resolved_urls,
+                                               tracking=tracking, no_dl_progress=True))
+                self.assertEqual(job["sha256"], sha256)
+                # Downloaded to the same filesystem as the data, so it may be hardlinked
+                self.assertEqual(os.path.dirname(job["owl_file"]), os.path.join(td, "downloads"))
+                self.assertEqual(job["alias_of"], "old-version")
+                self.assertEqual(job["owl_version"], "2019-08-26")
+
+                # Its transform is copied rather than redone
+                self.assertTrue(process_ontology(job, "robot", {}, mock.Mock(), mock.Mock()))
+                self.assertTrue(job["success"])
+                self.assertEqual(job["result"]["status"], "success")
+            finally:
+                discard_ontology(job)
+
+    def test_adapt_robot_env(self):
+        robot_env = {'ROBOT_JAVA_ARGS': '-Xmx12g -XX:+UseG1GC'}
+        # OBOs with nothing to size them by keep the heap they had
+        self.assertEqual(adapt_robot_env(robot_env, "bfo"), (robot_env, 12 * 1024 ** 3))
+        with self.assertLogs("kg-obo", level="INFO") as logs:
+            ontology_env, heap = adapt_robot_env(robot_env, "bfo", input_size=50 * 1024,
+                                                 cap=8 * 1024 ** 3, needs_merge=False)
+        self.assertEqual(heap, 1024 ** 3)
+        self.assertEqual(ontology_env['ROBOT_JAVA_ARGS'], '-Xmx1g -XX:+UseSerialGC')
+        self.assertIn("ROBOT settings for bfo: -Xmx1g -XX:+UseSerialGC", logs.output[0])
+        # Until its peak is known, a small OBO that may merge imports keeps the heap it had
+        self.assertEqual(adapt_robot_env(robot_env, "bfo", input_size=50 * 1024),
+                         (robot_env, 12 * 1024 ** 3))
+
+    @mock.patch('kg_obo.transform.clean_and_normalize_graph', return_value=True)
+    @mock.patch('kg_obo.transform.kgx_transform', return_value=(True, False, ""))
+    @mock.patch('kg_obo.transform.examine_owl_names', return_value=True)
+    @mock.patch('kg_obo.transform.convert_owl')
+    @mock.patch('kg_obo.transform.relax_owl')
+    @mock.patch('kg_obo.transform.RobotChain.run', autospec=True)
+    def test_process_ontology_chained(self, mock_run, mock_relax_owl, mock_convert_owl,
+                                      mock_examine_owl_names, mock_kgx_transform,
+                                      mock_clean_and_normalize_graph):
+        def write(path, input_owl):
+            if path.endswith(".owl"):
+                shutil.copy(input_owl, path)
+            else:
+                with open(path, "w") as outfile:
+                    outfile.write("ID\nBFO:0000001\n")
+            return True
+
+        def run(chain, robot_path, robot_env):
+            for command in chain.commands:
+                write(command[-1], chain.input_owl)
+            return True
+
+        mock_run.side_effect = run
+        mock_relax_owl.side_effect = lambda robot_path, input_owl, output_owl, robot_env: \
+            write(output_owl, input_owl)
+        mock_convert_owl.side_effect = lambda robot_path, input_owl, output, robot_env: \
+            write(output, input_owl)
+        with tempfile.TemporaryDirectory() as td:
+            owl_file = os.path.join(td, "bfo.owl")
+            shutil.copy('tests/resources/download_ontology/bfo.owl', owl_file)
+            job = new_transform_job({"id": "bfo"})
+            job.update(owl_file=owl_file, owl_version="2019-08-26", need_imports=False,
+                       versioned_obo_path=td, checkpoint_path=os.path.join(td, "checkpoints.json"),
+                       resume=False)
+
+            # All ROBOT preprocessing is one command
+            self.assertTrue(process_ontology(job, "robot", {}, mock.Mock(), mock.Mock()))
+            chain = mock_run.call_args.args[0]
+            self.assertEqual([command[0] for command in chain.commands], ["relax", "convert", "export"])
+            self.assertTrue(mock_examine_owl_names.call_args.kwargs["exported"])
+            self.assertFalse(mock_relax_owl.called)
+            self.assertFalse(mock_convert_owl.called)
+            self.assertEqual(job["result"]["status"], "success")
+
+            # If the chain fails, each step is run alone
+            mock_run.side_effect = None
+            mock_run.return_value = False
+            job["result"]["status"] = "incomplete"
+            self.assertTrue(process_ontology(job, "robot", {}, mock.Mock(), mock.Mock()))
+            self.assertTrue(mock_relax_owl.called)
+            self.assertTrue(mock_convert_owl.called)
+            self.assertFalse(mock_examine_owl_names.call_args.kwargs["exported"])
+            self.assertEqual(job["result"]["status"], "success")
+
+    @mock.patch('kg_obo.transform.download_ontology')
+    @mock.patch('kg_obo.http_client.is_unchanged', return_value=True)
+    def test_fetch_ontology_unchanged(self, mock_is_unchanged, mock_download_ontology):
+        validators = {"url": "http://purl.obolibrary.org/obo/bfo.owl", "etag": '"abc"'}
+        tracking = {"ontologies": {"bfo": {"current_iri": "iri", "current_version": "version",
+                                           "validators": validators}}}
+        resolved_urls = {"bfo": {"url": "http://purl.obolibrary.org/obo/bfo.owl"}}
+        with tempfile.TemporaryDirectory() as td:
+            # An unchanged file isn't downloaded at all
+            job = new_transform_job({"id": "bfo"})
+            self.assertFalse(fetch_ontology(job, data_dir=td, resolved_urls=resolved_urls,
+                                            tracking=tracking))
+            mock_is_unchanged.assert_called_once_with("http://purl.obolibrary.org/obo/bfo.owl", validators)
+            self.assertFalse(mock_download_ontology.called)
+            self.assertEqual(job["result"]["status"], "existing")
+            self.assertEqual([record["stage"] for record in job["result"]["metrics"]], ["validate"])
+
+            # A changed file is downloaded as usual
+            mock_is_unchanged.return_value = False
+            job = new_transform_job({"id": "bfo"})
+            mock_download_ontology.return_value = False
+            self.assertFalse(fetch_ontology(job, data_dir=td, resolved_urls=resolved_urls,
+                                            tracking=tracking))
+            self.assertTrue(mock_download_ontology.called)
+            discard_ontology(job)
+
     @mock.patch('boto3.client')
     def test_transformed_obo_exists(self, mock_boto):
         track_path = "tests/resources/tracking.yaml"
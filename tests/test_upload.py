@@ -6,7 +6,8 @@ from kg_obo.upload import upload_dir_to_s3, mock_upload_dir_to_s3, \
                             check_lock, mock_check_lock, \
                             set_lock, mock_set_lock, \
                             update_index_files, mock_update_index_files, \
-                            verify_uploads, upload_reports
+                            verify_uploads, upload_reports, \
+                            find_locks, acquire_lock, copy_remote_dir
 
 class TestUploadDirToS3(TestCase):
 
@@ -33,6 +34,27 @@ class TestUploadDirToS3(TestCase):
         self.assertTrue(mock_boto.called)
         self.assertEqual(filelist, []) #Will be true because the directory is empty
 
+    @mock.patch('boto3.client')
+    def test_copy_remote_dir(self, mock_boto):
+        client = mock_boto.return_value
+        client.get_paginator.return_value.paginate.return_value = \
+            [{"Contents": [{"Key": "kg-obo/obo/v1/obo_kgx_tsv.tar.gz"},
+                           {"Key": "kg-obo/obo/v1/index.html"}]}, {}]
+        client.head_object.side_effect = botocore.exceptions.ClientError(
+            {"Error": {"Code": "404"}}, "HeadObject")
+        filelist = copy_remote_dir(self.bucket, "kg-obo/obo/v1", "kg-obo/obo/v2", make_public=True)
+        self.assertEqual(filelist, ["obo_kgx_tsv.tar.gz"])
+        client.copy.assert_called_once_with({"Bucket": self.bucket, "Key": "kg-obo/obo/v1/obo_kgx_tsv.tar.gz"},
+                                            self.bucket, "kg-obo/obo/v2/obo_kgx_tsv.tar.gz",
+                                            ExtraArgs={"ACL": "public-read"})
+
+        # Existing files are only replaced if forced
+        client.head_object.side_effect = None
+        copy_remote_dir(self.bucket, "kg-obo/obo/v1", "kg-obo/obo/v2")
+        self.assertEqual(client.copy.call_count, 1)
+        copy_remote_dir(self.bucket, "kg-obo/obo/v1", "kg-obo/obo/v2", force_overwrite=True)
+        self.assertEqual(client.copy.call_count, 2)
+
     @mock.patch('boto3.client')
     def test_check_tracking(self, mock_boto):
         check_tracking(self.bucket, self.bucket_dir)
@@ -60,6 +82,21 @@ class TestUploadDirToS3(TestCase):
         set_lock(self.bucket, self.bucket_dir, unlock=False)
         self.assertTrue(mock_boto.called)
 
+    @mock.patch('boto3.client')
+    def test_find_locks(self, mock_boto):
+        mock_boto.return_value.get_paginator.return_value.paginate.return_value = \
+            [{"Contents": [{"Key": "kg-obo/lock-shard-0-of-2"}]}, {}]
+        self.assertEqual(find_locks(self.bucket, "kg-obo/lock-shard-"),
+                         ["kg-obo/lock-shard-0-of-2"])
+
+    @mock.patch('boto3.client')
+    def test_acquire_lock(self, mock_boto):
+        self.assertTrue(acquire_lock(self.bucket, self.bucket_dir))
+        self.assertTrue(mock_boto.return_value.put_object.called)
+        mock_boto.return_value.put_object.side_effect = botocore.exceptions.ClientError(
+            {"Error": {"Code": "PreconditionFailed"}}, "PutObject")
+        self.assertFalse(acquire_lock(self.bucket, self.bucket_dir, attempts=2, wait=0))
+
     #Test-of-test
     @mock.patch('boto3.client')
     def test_mock_set_lock(self, mock_boto):
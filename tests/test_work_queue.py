@@ -0,0 +1,136 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from unittest import TestCase, mock
+
+from kg_obo.transform import kgx_transform
+from kg_obo.work_queue import MAX_ATTEMPTS, LeaseKeeper, WorkQueue, get_run_id, \
+                              get_worker_id, run_queue_workers
+
+
+def double(payload):
+    return {"name": payload["id"], "value": payload["value"] * 2}
+
+
+class TestWorkQueue(TestCase):
+
+    def setUp(self) -> None:
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.queue_path = os.path.join(self.tempdir.name, "queue.sqlite")
+        self.queue = WorkQueue(self.queue_path)
+        self.jobs = [(f"obo{i}", {"id": f"obo{i}", "value": i}) for i in range(5)]
+
+    def tearDown(self) -> None:
+        self.tempdir.cleanup()
+
+    def test_get_worker_id(self):
+        self.assertTrue(get_worker_id().endswith(str(os.getpid())))
+
+    def test_publish(self):
+        self.assertEqual(self.queue.publish(self.jobs), 5)
+        # Other workers publishing the same jobs add nothing
+        self.assertEqual(WorkQueue(self.queue_path).publish(self.jobs), 0)
+        self.assertEqual(self.queue.counts(), {"pending": 5})
+
+    def test_get_run_id(self):
+        self.assertRegex(get_run_id(), r"^\d{4}-\d{2}-\d{2}$")
+
+    def test_publish_later_run(self):
+        queue = WorkQueue(self.queue_path, run="run-1")
+        queue.publish(self.jobs)
+        run_queue_workers(queue, double, workers=2, worker_id="host-1")
+        self.assertEqual(queue.counts(), {"done": 5})
+
+        # A later run reusing the file has all of its jobs to do
+        later_queue = WorkQueue(self.queue_path, run="run-2")
+        self.assertEqual(later_queue.publish(self.jobs), 5)
+        self.assertEqual(later_queue.counts(), {"pending": 5})
+        self.assertEqual(later_queue.results(), {})
+        self.assertEqual(queue.counts(), {"done": 5})
+
+    def test_claim_and_complete(self):
+        self.queue.publish(self.jobs)
+        job = self.queue.claim("worker-a")
+        self.assertEqual(job["name"], "obo0")
+        self.assertEqual(self.queue.claim("worker-b")["name"], "obo1")
+        self.assertTrue(self.queue.renew("obo0", "worker-a"))
+        self.assertFalse(self.queue.renew("obo0", "worker-b"))
+        self.assertFalse(self.queue.complete("obo0", "worker-b", {}))
+        self.assertTrue(self.queue.complete("obo0", "worker-a", {"status": "success"}))
+        self.assertEqual(self.queue.results(), {"obo0": {"status": "success"}})
+        self.assertEqual(self.queue.counts(), {"done": 1, "claimed": 1, "pending": 3})
+
+    def test_expired_lease(self):
+        queue = WorkQueue(self.queue_path, lease_seconds=-1)
+        queue.publish(self.jobs[:1])
+        self.assertEqual(queue.claim("worker-a")["name"], "obo0")
+        # The lease has already expired, so another worker may claim the job
+        self.assertEqual(queue.claim("worker-b")["name"], "obo0")
+        self.assertFalse(queue.complete("obo0", "worker-a", {}))
+        for _ in range(MAX_ATTEMPTS - 2):
+            queue.claim("worker-c")
+        # Having expired too often, the job is given up on
+        self.assertIsNone(queue.claim("worker-d"))
+        self.assertEqual(queue.counts(), {"failed": 1})
+
+    def test_lease_keeper(self):
+        queue = WorkQueue(self.queue_path, lease_seconds=1)
+        queue.publish(self.jobs[:1])
+        queue.claim("worker-a")
+        with mock.patch.object(queue, "renew", return_value=True) as mock_renew:
+            # The lease is renewed every third of its length
+            with LeaseKeeper(queue, "obo0", "worker-a"):
+                time.sleep(0.5)
+            self.assertTrue(mock_renew.called)
+
+    def test_run_queue_workers(self):
+        self.queue.publish(self.jobs)
+        results = run_queue_workers(self.queue, double, workers=3, worker_id="host-1")
+        self.assertEqual(sorted(result["value"] for result in results), [0, 2, 4, 6, 8])
+        self.assertEqual(self.queue.counts(), {"done": 5})
+
+    def test_run_queue_workers_halt(self):
+        self.queue.publish(self.jobs)
+        results = run_queue_workers(self.queue, double, workers=1, worker_id="host-1",
+                                    on_result=lambda result: result["value"] < 4)
+        self.assertEqual(len(results), 3)
+        self.assertEqual(self.queue.counts()["pending"], 2)
+
+    def test_run_queue_workers_error(self):
+        self.queue.publish(self.jobs)
+        with self.assertRaises(KeyError):
+            run_queue_workers(self.queue, lambda payload: payload["missing"],
+                              workers=2, worker_id="host-1")
+        # Failed jobs stay claimed until their leases expire
+        self.assertNotIn("done", self.queue.counts())
+
+    @mock.patch('kgx.cli.transform')
+    def test_run_queue_workers_logs(self, mock_kgx_transform):
+        # Jobs run at once share KGX's logger, but only count their own warnings
+        logger = logging.getLogger("fake-queue-log")
+        all_started = threading.Barrier(len(self.jobs))
+        warned = threading.Event()
+
+        def transform(inputs, **kwargs):
+            all_started.wait(timeout=5)
+            if inputs == ["obo0"]:
+                logger.warning("Trouble in obo0")
+                warned.set()
+            else:
+                warned.wait(timeout=5)
+
+        def transform_job(payload):
+            output_dir = os.path.join(self.tempdir.name, payload["id"])
+            os.makedirs(output_dir)
+            success, errors, _ = kgx_transform([payload["id"]], "owl",
+                                               os.path.join(output_dir, payload["id"]), "tsv",
+                                               logger, [])
+            return {"name": payload["id"], "errors": errors}
+
+        mock_kgx_transform.side_effect = transform
+        self.queue.publish(self.jobs)
+        results = run_queue_workers(self.queue, transform_job, workers=len(self.jobs),
+                                    worker_id="host-1")
+        self.assertEqual({result["name"] for result in results if result["errors"]}, {"obo0"})